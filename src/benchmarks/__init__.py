@@ -0,0 +1,12 @@
+"""
+Benchmarks do simulador (correr dentro de src/).
+
+- micro: sensores, agir/reset dos ambientes, step dos ambientes vetorizados, decisao/update dos agentes, novelty
+- macro: MotorDeSimulacao.executa para cada ficheiro de params, curvas de escala do mapa e
+  rollouts vetorizado vs escalar
+- parity: paridade dos ambientes vetorizados com os escalares
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 1.25
+    python -m benchmarks.parity
+"""
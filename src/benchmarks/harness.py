@@ -0,0 +1,112 @@
+"""
+Medicao, informacao da maquina e comparacao com um baseline.
+
+Cada resultado e um dict {"group", "params", "ns_per_op", "median_ns_per_op", "ops", ...};
+o nome unico e group[param=valor,...], usado para emparelhar com o baseline.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def bench_name(group: str, params: dict) -> str:
+    if not params:
+        return group
+    return f"{group}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.2, repeat: int = 5) -> dict:
+    """
+    Mede fn() como o timeit.autorange: escolhe o nº de chamadas por repeticao ate durar min_time
+    e devolve o melhor e a mediana do tempo por chamada (ns) entre `repeat` repeticoes.
+    """
+    number = 1
+    while True:
+        t0 = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        dt = time.perf_counter_ns() - t0
+        if dt >= min_time * 1e9 or number >= 1 << 24:
+            break
+        number *= 2 if dt == 0 else max(2, min(10, int(min_time * 1e9 / max(dt, 1)) + 1))
+
+    samples = [dt / number]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter_ns() - t0) / number)
+    return {
+        "ns_per_op": min(samples),
+        "median_ns_per_op": statistics.median(samples),
+        "ops": number,
+        "repeat": repeat,
+    }
+
+
+def machine_info() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+        "commit": commit,
+    }
+
+
+def write_results(path: str, results: list[dict], meta: Optional[dict] = None) -> dict:
+    payload = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        **(meta or {}),
+        "benchmarks": {bench_name(r["group"], r["params"]): r for r in results},
+    }
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=1)
+    return payload
+
+
+def compare(current: dict, baseline: dict, threshold: float = 1.25) -> list[dict]:
+    """
+    Compara dois ficheiros de resultados (ja carregados).
+    Uma regressao e um benchmark que ficou mais de `threshold` vezes mais lento (ns_per_op).
+    Devolve uma linha por benchmark presente nos dois, com ratio e flag "regression".
+    """
+    rows = []
+    base = baseline.get("benchmarks", {})
+    for name, r in current.get("benchmarks", {}).items():
+        if name not in base or not base[name].get("ns_per_op"):
+            continue
+        ratio = r["ns_per_op"] / base[name]["ns_per_op"]
+        rows.append({
+            "name": name,
+            "baseline_ns": base[name]["ns_per_op"],
+            "current_ns": r["ns_per_op"],
+            "ratio": ratio,
+            "regression": ratio > threshold,
+        })
+    return rows
+
+
+def format_ns(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns:.0f} ns"
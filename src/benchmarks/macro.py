@@ -0,0 +1,145 @@
+"""
+Macro-benchmarks: MotorDeSimulacao.executa completo.
+
+- um benchmark por ficheiro de params (os de treino correm antes dos de teste, para o teste
+  encontrar a Q-table/policy acabada de treinar), com n_episodios reduzido
+- curvas de escala: o mesmo motor com mapas de 8 a 512
+- ambientes vetorizados vs escalares: a mesma rollout de acoes aleatorias num VecAmbiente* e em
+  n_envs ambientes escalares (os mesmos mapas, ver benchmarks.parity)
+Tudo corre numa pasta temporaria, por isso os outputs/ do repositorio nao sao tocados.
+"""
+import glob
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Iterator
+
+import numpy as np
+
+from benchmarks import parity
+from sim.actions import ACTIONS
+from sim.motor_de_simulacao import Config, MotorDeSimulacao
+
+
+PARAMS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sim", "params")
+SCALING_SIZES = [8, 16, 32, 64, 128, 256, 512]
+QUICK_SCALING_SIZES = [8, 64, 512]
+VEC_SIZES = [8, 32, 128]
+VEC_N_ENVS = [16, 256]
+QUICK_VEC_SIZES = [8, 64]
+QUICK_VEC_N_ENVS = [64]
+
+
+@contextmanager
+def _in_tempdir():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="sim_bench_") as d:
+        os.chdir(d)
+        try:
+            yield d
+        finally:
+            os.chdir(cwd)
+
+
+def params_files() -> list[str]:
+    #So configs de simulacao (specs de sweep/hyperband tem "train") e treino antes de teste
+    files = []
+    for path in sorted(glob.glob(os.path.join(PARAMS_DIR, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            if "train" not in json.load(f):
+                files.append(path)
+    return sorted(files, key=lambda p: ("_test" in p, p))
+
+
+def _run(cfg: Config) -> dict:
+    motor = MotorDeSimulacao.cria_de_config(cfg, verbose=False)
+    t0 = time.perf_counter_ns()
+    summary = motor.executa()
+    dt = time.perf_counter_ns() - t0
+    steps = summary.get("avg_steps", 0.0) * summary.get("episodes", 0)
+    return {
+        "ns_per_op": dt / max(1, summary.get("episodes", 0)),
+        "wall_s": dt / 1e9,
+        "episodes": summary.get("episodes", 0),
+        "steps_per_sec": steps / (dt / 1e9) if dt else 0.0,
+        "success_rate": summary.get("success_rate", 0.0),
+    }
+
+
+def _rollout(vec, refs: list, agentes: list, impl: str, passos: int, max_passos: int) -> dict:
+    #passos x n_envs acoes aleatorias no ambiente vetorizado ou nos escalares equivalentes
+    rng = np.random.default_rng(0)
+    acoes = rng.integers(len(ACTIONS), size=(passos, len(refs)))
+    episodes = successes = 0
+    t0 = time.perf_counter_ns()
+    if impl == "vec":
+        vec.reset()
+        for a in acoes:
+            _, _, done, success = vec.step(a)
+            if done.any():
+                episodes += int(done.sum())
+                successes += int(success.sum())
+                vec.reset(done)
+    else:
+        steps = [0] * len(refs)
+        for env, agente in zip(refs, agentes):
+            env.reset()
+            agente.carrying = False
+        for a in acoes:
+            for i, (env, agente) in enumerate(zip(refs, agentes)):
+                _, _, terminou, _ = env.agir(ACTIONS[a[i]], agente)
+                steps[i] += 1
+                if terminou or steps[i] >= max_passos:
+                    episodes += 1
+                    successes += terminou
+                    env.reset()
+                    agente.carrying = False
+                    steps[i] = 0
+    dt = time.perf_counter_ns() - t0
+    return {
+        "ns_per_op": dt / max(1, episodes),
+        "wall_s": dt / 1e9,
+        "episodes": episodes,
+        "steps_per_sec": passos * len(refs) / (dt / 1e9) if dt else 0.0,
+        "success_rate": successes / episodes if episodes else 0.0,
+    }
+
+
+def vec_benchmarks(quick: bool = False, passos: int = 600, max_passos: int = 150) -> Iterator[tuple[str, dict, dict]]:
+    sizes = QUICK_VEC_SIZES if quick else VEC_SIZES
+    n_envs = QUICK_VEC_N_ENVS if quick else VEC_N_ENVS
+    passos = passos // 3 if quick else passos
+    for env_name in ("farol", "foraging_ninho"):
+        for size in sizes:
+            for n in n_envs:
+                for impl in ("vec", "scalar"):
+                    if env_name == "farol":
+                        vec, refs, agentes = parity.pares_farol(n, size, 0.12, 0, max_passos)
+                    else:
+                        vec, refs, agentes = parity.pares_foraging(n, size, 0.12, 6, 0, max_passos)
+                    yield ("vec.rollout", {"env": env_name, "size": size, "n_envs": n, "impl": impl},
+                           _rollout(vec, refs, agentes, impl, passos, max_passos))
+
+
+def all_benchmarks(quick: bool = False, episodes: int = 200) -> Iterator[tuple[str, dict, dict]]:
+    """Devolve (grupo, params, resultado); ns_per_op = tempo medio por episodio."""
+    n = 20 if quick else episodes
+    with _in_tempdir():
+        for path in params_files():
+            with open(path, "r", encoding="utf-8") as f:
+                cfg = Config.from_dict(json.load(f))
+            cfg = replace(cfg, n_episodios=n)
+            yield "executa", {"params": os.path.basename(path)}, _run(cfg)
+
+        sizes = QUICK_SCALING_SIZES if quick else SCALING_SIZES
+        for env_name in ("farol", "foraging_ninho"):
+            for size in sizes:
+                cfg = Config(env=env_name, agent_type="fixed", mode="test", width=size, height=size,
+                             seed=0, n_episodios=max(5, n // 4), max_passos=150,
+                             csv_path=f"outputs/scaling_{env_name}_{size}.csv")
+                yield "executa.scaling", {"env": env_name, "size": size}, _run(cfg)
+
+    yield from vec_benchmarks(quick)
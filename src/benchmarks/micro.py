@@ -0,0 +1,221 @@
+"""
+Micro-benchmarks: cada funcao quente isolada, com varrimento do tamanho do mapa,
+densidade de obstaculos, nº de recursos, tipo de sensores (manhattan/bfs), geracao do mapa
+(vectorized/rejection), tamanho do arquivo do novelty e nº de envs dos ambientes vetorizados.
+"""
+import itertools
+import random
+import tempfile
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+from benchmarks import parity
+from sim.actions import ACTIONS, Action
+from sim.ambiente import MAP_SAMPLING
+from sim.distance_field import DistanceField
+from sim.motor_de_simulacao import Config, MotorDeSimulacao
+from sim.vec_farol_ambiente import VecAmbienteFarol
+from sim.vec_foraging_ninho_ambiente import VecAmbienteForagingNinho
+
+
+MAP_SIZES = [8, 16, 32, 64, 128, 256, 512]
+OBSTACLE_RATIOS = [0.0, 0.12, 0.3]
+N_RECURSOS = [1, 6, 50, 500, 5000, 100000]
+ARCHIVE_SIZES = [10, 100, 1000, 10000, 100000]
+VEC_SIZES = [8, 32, 128]
+VEC_N_ENVS = [1, 64, 1024]
+#Limite de celulas (n_envs x size x size) dos ambientes vetorizados
+VEC_MAX_CELLS = 2 ** 22
+#Episodios (mapas) gerados para os bancos de cenarios dos benchmarks de reset
+BANK_EPISODES = 20
+
+QUICK = {
+    "MAP_SIZES": [8, 64, 512],
+    "OBSTACLE_RATIOS": [0.12],
+    "N_RECURSOS": [6, 500, 100000],
+    "ARCHIVE_SIZES": [100, 10000],
+    "VEC_SIZES": [8, 128],
+    "VEC_N_ENVS": [1, 256],
+}
+
+Bench = tuple[str, dict, Callable[[], object]]
+
+
+def _setup(env: str, agent_type: str, size: int = 8, ratio: float = 0.12, n_recursos: int = 6,
+           mode: str = "train", distance_sensors: str = "manhattan", map_sampling: str = "vectorized",
+           scenario_bank: Optional[str] = None):
+    #Motor pronto a correr (ambiente com reset feito e agente com sensores instalados)
+    cfg = Config(env=env, agent_type=agent_type, mode=mode, width=size, height=size,
+                 obstacle_ratio=ratio, n_recursos=n_recursos, seed=0, metrics_formats=(),
+                 distance_sensors=distance_sensors, map_sampling=map_sampling,
+                 scenario_bank=scenario_bank, n_episodios=BANK_EPISODES)
+    motor = MotorDeSimulacao.cria_de_config(cfg, verbose=False)
+    agente = motor.inicia()
+    motor._ambiente.reset()
+    if hasattr(agente, "reset_episode"):
+        agente.reset_episode()
+    agente.observacao(motor._ambiente.observacaoPara(agente))
+    return motor._ambiente, agente
+
+
+def _cycle_actions(env, agente) -> Callable[[], object]:
+    #agir com acoes em ciclo (o agente anda pelo mapa, bate em paredes, apanha recursos)
+    actions = itertools.cycle([Action.UP, Action.RIGHT, Action.DOWN, Action.LEFT, Action.RIGHT, Action.DOWN])
+    return lambda: env.agir(next(actions), agente)
+
+
+def sensor_benchmarks(sizes, ratios, n_recursos) -> Iterator[Bench]:
+    for env_name, size, ratio, ds in itertools.product(("farol", "foraging_ninho"), sizes, ratios, ("manhattan", "bfs")):
+        recursos = n_recursos if env_name == "foraging_ninho" else [6]
+        for n in recursos:
+            if n > size * size * (1 - ratio) - 2:
+                continue
+            env, agente = _setup(env_name, "fixed", size, ratio, n, distance_sensors=ds)
+            if ds == "bfs":
+                # Campos BFS calculados fora da medicao (uma vez por reset)
+                agente.observacao(env.observacaoPara(agente))
+            for s in agente._sensores[1:] if ds == "bfs" else agente._sensores:
+                params = {"env": env_name, "size": size, "obstacle_ratio": ratio}
+                if env_name == "foraging_ninho":
+                    params["n_recursos"] = n
+                yield (f"sensor.{type(s).__name__}.sense_into", params,
+                       (lambda s=s, env=env, obs=agente._obs_buf: s.sense_into(env, env.agent_pos, obs)))
+
+
+def nearest_food_benchmarks(sizes, n_recursos) -> Iterator[Bench]:
+    #NearestFoodSensor com o indice espacial do ambiente vs procura linear em todos os recursos
+    for size, n in itertools.product(sizes, n_recursos):
+        if n > size * size * 0.88 - 2:
+            continue
+        env, agente = _setup("foraging_ninho", "fixed", size, 0.12, n)
+        sensor = next(s for s in agente._sensores if type(s).__name__ == "NearestFoodSensor")
+        rng = random.Random(0)
+        points = itertools.cycle([(rng.randrange(size), rng.randrange(size)) for _ in range(1024)])
+        obs = agente._obs_buf
+
+        def linear(env=env, index=env.indice_recursos):
+            env.indice_recursos = None
+            sensor.sense_into(env, next(points), obs)
+            env.indice_recursos = index
+        yield "NearestFood.index", {"size": size, "n_recursos": n}, (
+            lambda env=env: sensor.sense_into(env, next(points), obs))
+        yield "NearestFood.linear", {"size": size, "n_recursos": n}, linear
+
+
+def distance_field_benchmarks(sizes, n_recursos) -> Iterator[Bench]:
+    #Construcao dos campos BFS (uma vez por reset) e remocao incremental de um recurso
+    for size in sizes:
+        env, _ = _setup("farol", "fixed", size)
+        yield "DistanceField.build", {"size": size, "sources": 1}, (
+            lambda env=env: DistanceField(env.width, env.height, env.obstacles, [env.goal]))
+        for n in n_recursos:
+            if n > size * size * 0.88 - 2 or n < 2:
+                continue
+            env, _ = _setup("foraging_ninho", "fixed", size, 0.12, n)
+            yield "DistanceField.build", {"size": size, "sources": n}, (
+                lambda env=env: DistanceField(env.width, env.height, env.obstacles, env.recursos))
+
+            def remove(env=env, fields=[]):
+                # Remove as fontes uma a uma; reconstroi o campo quando fica vazio
+                if not fields or not fields[0][1]:
+                    fields[:] = [(DistanceField(env.width, env.height, env.obstacles, env.recursos),
+                                  list(env.recursos))]
+                field, left = fields[0]
+                field.remove_source(left.pop())
+            yield "DistanceField.remove_source", {"size": size, "sources": n}, remove
+
+
+def env_benchmarks(sizes, ratios, n_recursos) -> Iterator[Bench]:
+    #reset com cada modo de geracao e a ler os mapas de um banco de cenarios (numa pasta temporaria)
+    bank_dir = tempfile.TemporaryDirectory()
+    modos = [(sampling, None) for sampling in MAP_SAMPLING] + [("rejection", bank_dir.name)]
+    for size, ratio in itertools.product(sizes, ratios):
+        env, agente = _setup("farol", "fixed", size, ratio)
+        yield "AmbienteFarol.agir", {"size": size, "obstacle_ratio": ratio}, _cycle_actions(env, agente)
+        for sampling, bank in modos:
+            env, _ = _setup("farol", "fixed", size, ratio, map_sampling=sampling, scenario_bank=bank)
+            params = {"size": size, "obstacle_ratio": ratio, "map_sampling": sampling, "scenario_bank": bank is not None}
+            yield "AmbienteFarol.reset", params, env.reset
+
+        for n in n_recursos:
+            if n > size * size * (1 - ratio) - 2:
+                continue
+            env, agente = _setup("foraging_ninho", "fixed", size, ratio, n)
+            params = {"size": size, "obstacle_ratio": ratio, "n_recursos": n}
+            yield "AmbienteForagingNinho.agir", params, _cycle_actions(env, agente)
+            for sampling, bank in modos:
+                env, _ = _setup("foraging_ninho", "fixed", size, ratio, n, map_sampling=sampling, scenario_bank=bank)
+                yield ("AmbienteForagingNinho.reset",
+                       {**params, "map_sampling": sampling, "scenario_bank": bank is not None}, env.reset)
+    bank_dir.cleanup()
+
+
+def agent_benchmarks(sizes) -> Iterator[Bench]:
+    for size in sizes:
+        env, agente = _setup("farol", "learning", size)
+        yield "AgenteLearning.age", {"size": size}, agente.age
+
+        def td_update(agente=agente):
+            agente.prev_state = 7
+            agente.prev_action = Action.UP
+            agente.avaliacaoEstadoAtual(-1.0)
+        yield "AgenteLearning.td_update", {"size": size}, td_update
+
+        env, agente = _setup("foraging_ninho", "novelty", size)
+        obs = agente._ultima_obs
+        yield "AgenteNovelty._policy_action", {"size": size}, (lambda agente=agente, obs=obs: agente._policy_action(obs))
+
+
+def novelty_benchmarks(archive_sizes) -> Iterator[Bench]:
+    for n in archive_sizes:
+        _, agente = _setup("foraging_ninho", "novelty")
+        rng = np.random.default_rng(0)
+        bds = rng.uniform(0, 6, size=(n, 4))
+        for bd in bds:
+            agente.archive.add(bd, rng.uniform(-1, 1, 4))
+        agente.elites = [(1.0, tuple(b), [0.0] * 4) for b in bds[:agente.cfg.elite_keep]]
+        probe = tuple(random.Random(1).uniform(0, 6) for _ in range(4))
+        yield "AgenteNovelty._novelty_score", {"archive": n}, (lambda agente=agente: agente._novelty_score(probe))
+
+
+def _vec_step(vec) -> Callable[[], object]:
+    #step com acoes aleatorias pre-sorteadas; os envs que terminam sao reiniciados (reset com mascara)
+    rng = np.random.default_rng(0)
+    actions = itertools.cycle([rng.integers(len(ACTIONS), size=vec.n_envs) for _ in range(64)])
+    vec.reset()
+
+    def step():
+        _, _, done, _ = vec.step(next(actions))
+        if done.any():
+            vec.reset(done)
+    return step
+
+
+def vec_benchmarks(sizes, n_envs) -> Iterator[Bench]:
+    #Um step dos ambientes vetorizados avanca n_envs envs (ns por env-passo = ns_per_op / n_envs)
+    parity.verifica_farol()
+    parity.verifica_foraging()
+    for size, n in itertools.product(sizes, n_envs):
+        if n * size * size > VEC_MAX_CELLS:
+            continue
+        params = {"size": size, "n_envs": n}
+        yield "VecAmbienteFarol.step", params, _vec_step(VecAmbienteFarol(n, size, size, 0.12, seed=0, max_passos=150))
+        yield "VecAmbienteForagingNinho.step", params, _vec_step(
+            VecAmbienteForagingNinho(n, size, size, 0.12, 6, seed=0, max_passos=150))
+
+
+def all_benchmarks(quick: bool = False) -> Iterator[Bench]:
+    sizes = QUICK["MAP_SIZES"] if quick else MAP_SIZES
+    ratios = QUICK["OBSTACLE_RATIOS"] if quick else OBSTACLE_RATIOS
+    recursos = QUICK["N_RECURSOS"] if quick else N_RECURSOS
+    archives = QUICK["ARCHIVE_SIZES"] if quick else ARCHIVE_SIZES
+    vec_sizes = QUICK["VEC_SIZES"] if quick else VEC_SIZES
+    vec_n_envs = QUICK["VEC_N_ENVS"] if quick else VEC_N_ENVS
+    yield from sensor_benchmarks(sizes, ratios, recursos)
+    yield from nearest_food_benchmarks(sizes, recursos)
+    yield from distance_field_benchmarks(sizes, recursos)
+    yield from env_benchmarks(sizes, ratios, recursos)
+    yield from agent_benchmarks(sizes)
+    yield from novelty_benchmarks(archives)
+    yield from vec_benchmarks(vec_sizes, vec_n_envs)
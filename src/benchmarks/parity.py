@@ -0,0 +1,144 @@
+"""
+Paridade dos ambientes vetorizados com os escalares.
+
+VecAmbienteFarol / VecAmbienteForagingNinho correm ao lado de um AmbienteFarol /
+AmbienteForagingNinho por env (seed + i, os mesmos mapas) com as mesmas acoes aleatorias.
+Em cada passo comparam-se recompensas, posicoes, done/success, carrying/collected/deposited e
+os campos dos sensores (grelha 3x3, direcao/distancia ao objetivo, ao ninho e ao recurso mais
+proximo). Os envs que terminam sao reiniciados com reset(mask), por isso a sequencia de mapas
+tambem e comparada. Nos empates do recurso mais proximo os dois ambientes podem escolher recursos
+diferentes (ver VecAmbienteForagingNinho), por isso so a distancia food_dist e comparada.
+
+Os micro-benchmarks dos ambientes vetorizados correm esta verificacao antes de medir e
+tests/test_vec_parity.py corre-a com pytest.
+
+Uso (dentro de src/):
+    python -m benchmarks.parity [--envs 16] [--steps 400] [--seed 0]
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from sim.actions import ACTIONS
+from sim.agente_politica_fixa import AgentePoliticaFixa
+from sim.farol_ambiente import AmbienteFarol
+from sim.foraging_ninho_ambiente import AmbienteForagingNinho
+from sim.sensors.distance import DistanceSensor
+from sim.sensors.lighthouse_direction import LighthouseDirectionSensor
+from sim.sensors.local_grid import LocalGridSensor
+from sim.sensors.nearest_food import NearestFoodSensor
+from sim.sensors.nest_direction import NestDirectionSensor
+from sim.vec_farol_ambiente import VecAmbienteFarol
+from sim.vec_foraging_ninho_ambiente import VecAmbienteForagingNinho
+
+
+def _agente(sensores: list) -> AgentePoliticaFixa:
+    #So guarda os sensores e o carrying do ambiente escalar (as acoes vem do sorteio)
+    agente = AgentePoliticaFixa(seed=0)
+    agente._sensores = sensores
+    return agente
+
+
+def _igual(campo: str, i: int, passo: int, vec, escalar) -> None:
+    if vec != escalar:
+        raise AssertionError(f"{campo} diferente no env {i}, passo {passo}: vetorizado={vec} escalar={escalar}")
+
+
+def _rollout(vec, refs: list, agentes: list, passos: int, max_passos: int, seed: int, compara) -> int:
+    #Acoes aleatorias nos dois lados; devolve o nº de passos (env x passo) comparados
+    rng = np.random.default_rng(seed)
+    vec.reset()
+    for env, agente in zip(refs, agentes):
+        env.reset()
+        agente.carrying = False
+    steps = [0] * len(refs)
+    for passo in range(passos):
+        acoes = rng.integers(len(ACTIONS), size=len(refs))
+        vobs, recompensas, done, success = vec.step(acoes)
+        for i, (env, agente) in enumerate(zip(refs, agentes)):
+            obs, recompensa, terminou, _ = env.agir(ACTIONS[acoes[i]], agente)
+            steps[i] += 1
+            _igual("recompensa", i, passo, float(recompensas[i]), recompensa)
+            _igual("posicao", i, passo, tuple(vobs["agent"][i].tolist()), env.agent_pos)
+            _igual("done", i, passo, bool(done[i]), terminou or steps[i] >= max_passos)
+            _igual("success", i, passo, bool(success[i]), terminou)
+            _igual("cells", i, passo, vobs["cells"][i].ravel().tolist(), obs.cells)
+            compara(i, passo, vobs, obs, agente)
+        if done.any():
+            vec.reset(done)
+            for i in np.flatnonzero(done):
+                refs[i].reset()
+                # No vetorizado o carrying vive no ambiente e volta a False no reset
+                agentes[i].carrying = False
+                steps[i] = 0
+    return passos * len(refs)
+
+
+def pares_farol(n_envs: int, size: int, obstacle_ratio: float, seed: int, max_passos: int,
+                map_sampling: str = "vectorized"):
+    #VecAmbienteFarol e os AmbienteFarol equivalentes (com agentes que tem os mesmos sensores)
+    vec = VecAmbienteFarol(n_envs, size, size, obstacle_ratio, seed, max_passos, map_sampling)
+    refs = [AmbienteFarol(size, size, obstacle_ratio, seed + i, map_sampling=map_sampling) for i in range(n_envs)]
+    agentes = [_agente([LocalGridSensor(), LighthouseDirectionSensor(), DistanceSensor()]) for _ in range(n_envs)]
+    return vec, refs, agentes
+
+
+def pares_foraging(n_envs: int, size: int, obstacle_ratio: float, n_recursos: int, seed: int, max_passos: int,
+                   map_sampling: str = "vectorized"):
+    vec = VecAmbienteForagingNinho(n_envs, size, size, obstacle_ratio, n_recursos, seed, max_passos, map_sampling)
+    refs = [AmbienteForagingNinho(size, size, obstacle_ratio, n_recursos, seed + i, map_sampling=map_sampling)
+            for i in range(n_envs)]
+    agentes = [_agente([LocalGridSensor(), NearestFoodSensor(), NestDirectionSensor()]) for _ in range(n_envs)]
+    return vec, refs, agentes
+
+
+def verifica_farol(n_envs: int = 16, passos: int = 400, seed: int = 0, size: int = 8,
+                   obstacle_ratio: float = 0.18, max_passos: int = 40, map_sampling: str = "vectorized") -> int:
+    vec, refs, agentes = pares_farol(n_envs, size, obstacle_ratio, seed, max_passos, map_sampling)
+
+    def compara(i, passo, vobs, obs, agente):
+        _igual("goal", i, passo, tuple(vobs["goal"][i].tolist()), obs.goal)
+        _igual("goal_dx", i, passo, int(vobs["goal_dx"][i]), obs.goal_dx)
+        _igual("goal_dy", i, passo, int(vobs["goal_dy"][i]), obs.goal_dy)
+        _igual("manhattan", i, passo, int(vobs["manhattan"][i]), obs.manhattan)
+
+    return _rollout(vec, refs, agentes, passos, max_passos, seed, compara)
+
+
+def verifica_foraging(n_envs: int = 16, passos: int = 400, seed: int = 0, size: int = 8,
+                      obstacle_ratio: float = 0.12, n_recursos: int = 6, max_passos: int = 80,
+                      map_sampling: str = "vectorized") -> int:
+    vec, refs, agentes = pares_foraging(n_envs, size, obstacle_ratio, n_recursos, seed, max_passos, map_sampling)
+
+    def compara(i, passo, vobs, obs, agente):
+        _igual("carrying", i, passo, bool(vobs["carrying"][i]), agente.carrying)
+        _igual("collected", i, passo, int(vobs["collected"][i]), obs.collected)
+        _igual("deposited", i, passo, int(vobs["deposited"][i]), obs.deposited)
+        _igual("food_dist", i, passo, int(vobs["food_dist"][i]), obs.food_dist)
+        _igual("nest_dx", i, passo, int(vobs["nest_dx"][i]), obs.nest_dx)
+        _igual("nest_dy", i, passo, int(vobs["nest_dy"][i]), obs.nest_dy)
+
+    return _rollout(vec, refs, agentes, passos, max_passos, seed, compara)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Paridade dos ambientes vetorizados com os escalares")
+    parser.add_argument("--envs", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for sampling in ("vectorized", "rejection"):
+        n = verifica_farol(args.envs, args.steps, args.seed, map_sampling=sampling)
+        print(f"[PARITY] VecAmbienteFarol ({sampling}): {n} passos iguais")
+        n = verifica_foraging(args.envs, args.steps, args.seed, map_sampling=sampling)
+        # Mapa pequeno com poucos recursos: as acoes aleatorias chegam a entregar tudo (+50, success)
+        n += verifica_foraging(args.envs, args.steps, args.seed, size=5, obstacle_ratio=0.0, n_recursos=2,
+                               max_passos=200, map_sampling=sampling)
+        print(f"[PARITY] VecAmbienteForagingNinho ({sampling}): {n} passos iguais")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
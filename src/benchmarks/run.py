@@ -0,0 +1,85 @@
+"""
+Corre os benchmarks, grava JSON (com info da maquina) e compara com um baseline.
+
+Uso (dentro de src/):
+    python -m benchmarks.run [--suite micro|macro|all] [--quick] [--out outputs/benchmarks/latest.json]
+                             [--baseline benchmarks/baseline.json] [--threshold 1.25] [--save-baseline]
+
+Com --baseline, sai com codigo 1 se algum benchmark ficar mais de `threshold` vezes mais lento.
+Os tempos dependem da maquina: compara so com baselines gravados na mesma maquina.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks import macro, micro
+from benchmarks.harness import bench_name, compare, format_ns, measure, write_results
+
+
+def run(suite: str = "all", quick: bool = False, min_time: float = 0.2, repeat: int = 5,
+        episodes: int = 200, select: str = "", verbose: bool = True) -> list[dict]:
+    results = []
+    if suite in ("micro", "all"):
+        for group, params, fn in micro.all_benchmarks(quick):
+            if select and select not in group:
+                continue
+            r = {"suite": "micro", "group": group, "params": params,
+                 **measure(fn, min_time=min_time, repeat=repeat)}
+            results.append(r)
+            if verbose:
+                print(f"[micro] {bench_name(group, params):70s} {format_ns(r['ns_per_op']):>10s}/op")
+
+    if suite in ("macro", "all"):
+        for group, params, res in macro.all_benchmarks(quick, episodes):
+            if select and select not in group:
+                continue
+            r = {"suite": "macro", "group": group, "params": params, **res}
+            results.append(r)
+            if verbose:
+                print(f"[macro] {bench_name(group, params):70s} {format_ns(r['ns_per_op']):>10s}/episodio "
+                      f"| {r['steps_per_sec']:.0f} steps/s")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do simulador")
+    parser.add_argument("--suite", choices=["micro", "macro", "all"], default="all")
+    parser.add_argument("--quick", action="store_true", help="varrimentos reduzidos (para CI/iteracao rapida)")
+    parser.add_argument("--select", default="", help="so grupos cujo nome contem este texto")
+    parser.add_argument("--min-time", type=float, default=0.2, help="segundos por repeticao (micro)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--episodes", type=int, default=200, help="episodios por macro-benchmark")
+    parser.add_argument("--out", default="outputs/benchmarks/latest.json")
+    parser.add_argument("--baseline", default=None, help="JSON de resultados anteriores para comparar")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="regressao = ns_per_op > threshold * baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="grava tambem os resultados em --baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.suite, args.quick, args.min_time, args.repeat, args.episodes, args.select)
+    meta = {"suite": args.suite, "quick": args.quick}
+    payload = write_results(args.out, results, meta)
+    print(f"\n[BENCH] Resultados guardados em: {args.out}")
+
+    if not args.baseline:
+        return 0
+    if args.save_baseline:
+        write_results(args.baseline, results, meta)
+        print(f"[BENCH] Baseline guardado em: {args.baseline}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(payload, baseline, args.threshold)
+    regressions = [r for r in rows if r["regression"]]
+    print(f"\n=== COMPARACAO COM {args.baseline} (threshold x{args.threshold}) ===")
+    for r in sorted(rows, key=lambda r: -r["ratio"]):
+        flag = "REGRESSAO" if r["regression"] else ""
+        print(f"{r['name']:70s} {format_ns(r['baseline_ns']):>10s} -> {format_ns(r['current_ns']):>10s} "
+              f"x{r['ratio']:.2f} {flag}")
+    print(f"\n{len(regressions)} regressoes em {len(rows)} benchmarks comparados")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
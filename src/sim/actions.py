@@ -5,4 +5,12 @@ class Action(Enum):
     DOWN = "DOWN"
     LEFT = "LEFT"
     RIGHT = "RIGHT"
-    STAY = "STAY"
\ No newline at end of file
+    STAY = "STAY"
+
+
+#Ordem fixa das acoes para as representacoes indexadas (ambientes vetorizados, arrays)
+ACTIONS = [Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT, Action.STAY]
+ACTION_INDEX = {a: i for i, a in enumerate(ACTIONS)}
+#Deslocamento (dx, dy) de cada acao, pela mesma ordem de ACTIONS
+ACTION_DX = [0, 0, -1, 1, 0]
+ACTION_DY = [-1, 1, 0, 0, 0]
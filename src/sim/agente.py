@@ -1,13 +1,23 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Hashable, List, Optional, Tuple
 from sim.sensors.base import Sensor
+from sim.observation import Observation
+from sim.artifacts import ArtifactWriter, WriteFn, escreve_atomico, write_pickle
 
 class Agente(ABC):
     def __init__(self):
         self._sensores: List[Sensor] = []
-        self._ultima_obs: dict = {}
+        self._ultima_obs: Observation = Observation()
         self._ultima_recompensa: float = 0.0
+        # Observation reutilizada: o ambiente/sensores escrevem aqui em cada passo
+        self._obs_buf: Observation = Observation()
+        # Writer de artefactos instalado pelo motor (None = escrita sincrona, mas sempre atomica)
+        self.artefactos: Optional[ArtifactWriter] = None
+        # Indice do agente no motor/ambiente (posicao na grelha de ocupacao)
+        self.id: int = 0
+        # Mensagens enviadas neste passo: (mensagem, id do destinatario ou None = todos)
+        self._caixa_saida: List[Tuple[str, Optional[int]]] = []
 
     @staticmethod
     @abstractmethod
@@ -17,7 +27,10 @@ class Agente(ABC):
     def instala(self, sensor: Sensor) -> None:
         self._sensores.append(sensor)
 
-    def observacao(self, obs: dict) -> None:
+    def observacao(self, obs: Observation) -> None:
+        # Compatibilidade: ainda aceita o dict antigo
+        if isinstance(obs, dict):
+            obs = Observation.from_dict(obs)
         self._ultima_obs = obs
 
     @abstractmethod
@@ -29,3 +42,31 @@ class Agente(ABC):
 
     def comunica(self, mensagem: str, de_agente: "Agente") -> None:
         pass
+
+    def envia(self, mensagem: str, para: Optional[int] = None) -> None:
+        #Mensagem para o agente `para` (id) ou para todos; o motor entrega-as em lote no fim do passo
+        self._caixa_saida.append((mensagem, para))
+
+    def comunica_lote(self, mensagens: List[Tuple[str, "Agente"]]) -> None:
+        #Recebe todas as mensagens de um passo de uma vez; por omissao chama comunica para cada uma
+        for mensagem, de_agente in mensagens:
+            self.comunica(mensagem, de_agente)
+
+    def _escreve_artefacto(self, path: str, payload, write_fn: WriteFn = write_pickle,
+                           version: Optional[Hashable] = None) -> None:
+        #Guarda um artefacto pelo writer do motor (em background) ou diretamente
+        if self.artefactos is not None:
+            self.artefactos.submit(path, payload, write_fn, version=version)
+        else:
+            escreve_atomico(path, write_fn, payload)
+
+    def checkpoint_state(self) -> dict:
+        #Estado necessario para retomar o treino entre episodios (por omissao: so o RNG, se existir)
+        state = {}
+        if hasattr(self, "rng"):
+            state["rng"] = self.rng.getstate()
+        return state
+
+    def load_checkpoint_state(self, state: dict) -> None:
+        if "rng" in state:
+            self.rng.setstate(state["rng"])
@@ -1,10 +1,56 @@
 import json
 import random
 import pickle
-from collections import defaultdict
+import sys
+
+import numpy as np
 
 from sim.agente import Agente
 from sim.actions import Action
+from sim.observation import Observation, CELLS_LIVRES, CELL_UP, CELL_DOWN, CELL_LEFT, CELL_RIGHT
+from sim.artifacts import write_npy
+
+
+#Espaco de estados do Farol: goal_dx(3) x goal_dy(3) x bin da distancia(4) x 4 celulas livres/bloqueadas(2^4)
+N_STATES = 3 * 3 * 4 * 16
+Q_ACTIONS = [Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT]
+N_ACTIONS = len(Q_ACTIONS)
+
+
+def encode_state(gdx, gdy, dist_bin, up, down, left, right) -> int:
+    #Empacota o estado discreto num id inteiro (linha da Q-table densa)
+    return (((gdx + 1) * 3 + (gdy + 1)) * 4 + (dist_bin + 1)) * 16 + up * 8 + down * 4 + left * 2 + right
+
+
+def decode_state(state_id: int) -> tuple:
+    #Inverso de encode_state: devolve o tuplo (gdx, gdy, bin, up, down, left, right)
+    rest, cells = divmod(state_id, 16)
+    rest, dist_bin = divmod(rest, 4)
+    gdx, gdy = divmod(rest, 3)
+    return (gdx - 1, gdy - 1, dist_bin - 1, (cells >> 3) & 1, (cells >> 2) & 1, (cells >> 1) & 1, cells & 1)
+
+
+def q_from_dict(d: dict) -> np.ndarray:
+    #Converte uma Q-table antiga {(estado_tuplo, Action): q} para o array denso (N_STATES, N_ACTIONS)
+    q = np.zeros((N_STATES, N_ACTIONS))
+    for (state, action), value in d.items():
+        q[encode_state(*state), Q_ACTIONS.index(action)] = value
+    return q
+
+
+def q_to_dict(q: np.ndarray) -> dict:
+    #Formato antigo (so entradas nao nulas), para ferramentas que ainda leem o pickle
+    return {
+        (decode_state(s), Q_ACTIONS[a]): float(q[s, a])
+        for s, a in zip(*np.nonzero(q))
+    }
+
+
+def converte_q_pickle(src: str, dst: str) -> None:
+    #Converte uma Q-table guardada em pickle (formato antigo) para .npy
+    with open(src, "rb") as f:
+        d = pickle.load(f)
+    np.save(dst, q_from_dict(d))
 
 
 class AgenteLearning(Agente):
@@ -37,14 +83,15 @@ class AgenteLearning(Agente):
         self.mode = mode  # "train" | "test"
         self.qtable_path = qtable_path
 
-        # Q-table: usamos defaultdict(float) mas ao ler usamos get() para nao criar chaves sem querer
-        self.Q = defaultdict(float)
+        # Q-table densa: linha = id do estado (encode_state), coluna = indice da acao em self.actions
+        self.Q = np.zeros((N_STATES, N_ACTIONS))
 
         # Guardamos o (estado, acao) interior para fazer a atualização quando chega a recompensa
         self.prev_state = None
         self.prev_action = None
 
-        self.actions = [Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT]
+        self.actions = list(Q_ACTIONS)
+        self._action_idx = {a: i for i, a in enumerate(self.actions)}
 
         # No modo TEST, as vezes o agente pode cair em ciclos; guardamos estados recentes
         self._recent_states = []
@@ -69,15 +116,32 @@ class AgenteLearning(Agente):
         return AgenteLearning(seed=seed, learning=learning, mode=mode, qtable_path=qtable_path)
 
     def save_q(self, path: str) -> None:
-        #Guarda a Q-table no disco para reutilizacao no modo de teste
-        with open(path, "wb") as f:
-            pickle.dump(dict(self.Q), f)
+        #Guarda a Q-table no disco para reutilizacao no modo de teste (.npy; outro sufixo = pickle antigo)
+        if path.endswith(".npy"):
+            self._escreve_artefacto(path, np.array(self.Q), write_npy)
+            return
+        self._escreve_artefacto(path, q_to_dict(self.Q))
 
     def load_q(self, path: str) -> None:
-        #Carrega uma Q-table previamente treinada
+        #Carrega uma Q-table previamente treinada. Em TEST o .npy e memory-mapped (so leitura).
+        if path.endswith(".npy"):
+            self.Q = np.load(path, mmap_mode="r" if self.mode == "test" else None)
+            return
         with open(path, "rb") as f:
             d = pickle.load(f)
-        self.Q = defaultdict(float, d)
+        self.Q = q_from_dict(d)
+
+    def checkpoint_state(self) -> dict:
+        #Q-table + epsilon + RNG
+        state = super().checkpoint_state()
+        state["Q"] = np.array(self.Q)
+        state["epsilon"] = self.epsilon
+        return state
+
+    def load_checkpoint_state(self, state: dict) -> None:
+        super().load_checkpoint_state(state)
+        self.Q = np.array(state["Q"])
+        self.epsilon = float(state["epsilon"])
 
     def reset_episode(self):
         #Limpa vvariaveis temporarias do episodio
@@ -100,39 +164,36 @@ class AgenteLearning(Agente):
             return 1
         return 2
 
-    def _state_from_obs(self, obs: dict):
-       #Constroi um estado discreto a partir da observacao
-        gdx = int(obs.get("goal_dx", 0))
-        gdy = int(obs.get("goal_dy", 0))
-        manhattan_bin = self._bin_dist(obs.get("manhattan", None))
-
-        up = int(obs.get("cell_0_-1", 0))
-        down = int(obs.get("cell_0_1", 0))
-        left = int(obs.get("cell_-1_0", 0))
-        right = int(obs.get("cell_1_0", 0))
-
-        return (gdx, gdy, manhattan_bin, up, down, left, right)
+    def _state_from_obs(self, obs: Observation) -> int:
+       #Constroi um estado discreto a partir da observacao (id inteiro, ver encode_state)
+        cells = obs.cells if obs.cells is not None else CELLS_LIVRES
+        return encode_state(
+            obs.goal_dx or 0,
+            obs.goal_dy or 0,
+            self._bin_dist(obs.manhattan),
+            cells[CELL_UP],
+            cells[CELL_DOWN],
+            cells[CELL_LEFT],
+            cells[CELL_RIGHT],
+        )
 
 
     def _state_is_known(self, state) -> bool:
 
         #Consideramos um estado 'conhecido' se existir algum valor Q significativo
-
-        for a in self.actions:
-            if abs(self.Q.get((state, a), 0.0)) > 1e-9:
-                return True
-        return False
+        return bool(np.abs(self.Q[state]).max() > 1e-9)
 
     def _fallback_action_farol(self) -> Action:
         #Heurística de segurança (apenas em TEST): se o estado nao existir na Q-table, tenta aproximar do goal sem colidir.
         obs = self._ultima_obs
-        gdx = int(obs.get("goal_dx", 0))
-        gdy = int(obs.get("goal_dy", 0))
+        gdx = obs.goal_dx or 0
+        gdy = obs.goal_dy or 0
 
-        up = int(obs.get("cell_0_-1", 0))
-        down = int(obs.get("cell_0_1", 0))
-        left = int(obs.get("cell_-1_0", 0))
-        right = int(obs.get("cell_1_0", 0))
+        cells = obs.cells if obs.cells is not None else CELLS_LIVRES
+        up = cells[CELL_UP]
+        down = cells[CELL_DOWN]
+        left = cells[CELL_LEFT]
+        right = cells[CELL_RIGHT]
 
         candidates = []
 
@@ -172,14 +233,13 @@ class AgenteLearning(Agente):
 
     def _best_action(self, state):
      #Escolhe a melhor acao segundo a Q-table. Em caso de empate, faz um desempate “direcional” para reduzir loops.
-        qs = [(self.Q.get((state, a), 0.0), a) for a in self.actions]
-        max_q = max(q for q, _ in qs)
-        best_actions = [a for q, a in qs if q == max_q]
+        row = self.Q[state]
+        best_actions = [self.actions[i] for i in np.flatnonzero(row == row.max())]
 
         # Desempate: tenta aproximar do goal usando dx/dy
         obs = self._ultima_obs
-        gdx = int(obs.get("goal_dx", 0))
-        gdy = int(obs.get("goal_dy", 0))
+        gdx = obs.goal_dx or 0
+        gdy = obs.goal_dy or 0
 
         preferred = []
         if abs(gdx) >= abs(gdy):
@@ -225,7 +285,7 @@ class AgenteLearning(Agente):
 
             if self._recent_states.count(state) >= 3:
                 qs = sorted(
-                    [(self.Q.get((state, a), 0.0), a) for a in self.actions],
+                    zip(self.Q[state].tolist(), self.actions),
                     key=lambda x: x[0],
                     reverse=True
                 )
@@ -270,7 +330,16 @@ class AgenteLearning(Agente):
         r = float(recompensa)
         s2 = self._state_from_obs(self._ultima_obs)
 
-        max_next = max(self.Q.get((s2, a2), 0.0) for a2 in self.actions)
-        old = self.Q.get((s, a), 0.0)
+        a = self._action_idx[a]
+        max_next = self.Q[s2].max()
+        old = self.Q[s, a]
+
+        self.Q[s, a] = old + self.alpha * (r + self.gamma * max_next - old)
+
 
-        self.Q[(s, a)] = old + self.alpha * (r + self.gamma * max_next - old)
+if __name__ == "__main__":
+    # Conversor de Q-tables antigas: python -m sim.agente_Qlearning outputs/farol_q.pkl outputs/farol_q.npy
+    if len(sys.argv) != 3:
+        print("Uso: python -m sim.agente_Qlearning <qtable.pkl> <qtable.npy>")
+        sys.exit(1)
+    converte_q_pickle(sys.argv[1], sys.argv[2])
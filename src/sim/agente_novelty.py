@@ -5,8 +5,12 @@ import json
 from dataclasses import dataclass
 from typing import List, Tuple, Optional
 
+import numpy as np
+
 from sim.agente import Agente
 from sim.actions import Action
+from sim.observation import Observation, CELLS_LIVRES, CELL_UP, CELL_DOWN, CELL_LEFT, CELL_RIGHT
+from sim.novelty_archive import NoveltyArchive, knn_mean
 
 
 @dataclass
@@ -20,6 +24,9 @@ class NoveltyConfig:
     - random_policy_prob: probabilidade de gerar politica totalmente aleatoria (diversidade)
     - archive_max: limite de memoria do arquivo
     - elite_keep: nº maximo de elites guardadas (por novelty)
+    - population: nº de candidatos por geracao (0 = modo classico, uma politica por episodio)
+    - maps_per_candidate: nº de mapas em que cada candidato e avaliado (modo por geracoes)
+    - workers: nº de processos para avaliar a populacao (None = todos os CPUs)
     """
     k: int = 15
     archive_add_threshold: float = 0.6
@@ -27,6 +34,9 @@ class NoveltyConfig:
     random_policy_prob: float = 0.30
     archive_max: int = 800
     elite_keep: int = 25
+    population: int = 0
+    maps_per_candidate: int = 1
+    workers: Optional[int] = None
 
 
 class AgenteNovelty(Agente):
@@ -39,6 +49,8 @@ class AgenteNovelty(Agente):
     - Em paralelo, guardamos a melhor politica segundo um objective simples (depositar/colher)
       para depois usar em TEST/batch_eval.
 
+    Modos: "train" | "test" | "eval" (avalia um candidato fixo, usado no treino por geracoes).
+
     Decisões importantes:
     - Exploracao é decidida POR EPISODIO (nao por passo) para nao destruir trajetorias longas.
     - A politica é uma heuristica parametrizada por 4 pesos (pesos mudam por episódio).
@@ -65,6 +77,9 @@ class AgenteNovelty(Agente):
             random_policy_prob=float(novelty.get("random_policy_prob", 0.30)),
             archive_max=int(novelty.get("archive_max", 800)),
             elite_keep=int(novelty.get("elite_keep", 25)),
+            population=int(novelty.get("population", 0)),
+            maps_per_candidate=int(novelty.get("maps_per_candidate", 1)),
+            workers=novelty.get("workers", None),
         )
 
         self.actions = [Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT]
@@ -83,10 +98,14 @@ class AgenteNovelty(Agente):
         # Flag de exploracao por episódio (no treino)
         self._episode_explore = False
 
+        # Modo "eval": flag de exploracao imposta de fora e resultados (BD, objective) por episodio
+        self.eval_explore = False
+        self.eval_results: List[Tuple[Tuple[float, ...], float]] = []
+
         # Estruturas do Novelty Search:
-        # - archive: lista de comportamentos (BD) que foram suficientemente diferentes
+        # - archive: comportamentos (BD) que foram suficientemente diferentes, em matriz NumPy
         # - elites: top politicas segundo novelty (para gerar mutacoes)
-        self.archive: List[Tuple[Tuple[float, ...], List[float]]] = []
+        self.archive = NoveltyArchive()
         self.elites: List[Tuple[float, Tuple[float, ...], List[float]]] = []
 
         # Politica atual: 4 pesos que controlam heuristicas de decisao
@@ -123,21 +142,20 @@ class AgenteNovelty(Agente):
         """
         Guardar so a policy final que interessa para TEST/batch_eval.
         Isto evita depender do arquivo/elites no modo de teste.
+        So e escrita quando os pesos mudam (version), e o writer junta escritas seguidas.
         """
-        with open(path, "wb") as f:
-            pickle.dump({"weights": weights}, f)
+        self._escreve_artefacto(path, {"weights": list(weights)}, version=tuple(weights))
 
     def save_policy(self, path: str) -> None:
     #Guarda o estado completo (util para debug/analise), mas no teu fluxo normal o TEST so precisa da best-only.
         payload = {
             "weights": self.weights,
-            "archive": self.archive,
-            "elites": self.elites,
+            "archive": self.archive.to_list(),
+            "elites": list(self.elites),
             "best_obj_score": self.best_obj_score,
-            "best_weights": self.best_weights,
+            "best_weights": self.best_weights[:],
         }
-        with open(path, "wb") as f:
-            pickle.dump(payload, f)
+        self._escreve_artefacto(path, payload)
 
     def load_policy(self, path: str) -> None:
     #Carrega policy guardada. Suporta best-only e full payload.
@@ -147,17 +165,37 @@ class AgenteNovelty(Agente):
         # Formato simples: apenas pesos
         if isinstance(payload, dict) and "weights" in payload and "archive" not in payload:
             self.weights = payload["weights"]
-            self.archive = []
+            self.archive = NoveltyArchive()
             self.elites = []
             return
 
         # Formato completo
         self.weights = payload.get("weights", self._random_weights())
-        self.archive = payload.get("archive", [])
+        self.archive = NoveltyArchive.from_list(payload.get("archive", []))
         self.elites = payload.get("elites", [])
         self.best_obj_score = float(payload.get("best_obj_score", float("-inf")))
         self.best_weights = payload.get("best_weights", self.weights[:])
 
+    def checkpoint_state(self) -> dict:
+        #Arquivo, elites, politica atual e melhor politica + RNG
+        state = super().checkpoint_state()
+        state.update({
+            "weights": self.weights[:],
+            "archive": self.archive.to_list(),
+            "elites": list(self.elites),
+            "best_obj_score": self.best_obj_score,
+            "best_weights": self.best_weights[:],
+        })
+        return state
+
+    def load_checkpoint_state(self, state: dict) -> None:
+        super().load_checkpoint_state(state)
+        self.weights = state["weights"][:]
+        self.archive = NoveltyArchive.from_list(state["archive"])
+        self.elites = list(state["elites"])
+        self.best_obj_score = float(state["best_obj_score"])
+        self.best_weights = state["best_weights"][:]
+
     def reset_episode(self):
         # Reinicia variaveis do episodio e escolhe a politica a usar neste episodio.
         self._episode_steps = 0
@@ -172,6 +210,8 @@ class AgenteNovelty(Agente):
         # Exploracao por episodio
         p_explore_episode = 0.25
         self._episode_explore = (self.mode == "train" and self.rng.random() < p_explore_episode)
+        if self.mode == "eval":
+            self._episode_explore = self.eval_explore
 
         # Em treino, cada episodio pode experimentar uma politica diferente
         if self.mode == "train":
@@ -184,30 +224,72 @@ class AgenteNovelty(Agente):
         - calcula novelty e atualiza elites/arquivo
         - atualiza tambem a melhor politica segundo objective (para TEST)
         """
+        if self.mode == "eval" and self._end_obs is not None:
+            self.eval_results.append((
+                self._behavior_descriptor(self._end_obs, self._episode_steps),
+                self._objective_score(self._end_obs, self._episode_steps),
+            ))
+            return
         if self.mode != "train":
             return
         if self._end_obs is None:
             return
 
         bd = self._behavior_descriptor(self._end_obs, self._episode_steps)
+        obj = self._objective_score(self._end_obs, self._episode_steps)
+        self._integra(bd, obj, self.weights)
+
+        # Best-only para o TEST usar diretamente (so quando muda; a escrita e feita em background)
+        if self.policy_path:
+            self._save_best_only(self.policy_path, self.best_weights)
+
+    def _integra(self, bd: Tuple[float, ...], obj: float, weights: List[float]) -> None:
+        #Atualiza elites, arquivo e melhor politica com o resultado de uma politica avaliada
         nov = self._novelty_score(bd)
 
         # Guardamos elites com base em NOVELTY (diversidade)
-        self._update_elites(nov, bd, self.weights)
+        self._update_elites(nov, bd, weights)
 
         # Arquivo: guarda comportamentos suficientemente diferentes (ou arranque inicial)
         if nov >= self.cfg.archive_add_threshold or len(self.archive) < self.cfg.k:
-            self.archive.append((bd, self.weights[:]))
+            self.archive.add(bd, weights)
             if len(self.archive) > self.cfg.archive_max:
-                self.archive.pop(self.rng.randrange(len(self.archive)))
+                self.archive.remove(self.rng.randrange(len(self.archive)))
 
         # Separadamente, guardamos a melhor politica por OBJECTIVE (desempenho “pratico”)
-        obj = self._objective_score(self._end_obs, self._episode_steps)
         if obj > self.best_obj_score:
             self.best_obj_score = obj
-            self.best_weights = self.weights[:]
+            self.best_weights = list(weights)
+
+    # ----------------- treino por geracoes (populacao) -----------------
+
+    def sample_population(self, n: int) -> List[Tuple[List[float], bool, int]]:
+        """
+        Gera n candidatos (elites mutadas + aleatorias, como no modo classico).
+        Cada candidato leva a sua flag de exploracao e uma seed propria para o mapa/RNG,
+        tiradas do RNG do agente: a populacao so depende do estado do agente, nao dos workers.
+        """
+        p_explore_episode = 0.25
+        pop = []
+        for _ in range(n):
+            w = self._select_next_policy()
+            explore = self.rng.random() < p_explore_episode
+            seed = self.rng.randrange(2**31)
+            pop.append((w, explore, seed))
+        return pop
+
+    def merge_population(self, population, results) -> None:
+        """
+        Integra os resultados de uma geracao, pela ordem dos candidatos (deterministico).
+        results[i] e a lista de (BD, objective) do candidato i, um por mapa; usamos a media.
+        """
+        for (w, _, _), per_map in zip(population, results):
+            n = len(per_map)
+            bd = tuple(sum(x) / n for x in zip(*(b for b, _ in per_map)))
+            obj = sum(o for _, o in per_map) / n
+            self.weights = w
+            self._integra(bd, obj, w)
 
-        # Escreve sempre best-only para o TEST usar diretamente
         if self.policy_path:
             self._save_best_only(self.policy_path, self.best_weights)
 
@@ -216,7 +298,7 @@ class AgenteNovelty(Agente):
         self._episode_steps += 1
 
         # Guardar posicoes recentes para penalizar voltar atras (A-B-A)
-        pos = self._ultima_obs.get("agent", None)
+        pos = self._ultima_obs.agent
         self._prev_prev_pos = self._prev_pos
         self._prev_pos = pos
 
@@ -256,20 +338,21 @@ class AgenteNovelty(Agente):
         _, _, base_w = self.rng.choice(self.elites)
         return self._mutate(base_w)
 
-    def _policy_action(self, obs: dict) -> Action:
+    def _policy_action(self, obs: Observation) -> Action:
 
         # Fonte de verdade: estado interno (e fallback para obs, por segurança)
-        carrying = int(getattr(self, "carrying", obs.get("carrying", 0)))
+        carrying = int(getattr(self, "carrying", obs.carrying or 0))
 
-        food_dx = int(obs.get("food_dx", 0))
-        food_dy = int(obs.get("food_dy", 0))
-        nest_dx = int(obs.get("nest_dx", 0))
-        nest_dy = int(obs.get("nest_dy", 0))
+        food_dx = obs.food_dx or 0
+        food_dy = obs.food_dy or 0
+        nest_dx = obs.nest_dx or 0
+        nest_dy = obs.nest_dy or 0
 
-        up_block = int(obs.get("cell_0_-1", 0))
-        down_block = int(obs.get("cell_0_1", 0))
-        left_block = int(obs.get("cell_-1_0", 0))
-        right_block = int(obs.get("cell_1_0", 0))
+        cells = obs.cells if obs.cells is not None else CELLS_LIVRES
+        up_block = cells[CELL_UP]
+        down_block = cells[CELL_DOWN]
+        left_block = cells[CELL_LEFT]
+        right_block = cells[CELL_RIGHT]
 
         # Se estiver a transportar -> alvo e o ninho; senao -> alvo e comida
         tx, ty = (nest_dx, nest_dy) if carrying else (food_dx, food_dy)
@@ -301,7 +384,7 @@ class AgenteNovelty(Agente):
                 return (x - 1, y)
             return (x + 1, y)
 
-        cur_pos = obs.get("agent", None)
+        cur_pos = obs.agent
 
         def score(a: Action) -> float:
             s = 0.0
@@ -362,7 +445,7 @@ class AgenteNovelty(Agente):
 
         return best
 
-    def _behavior_descriptor(self, obs_end: dict, steps: int) -> Tuple[float, ...]:
+    def _behavior_descriptor(self, obs_end: Observation, steps: int) -> Tuple[float, ...]:
         """
         Descritor comportamental (BD) usado para novelty.
 
@@ -371,31 +454,30 @@ class AgenteNovelty(Agente):
         - steps normalizado (eficiencia)
         - distancia ao ninho no fim (se “acabou perdido” ou perto do objetivo)
         """
-        deposited = float(obs_end.get("deposited", 0))
-        collected = float(obs_end.get("collected", 0))
+        deposited = float(obs_end.deposited or 0)
+        collected = float(obs_end.collected or 0)
 
-        ndx = float(obs_end.get("nest_dx", 0))
-        ndy = float(obs_end.get("nest_dy", 0))
+        ndx = float(obs_end.nest_dx or 0)
+        ndy = float(obs_end.nest_dy or 0)
         dist_nest = abs(ndx) + abs(ndy)
         dist_nest_norm = dist_nest / 14.0  # normalização para grid 8x8 (máx ~14)
 
         steps_norm = float(steps) / 150.0
         return (deposited, collected, steps_norm, dist_nest_norm)
 
-    def _dist(self, a: Tuple[float, ...], b: Tuple[float, ...]) -> float:
-        return sum((x - y) ** 2 for x, y in zip(a, b)) ** 0.5
-
     def _novelty_score(self, bd: Tuple[float, ...]) -> float:
         """
         Novelty = media da distância aos k vizinhos mais proximos (arquivo + elites).
+        As distancias sao vetorizadas e os k vizinhos escolhidos com argpartition (sem ordenar tudo).
         Se ainda nao ha historico, devolvemos um valor alto para “seed” inicial do processo.
         """
-        pool = [x[0] for x in self.archive] + [e[1] for e in self.elites]
-        if not pool:
+        if not len(self.archive) and not self.elites:
             return 999.0
-        dists = sorted(self._dist(bd, other) for other in pool)
-        k = min(self.cfg.k, len(dists))
-        return sum(dists[:k]) / k
+        dists = self.archive.distances(bd)
+        if self.elites:
+            diff = np.asarray([e[1] for e in self.elites]) - np.asarray(bd, dtype=float)
+            dists = np.concatenate([dists, np.sqrt(np.einsum("ij,ij->i", diff, diff))])
+        return knn_mean(dists, self.cfg.k)
 
     def _update_elites(self, nov: float, bd: Tuple[float, ...], w: List[float]) -> None:
         #Mantem uma lista curta das politicas mais 'novas' (por novelty).
@@ -404,10 +486,10 @@ class AgenteNovelty(Agente):
         if len(self.elites) > self.cfg.elite_keep:
             self.elites = self.elites[: self.cfg.elite_keep]
 
-    def _objective_score(self, obs_end: dict, steps: int) -> float:
+    def _objective_score(self, obs_end: Observation, steps: int) -> float:
         #Objective simples para escolher a melhor policy para TEST
 
-        deposited = float(obs_end.get("deposited", 0))
-        collected = float(obs_end.get("collected", 0))
+        deposited = float(obs_end.deposited or 0)
+        collected = float(obs_end.collected or 0)
         steps_norm = float(steps) / 150.0
         return deposited * 1000.0 + collected * 10.0 - steps_norm
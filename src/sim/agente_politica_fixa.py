@@ -33,6 +33,18 @@ class AgentePoliticaFixa(Agente):
         seed = data.get("seed", 42)
         return AgentePoliticaFixa(seed=seed)
 
+    def checkpoint_state(self) -> dict:
+        #O contador de colisoes e o recurso transportado passam de um episodio para o outro
+        state = super().checkpoint_state()
+        state["blocked_streak"] = self.blocked_streak
+        state["carrying"] = self.carrying
+        return state
+
+    def load_checkpoint_state(self, state: dict) -> None:
+        super().load_checkpoint_state(state)
+        self.blocked_streak = int(state.get("blocked_streak", 0))
+        self.carrying = bool(state.get("carrying", False))
+
     def age(self) -> Action:
         #Escolhe uma acao que reduza a distancia ao Goal,se houver varios "candidatos" escolhe aleatoriamente
         obs = self._ultima_obs
@@ -42,18 +54,18 @@ class AgentePoliticaFixa(Agente):
             return self.rng.choice([Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT])
 
         #Escolha do alvvo com base no tipo de problema e no estado do agente.
-        if obs.get("carrying", False):
+        if obs.carrying:
             #Voltar ao ninho pra depositar
-            dx = obs.get("nest_dx", 0)
-            dy = obs.get("nest_dy", 0)
-        elif "food_dx" in obs:
+            dx = obs.nest_dx
+            dy = obs.nest_dy
+        elif obs.food_dx is not None:
             #Procurar recurso
-            dx = obs.get("food_dx", 0)
-            dy = obs.get("food_dy", 0)
+            dx = obs.food_dx
+            dy = obs.food_dy
         else:
             #Mover em direcao ao Goal (Caso do Farol)
-            dx = obs.get("goal_dx", 0)
-            dy = obs.get("goal_dy", 0)
+            dx = obs.goal_dx
+            dy = obs.goal_dy
         #Traduz dx/dy (-1,0,1) em acoes
         options = []
         if dx == 1:
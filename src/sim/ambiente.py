@@ -1,16 +1,263 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
 from sim.agente import Agente
+from sim.actions import Action
+from sim.grid import EMPTY, OBSTACLE, Grid
+from sim.observation import Observation
+
+#Geracao do mapa no reset: "vectorized" (um so sorteio sem reposicao na grelha) ou
+#"rejection" (sorteio celula a celula com random.Random, como nas versoes anteriores: mesmos mapas por seed)
+MAP_SAMPLING = ("vectorized", "rejection")
+#Mapas resolviveis (todos os alvos ligados a origem): "off", "redraw" (volta a sortear o mapa todo)
+#ou "repair" (move os alvos isolados para celulas livres da componente da origem)
+SOLVABLE = ("off", "redraw", "repair")
+#Nº maximo de mapas sorteados num reset ate haver um resolvivel
+MAX_TENTATIVAS = 1000
 
 class Ambiente(ABC):
+    def __init__(self):
+        # Nº total de invocacoes de sensores (exposto no summary do motor)
+        self.sensor_calls = 0
+        # Dirty tracking: True quando o estado mudou desde a ultima observacao calculada
+        self._dirty = True
+        # Posicao de cada agente (indexada por agente.id) e grelha de ocupacao width*height:
+        # ocupacao[y * width + x] = id do agente nessa celula ou -1 (colisoes e vizinhos em O(1))
+        self.posicoes: list[tuple[int, int]] = [(0, 0)]
+        self.ocupacao: list[int] = []
+        # Grelha do mapa (sim/grid.py), criada pelo ambiente quando sabe o tamanho
+        self.grid: Optional[Grid] = None
+        self.map_sampling = "vectorized"
+        self._obstacles: Optional[set] = None
+        # Banco de cenarios (sim/scenario_bank.py): com banco, o reset usa o layout do episodio cenario_i
+        self.cenarios = None
+        self.cenario_i = 0
+        # Mapas resolviveis (ver SOLVABLE) e contadores de mapas rejeitados / alvos movidos
+        self.solvable = "off"
+        self.mapas_rejeitados = 0
+        self.alvos_movidos = 0
+        self._rejeitados_reset = 0
+        self._movidos_reset = 0
+
+    def _cria_grelha(self, map_sampling: str, solvable: str = "off") -> None:
+        if map_sampling not in MAP_SAMPLING:
+            raise ValueError(f"map_sampling desconhecido: {map_sampling} (usa {' ou '.join(MAP_SAMPLING)})")
+        if solvable not in SOLVABLE:
+            raise ValueError(f"solvable desconhecido: {solvable} (usa {', '.join(SOLVABLE)})")
+        self.map_sampling = map_sampling
+        self.solvable = solvable
+        self.grid = Grid(self.width, self.height)
+
+    def _sorteia_mapa(self, n_obs: int) -> None:
+        """
+        Gera o mapa do episodio na grelha: a partir do banco de cenarios, celula a celula
+        (_reset_rejeicao) ou num so sorteio vetorizado (_monta_mapa). Com solvable, cada mapa
+        sorteado e verificado (componentes ligadas): com "redraw" e descartado se algum alvo nao
+        for alcancavel; com "repair" os alvos isolados mudam de celula e so e descartado se nao
+        couberem na componente da origem.
+        """
+        if self.cenarios is not None:
+            self.grid.clear()
+            self._monta_mapa(*self._proximo_cenario(), n_obs)
+            return
+        self._rejeitados_reset = 0
+        self._movidos_reset = 0
+        for _ in range(MAX_TENTATIVAS):
+            self.grid.clear()
+            if self.map_sampling == "rejection":
+                self._reset_rejeicao(n_obs)
+            else:
+                self._monta_mapa(*self.grid.sample(self._np_rng(), self._n_sorteio(n_obs)), n_obs)
+            if self.solvable == "off":
+                return
+            if self._repara() if self.solvable == "repair" else self._resolvivel():
+                return
+            self._rejeitados_reset += 1
+            self.mapas_rejeitados += 1
+        raise ValueError(f"Nenhum mapa resolvivel em {MAX_TENTATIVAS} tentativas "
+                         f"(obstacle_ratio={self.obstacle_ratio} demasiado alto para {self.width}x{self.height}?)")
+
+    def _resolvivel(self) -> bool:
+        #Todos os alvos (agentes, recursos) na mesma componente da origem (objetivo/ninho)
+        origem, alvos = self._alvos()
+        return self.grid.ligadas(origem, alvos)
+
+    def _repara(self) -> bool:
+        #Move os alvos isolados para celulas vazias (sorteadas) da componente da origem; False se nao couberem
+        origem, alvos = self._alvos()
+        g = self.grid
+        comp = g.componente(origem)
+        isolados = alvos[~comp[alvos]]
+        if not len(isolados):
+            return True
+        livres = comp & (np.frombuffer(g.buf, dtype=np.uint8) == EMPTY)
+        livres[origem] = False
+        livres[alvos] = False
+        cells = np.flatnonzero(livres)
+        if len(cells) < len(isolados):
+            return False
+        novas = self._np_rng().choice(cells, size=len(isolados), replace=False)
+        self._move_alvos([g.xy(k) for k in isolados.tolist()], [g.xy(k) for k in novas.tolist()])
+        self._movidos_reset += len(isolados)
+        self.alvos_movidos += len(isolados)
+        return True
+
+    def _move_alvos(self, de: list[tuple[int, int]], para: list[tuple[int, int]]) -> None:
+        #Muda de celula os agentes isolados (reset com solvable="repair")
+        w = self.width
+        for pos, nova in zip(de, para):
+            i = self.posicoes.index(pos)
+            self.ocupacao[pos[1] * w + pos[0]] = -1
+            self.ocupacao[nova[1] * w + nova[0]] = i
+            self.posicoes[i] = nova
+
+    def _np_rng(self) -> np.random.Generator:
+        #Gerador NumPy para o sorteio vetorizado, semeado pelo self.rng (o unico estado a guardar nos checkpoints)
+        return np.random.default_rng(self.rng.getrandbits(64))
+
+    def _proximo_cenario(self) -> tuple[np.ndarray, np.ndarray]:
+        #(xs, ys) do layout do proximo episodio do banco (volta ao inicio se o banco acabar)
+        row = self.cenarios[self.cenario_i % len(self.cenarios)].astype(np.int64)
+        self.cenario_i += 1
+        #As duas ultimas colunas sao os mapas rejeitados e os alvos movidos neste reset (solvable)
+        self.mapas_rejeitados += int(row[-2])
+        self.alvos_movidos += int(row[-1])
+        ys, xs = np.divmod(row[:-2], self.width)
+        return xs, ys
+
+    def layout(self) -> np.ndarray:
+        """
+        Celulas (y * width + x) do mapa atual pela ordem do sorteio do reset, seguidas do nº de
+        mapas rejeitados e de alvos movidos nesse reset, para o banco de cenarios.
+        """
+        return np.append(self._celulas_layout(), [self._rejeitados_reset, self._movidos_reset])
+
+    @property
+    def obstacles(self) -> set:
+        #Compatibilidade: obstaculos como set de (x, y), construido a partir da grelha uma vez por reset
+        if self._obstacles is None:
+            self._obstacles = set(self.grid.positions(OBSTACLE))
+        return self._obstacles
+
     @abstractmethod
-    def observacaoPara(self, agente: Agente) -> dict:
+    def observacaoPara(self, agente: Agente) -> Observation:
         raise NotImplementedError
 
     @abstractmethod
     def atualizacao(self) -> None:
+        #Quem altera o estado aqui tem de chamar marcaAlterado() para o motor voltar a observar
         raise NotImplementedError
 
     @abstractmethod
-    def agir(self, accao, agente: Agente) -> tuple[dict, float, bool, dict]:
+    def agir(self, accao, agente: Agente) -> tuple[Observation, float, bool, dict]:
+        #A observacao devolvida e a observacao pos-acao; o motor reutiliza-a no passo seguinte
         raise NotImplementedError
+
+    def terminado(self) -> bool:
+        #Fim do episodio para todos os agentes (com varios agentes, agir devolve o fim de cada um)
+        return False
+
+    def chave_estado(self, agente: Agente) -> int:
+        #Resumo do estado do agente para a detecao de episodios encravados (sim/stall.py): a posicao
+        x, y = self.posicoes[agente.id]
+        return y * self.width + x
+
+    def marcaAlterado(self) -> None:
+        self._dirty = True
+
+    def alterado(self) -> bool:
+        #Indica se a ultima observacao calculada ficou desatualizada
+        return self._dirty
+
+    def _sense(self, agente: Agente, pos) -> Observation:
+        #Corre os sensores do agente na Observation reutilizada e limpa o dirty flag
+        obs = agente._obs_buf
+        for s in agente._sensores:
+            s.sense_into(self, pos, obs)
+        self.sensor_calls += len(agente._sensores)
+        self._dirty = False
+        return obs
+
+    # ----------------- varios agentes (grelha de ocupacao) -----------------
+
+    @property
+    def agent_pos(self) -> tuple[int, int]:
+        #Compatibilidade: posicao do primeiro agente
+        return self.posicoes[0]
+
+    @agent_pos.setter
+    def agent_pos(self, pos: tuple[int, int]) -> None:
+        self._move_agente(0, pos)
+
+    def _coloca_agentes(self, posicoes: list[tuple[int, int]]) -> None:
+        #Novo episodio: so limpa as celulas ocupadas no episodio anterior (a grelha e alocada uma vez)
+        w = self.width
+        if len(self.ocupacao) != w * self.height:
+            self.ocupacao = [-1] * (w * self.height)
+        else:
+            for x, y in self.posicoes:
+                self.ocupacao[y * w + x] = -1
+        self.posicoes = list(posicoes)
+        for i, (x, y) in enumerate(self.posicoes):
+            self.ocupacao[y * w + x] = i
+
+    def _move_agente(self, i: int, pos: tuple[int, int]) -> None:
+        w = self.width
+        ox, oy = self.posicoes[i]
+        if self.ocupacao[oy * w + ox] == i:
+            self.ocupacao[oy * w + ox] = -1
+        self.posicoes[i] = pos
+        self.ocupacao[pos[1] * w + pos[0]] = i
+
+    def _retira_agente(self, i: int) -> None:
+        #O agente deixa de ocupar a celula (ex: chegou ao objetivo), mas mantem a posicao
+        x, y = self.posicoes[i]
+        if self.ocupacao[y * self.width + x] == i:
+            self.ocupacao[y * self.width + x] = -1
+
+    def ocupante(self, pos: tuple[int, int]) -> int:
+        #Id do agente na celula (-1 = livre ou fora do mapa)
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return -1
+        return self.ocupacao[y * self.width + x]
+
+    def vizinhos(self, pos: tuple[int, int]) -> int:
+        #Nº de agentes nas 8 celulas a volta de pos
+        ax, ay = pos
+        n = 0
+        for y in (ay - 1, ay, ay + 1):
+            for x in (ax - 1, ax, ax + 1):
+                if (x != ax or y != ay) and self.ocupante((x, y)) >= 0:
+                    n += 1
+        return n
+
+    def destino(self, pos: tuple[int, int], accao: Action) -> tuple[int, int]:
+        #Celula para onde a acao leva (a propria se bater no limite/obstaculo; ignora outros agentes)
+        x, y = pos
+        if accao == Action.UP:
+            y -= 1
+        elif accao == Action.DOWN:
+            y += 1
+        elif accao == Action.LEFT:
+            x -= 1
+        elif accao == Action.RIGHT:
+            x += 1
+        if self.grid.buf[(y + 1) * self.grid.stride + x + 1] == OBSTACLE:
+            return pos
+        return (x, y)
+
+    def _celulas_livres(self, n: int, exclude: set) -> list[tuple[int, int]]:
+        #n celulas distintas fora de exclude (para os agentes a partir do segundo)
+        if self.width * self.height - len(exclude) < n:
+            raise ValueError(f"Mapa {self.width}x{self.height} sem celulas livres para {n} agentes extra")
+        cells = []
+        exclude = set(exclude)
+        for _ in range(n):
+            p = self._random_cell(exclude=exclude)
+            exclude.add(p)
+            cells.append(p)
+        return cells
@@ -0,0 +1,230 @@
+"""
+Escrita de artefactos (policies, Q-tables, CSVs, checkpoints) fora do ciclo de treino.
+
+- Escrita atomica: escreve-se para um ficheiro temporario unico na mesma pasta e faz-se rename,
+  por isso quem le o ficheiro (ex: o TEST a meio de um treino) nunca apanha um artefacto a meio,
+  e dois processos a escrever o mesmo artefacto nao partilham o temporario. O artefacto fica com
+  as permissoes de um open() normal (as do ficheiro anterior, ou 0666 menos a umask).
+- Coalescencia: cada path guarda so o ultimo payload pendente e a thread escreve no maximo
+  uma vez a cada min_interval segundos; se chegarem varios payloads nesse intervalo, so o mais
+  recente vai para o disco. Com `version`, um payload igual ao ultimo submetido nem e agendado.
+- A escrita corre numa thread em background: submit nunca bloqueia no disco.
+  flush()/close() esperam que tudo o que esta pendente fique escrito (ex: no fim da corrida).
+- Blocos (append): as linhas por episodio do CSV/.bin (sim/metrics.py) sao acrescentadas ao
+  ficheiro pela mesma thread, por ordem e sem coalescencia. Em cada ronda os blocos sao escritos
+  antes dos artefactos, por isso um checkpoint no disco nunca aponta para linhas que ainda la nao estao.
+
+O writer pode ser copiado com pickle (o motor viaja entre processos no hyperband):
+antes de copiar faz flush e a thread volta a ser criada no primeiro submit.
+"""
+import csv
+import io
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+
+WriteFn = Callable[[Any, Any], None]
+
+#umask do processo (lido uma vez: os.umask so se consegue ler mudando-o)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_pickle(f, payload) -> None:
+    pickle.dump(payload, f)
+
+
+def write_npy(f, payload: np.ndarray) -> None:
+    np.save(f, payload)
+
+
+def write_bytes(f, payload: bytes) -> None:
+    f.write(payload)
+
+
+def write_csv(f, payload: tuple[list, list]) -> None:
+    #payload = (cabecalho, linhas)
+    header, rows = payload
+    buf = io.StringIO(newline="")
+    w = csv.writer(buf)
+    w.writerow(header)
+    w.writerows(rows)
+    f.write(buf.getvalue().encode("utf-8"))
+
+
+def escreve_atomico(path: str, write_fn: WriteFn, payload) -> None:
+    #Escreve para um ficheiro temporario (nome unico, mesma pasta) e so depois o renomeia para o destino
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write_fn(f, payload)
+        # mkstemp cria o temporario com 0600: fica com o modo do destino (ou o de um ficheiro novo)
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def escreve_bloco(path: str, offset: int, data: bytes) -> None:
+    """
+    Escreve data em path a partir de offset; o ficheiro e cortado nesse ponto (descarta as linhas
+    escritas depois de um checkpoint, ao retomar). offset 0 = ficheiro novo.
+    """
+    if offset == 0:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return
+    with open(path, "r+b") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(data)
+
+
+class ArtifactWriter:
+    #Fila de escritas atomicas, coalescidas por path, feitas numa thread em background
+    def __init__(self, background: bool = True, min_interval: float = 0.0):
+        self.background = background
+        self.min_interval = min_interval
+        self._init_runtime()
+
+    def _init_runtime(self) -> None:
+        self._cond = threading.Condition()
+        self._pending: dict[str, tuple[WriteFn, Any]] = {}
+        # Blocos por ordem de chegada: (path, offset, bytes)
+        self._blocos: list[tuple[str, int, bytes]] = []
+        self._versions: dict[str, Hashable] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+        self._closing = False
+        self._flushing = 0
+        self._last_write = float("-inf")
+        self._error: Optional[BaseException] = None
+        self.writes = 0
+
+    def submit(self, path: str, payload, write_fn: WriteFn = write_pickle,
+               version: Optional[Hashable] = None) -> bool:
+        """
+        Agenda a escrita de payload em path (o payload ja tem de ser uma copia: nao pode mudar depois).
+        Devolve False se version for igual a do ultimo payload submetido para esse path.
+        """
+        if version is not None and self._versions.get(path) == version:
+            return False
+        self._versions[path] = version
+        if not self.background:
+            escreve_atomico(path, write_fn, payload)
+            self.writes += 1
+            return True
+
+        with self._cond:
+            self._raise_error()
+            self._pending[path] = (write_fn, payload)
+            self._acorda()
+        return True
+
+    def append(self, path: str, offset: int, data: bytes) -> None:
+        #Agenda a escrita de um bloco em path a partir de offset (ver escreve_bloco); nunca e coalescido
+        if not self.background:
+            escreve_bloco(path, offset, data)
+            return
+        with self._cond:
+            self._raise_error()
+            self._blocos.append((path, offset, data))
+            self._acorda()
+
+    def _acorda(self) -> None:
+        #Chamar com o lock: cria a thread se preciso e avisa que ha trabalho
+        if self._thread is None:
+            self._closing = False
+            self._thread = threading.Thread(target=self._loop, name="ArtifactWriter", daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._blocos and not self._closing:
+                    self._cond.wait()
+                if not self._pending and not self._blocos:
+                    return
+                # Espera pelo fim do intervalo minimo, juntando entretanto os payloads que chegarem
+                while not self._closing and not self._flushing:
+                    left = self._last_write + self.min_interval - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch = self._pending
+                self._pending = {}
+                blocos = self._blocos
+                self._blocos = []
+                self._busy = True
+            try:
+                for path, offset, data in blocos:
+                    escreve_bloco(path, offset, data)
+                for path, (write_fn, payload) in batch.items():
+                    escreve_atomico(path, write_fn, payload)
+                    self.writes += 1
+            except BaseException as e:
+                self._error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._last_write = time.monotonic()
+                    self._cond.notify_all()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            e, self._error = self._error, None
+            raise e
+
+    def flush(self) -> None:
+        #Bloqueia ate todas as escritas pendentes estarem no disco
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._pending or self._blocos or self._busy:
+                    self._cond.wait()
+            finally:
+                self._flushing -= 1
+            self._raise_error()
+
+    def close(self) -> None:
+        #Flush + termina a thread (um submit posterior volta a cria-la)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            self._thread = None
+            self._raise_error()
+
+    def __getstate__(self) -> dict:
+        self.flush()
+        return {"background": self.background, "min_interval": self.min_interval,
+                "versions": dict(self._versions), "writes": self.writes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.background = state["background"]
+        self.min_interval = state["min_interval"]
+        self._init_runtime()
+        self._versions = state["versions"]
+        self.writes = state["writes"]
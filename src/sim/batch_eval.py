@@ -1,8 +1,12 @@
 import json
-import copy
 import math
 import os
-from sim.motor_de_simulacao import MotorDeSimulacao
+from sim.motor_de_simulacao import Config
+from sim.parallel_eval import configs_por_seed, run_eval
+
+OUT_DIR = "outputs/batch_eval"
+# Mapas de cada seed gerados uma vez e partilhados por todos os agentes avaliados
+SCENARIO_DIR = "outputs/scenarios"
 
 def mean(xs):
     return sum(xs) / len(xs) if xs else 0.0
@@ -13,27 +17,16 @@ def std(xs):
     m = mean(xs)
     return math.sqrt(sum((x - m) ** 2 for x in xs) / (len(xs) - 1))
 
-def run_many(params_path: str, seeds, label: str):
+def run_many(params_path: str, seeds, label: str, workers=None, chunksize=1):
+    #Avalia a mesma config em varias seeds, em paralelo (workers=None usa todos os CPUs)
     with open(params_path, "r", encoding="utf-8") as f:
-        base = json.load(f)
-
-    rates = []
-    tmp = "_tmp_params.json"
-
-    for s in seeds:
-        cfg = copy.deepcopy(base)
-        cfg["seed"] = int(s)
-
-        with open(tmp, "w", encoding="utf-8") as w:
-            json.dump(cfg, w, indent=2)
-
-        motor = MotorDeSimulacao.cria(tmp)
-        motor._verbose = False
-        summary = motor.executa()
-        rates.append(float(summary["success_rate"]))
+        base = Config.from_dict(json.load(f))
 
-    if os.path.exists(tmp):
-        os.remove(tmp)
+    name = os.path.splitext(os.path.basename(params_path))[0]
+    cfgs = configs_por_seed(base, seeds, out_dir=OUT_DIR, label=name,
+                            scenario_bank=base.scenario_bank or SCENARIO_DIR)
+    summaries = run_eval(cfgs, workers=workers, chunksize=chunksize)
+    rates = [float(s["success_rate"]) for s in summaries]
 
     print(f"{label}")
     print(f"n={len(seeds)} | success_rate mean={mean(rates):.4f} | std={std(rates):.4f}\n")
@@ -1,10 +1,10 @@
 
 import json
 import os
-import tempfile
 import statistics as stats
 
-from sim.motor_de_simulacao import MotorDeSimulacao
+from sim.motor_de_simulacao import Config
+from sim.parallel_eval import configs_por_seed, run_eval
 
 
 BASE_FIXED_JSON = "params/foraging_fixed.json"
@@ -15,31 +15,19 @@ NOVELTY_POLICY_PATH = "outputs/foraging_novelty_policy.pkl"
 N_SEEDS = 30
 SEEDS = list(range(100, 100 + N_SEEDS))
 OUT_DIR = "outputs/batch_eval"
+# Mapas de cada seed gerados uma vez e partilhados pelo fixed e pelo novelty
+SCENARIO_DIR = "outputs/scenarios"
 
+# nº de processos (None = todos os CPUs) e nº de seeds enviadas de cada vez a um worker
+WORKERS = None
+CHUNKSIZE = 1
 
 
-def _run_one(base_params: dict, seed: int) -> dict:
-    p = dict(base_params)
-    p["seed"] = seed
-    p["mode"] = "test"  # garantir test
-
-    # escrever params temporario
-    os.makedirs(OUT_DIR, exist_ok=True)
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False, encoding="utf-8") as f:
-        json.dump(p, f, ensure_ascii=False, indent=2)
-        tmp_path = f.name
-
-    try:
-        motor = MotorDeSimulacao.cria(tmp_path)
-        motor._verbose = False  # nao spammar terminal
-        summary = motor.executa()
-        summary["seed"] = seed
-        return summary
-    finally:
-        try:
-            os.remove(tmp_path)
-        except OSError:
-            pass
+def _run_many(base_params: dict, label: str) -> list[dict]:
+    base = Config.from_dict(base_params)
+    cfgs = configs_por_seed(base, SEEDS, out_dir=OUT_DIR, label=label, mode="test",  # garantir test
+                            scenario_bank=base.scenario_bank or SCENARIO_DIR)
+    return run_eval(cfgs, workers=WORKERS, chunksize=CHUNKSIZE)
 
 
 def _aggregate(rows: list[dict]) -> dict:
@@ -76,12 +64,12 @@ def main():
     base_novelty["policy_path"] = NOVELTY_POLICY_PATH
 
     # correr FIXED
-    fixed_rows = [_run_one(base_fixed, s) for s in SEEDS]
+    fixed_rows = _run_many(base_fixed, "foraging_fixed")
     fixed_agg = _aggregate(fixed_rows)
     _print_report("FORAGING FIXED / TEST", fixed_agg)
 
     # correr NOVELTY
-    novelty_rows = [_run_one(base_novelty, s) for s in SEEDS]
+    novelty_rows = _run_many(base_novelty, "foraging_novelty")
     novelty_agg = _aggregate(novelty_rows)
     _print_report("FORAGING NOVELTY / TEST", novelty_agg)
 
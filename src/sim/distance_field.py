@@ -0,0 +1,130 @@
+import heapq
+from collections import deque
+from typing import Iterable, Tuple
+
+import numpy as np
+
+
+class DistanceField:
+    """
+    Campo de distancias BFS (geodesicas, contornando obstaculos) a uma ou mais fontes.
+
+    - dist[y * width + x]: nº de passos ate a fonte mais proxima (-1 = inalcancavel ou obstaculo)
+    - owner: indice da fonte mais proxima de cada celula (para remover fontes)
+    - step(x, y): (dx, dy) do vizinho que mais aproxima da fonte; lookups O(1)
+
+    obstacles pode ser um iteravel de (x, y) ou uma mascara booleana NumPy (height, width).
+
+    remove_source(p) atualiza o campo de forma incremental: so as celulas cuja fonte mais
+    proxima era p sao recalculadas, a partir da fronteira com as regioes das outras fontes.
+    """
+
+    def __init__(self, width: int, height: int, obstacles, sources: Iterable[Tuple[int, int]]):
+        self.width = width
+        self.height = height
+        n = width * height
+        if isinstance(obstacles, np.ndarray):
+            # Mascara (height, width) de obstaculos, p.ex. grid.cells == OBSTACLE
+            self.free = bytearray((~obstacles).astype(np.uint8).tobytes())
+        else:
+            self.free = bytearray(b"\x01") * n
+            for x, y in obstacles:
+                self.free[y * width + x] = 0
+        self.dist = [-1] * n
+        self.owner = [-1] * n
+        self.sources: dict[Tuple[int, int], int] = {}
+        # Celulas de cada fonte (pode ter entradas antigas: confirmar com owner)
+        self._cells: dict[int, list[int]] = {}
+
+        queue = deque()
+        for i, (x, y) in enumerate(sources):
+            c = y * width + x
+            self.sources[(x, y)] = i
+            self._cells[i] = [c]
+            self.dist[c] = 0
+            self.owner[c] = i
+            queue.append(c)
+        self._bfs(queue)
+
+    def _neighbours(self, c: int):
+        w = self.width
+        x = c % w
+        if c >= w:
+            yield c - w
+        if c + w < len(self.dist):
+            yield c + w
+        if x > 0:
+            yield c - 1
+        if x < w - 1:
+            yield c + 1
+
+    def _bfs(self, queue: deque) -> None:
+        dist, owner, free, cells = self.dist, self.owner, self.free, self._cells
+        w = self.width
+        n = len(dist)
+        while queue:
+            c = queue.popleft()
+            d = dist[c] + 1
+            o = owner[c]
+            x = c % w
+            for nb in (c - w if c >= w else -1, c + w if c + w < n else -1,
+                       c - 1 if x > 0 else -1, c + 1 if x < w - 1 else -1):
+                if nb >= 0 and free[nb] and dist[nb] < 0:
+                    dist[nb] = d
+                    owner[nb] = o
+                    cells[o].append(nb)
+                    queue.append(nb)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def distance(self, x: int, y: int) -> int:
+        return self.dist[y * self.width + x]
+
+    def step(self, x: int, y: int) -> Tuple[int, int]:
+        #Direcao do proximo passo (UP, DOWN, LEFT, RIGHT em caso de empate); (0, 0) na fonte ou se inalcancavel
+        w = self.width
+        dist = self.dist
+        c = y * w + x
+        best = dist[c]
+        if best <= 0:
+            return 0, 0
+        if y > 0 and 0 <= dist[c - w] < best:
+            return 0, -1
+        if y < self.height - 1 and 0 <= dist[c + w] < best:
+            return 0, 1
+        if x > 0 and 0 <= dist[c - 1] < best:
+            return -1, 0
+        return 1, 0
+
+    def remove_source(self, p: Tuple[int, int]) -> None:
+        sid = self.sources.pop(p, None)
+        if sid is None:
+            return
+        dist, owner, free = self.dist, self.owner, self.free
+        region = [c for c in self._cells.pop(sid) if owner[c] == sid]
+        for c in region:
+            dist[c] = -1
+            owner[c] = -1
+        if not self.sources:
+            return
+
+        # Fronteira: vizinhos da regiao que continuam ligados a outra fonte, por ordem de distancia
+        heap = []
+        for c in region:
+            for nb in self._neighbours(c):
+                if dist[nb] >= 0:
+                    heap.append((dist[nb], nb))
+        heapq.heapify(heap)
+        cells = self._cells
+        while heap:
+            d, c = heapq.heappop(heap)
+            if d != dist[c]:
+                continue
+            o = owner[c]
+            for nb in self._neighbours(c):
+                if free[nb] and (dist[nb] < 0 or dist[nb] > d + 1):
+                    dist[nb] = d + 1
+                    owner[nb] = o
+                    cells[o].append(nb)
+                    heapq.heappush(heap, (d + 1, nb))
@@ -1,8 +1,14 @@
 import random
 from typing import Optional
+
+import numpy as np
+
 from sim.ambiente import Ambiente
 from sim.agente import Agente
 from sim.actions import Action
+from sim.grid import GOAL, OBSTACLE
+from sim.observation import Observation
+from sim.distance_field import DistanceField
 
 
 class AmbienteFarol(Ambiente):
@@ -17,46 +23,105 @@ class AmbienteFarol(Ambiente):
         -passo: -1
         -colisao: -5
 
+        Com varios agentes (n_agentes > 1), cada agente acaba quando chega ao objetivo (deixa de
+        ocupar a celula) e o episodio acaba quando todos chegaram. Mover para uma celula ocupada
+        por outro agente conta como colisao.
+
+        O mapa vive numa grelha uint8 (self.grid, com borda de obstaculos) partilhada por agir,
+        sensores e render_text; map_sampling escolhe como o reset sorteia o mapa (ver sim/ambiente.py).
+
         """
-    def __init__(self, width=8, height=8, obstacle_ratio=0.18, seed: Optional[int] = None):
+    def __init__(self, width=8, height=8, obstacle_ratio=0.18, seed: Optional[int] = None, n_agentes: int = 1,
+                 map_sampling: str = "vectorized", solvable: str = "off"):
+        super().__init__()
         self.width = width
         self.height = height
         self.obstacle_ratio = obstacle_ratio
         self.rng = random.Random(seed)
+        self._cria_grelha(map_sampling, solvable)
 
-        self.obstacles: set[tuple[int, int]] = set()
-        self.agent_pos: tuple[int, int] = (0, 0)
+        self.n_agentes = n_agentes
+        self.posicoes = [(0, 0)] * n_agentes
         self.goal: tuple[int, int] = (width - 1, height - 1)
+        #Ids dos agentes que ja chegaram ao objetivo neste episodio
+        self.chegaram: set[int] = set()
+        #Campo de distancias BFS ao objetivo (so e calculado se algum sensor o pedir)
+        self._campo_goal: Optional[DistanceField] = None
 
     def reset(self):
+        self.marcaAlterado()
+        self._sorteia_mapa(int(self.width * self.height * self.obstacle_ratio))
+        self.grid.set(*self.goal, GOAL)
+        self.chegaram = set()
+        self._campo_goal = None
+
+    def _n_sorteio(self, n_obs: int) -> int:
+        #Objetivo, agente, obstaculos e restantes agentes num so sorteio sem reposicao
+        return 2 + n_obs + self.n_agentes - 1
+
+    def _monta_mapa(self, xs, ys, n_obs: int) -> None:
+        #Mapa a partir das celulas sorteadas (ou do banco): objetivo, agente, obstaculos, restantes agentes
+        self.grid.cells[ys[2:2 + n_obs], xs[2:2 + n_obs]] = OBSTACLE
+        self._obstacles = None
+        self.goal, agent_pos = zip(xs[:2].tolist(), ys[:2].tolist())
+        outros = list(zip(xs[2 + n_obs:].tolist(), ys[2 + n_obs:].tolist()))
+        self._coloca_agentes([agent_pos] + outros)
+
+    def _celulas_layout(self) -> np.ndarray:
+        w = self.width
+        cells = [self.goal[1] * w + self.goal[0], self.posicoes[0][1] * w + self.posicoes[0][0]]
+        outros = [y * w + x for x, y in self.posicoes[1:]]
+        return np.concatenate([cells, np.flatnonzero(self.grid.cells == OBSTACLE), outros]).astype(np.int64)
+
+    def _alvos(self) -> tuple[int, np.ndarray]:
+        #O objetivo tem de ser alcancavel por todos os agentes
+        g = self.grid
+        return g.index(*self.goal), np.array([g.index(x, y) for x, y in self.posicoes])
+
+    def _reset_rejeicao(self, n_obs: int) -> None:
+        #Geracao celula a celula com self.rng (mapas iguais aos das versoes anteriores para a mesma seed)
         self.goal = self._random_cell()
-        self.agent_pos = self._random_cell(exclude={self.goal})
+        agent_pos = self._random_cell(exclude={self.goal})
 
         #Nao meter os obstaculos em cima do agente ou do goal
-        self.obstacles = set()
-        n_obs = int(self.width * self.height * self.obstacle_ratio)
-        forbidden = {self.goal, self.agent_pos}
+        obstacles = set()
+        forbidden = {self.goal, agent_pos}
 
-        while len(self.obstacles) < n_obs:
+        while len(obstacles) < n_obs:
             p = self._random_cell()
             if p not in forbidden:
-                self.obstacles.add(p)
-
-    def observacaoPara(self, agente: Agente) -> dict:
-        #Constroi a observacao do agente a partir dos sensores
-        obs = {}
-        for s in agente._sensores:
-            obs.update(s.sense(self, self.agent_pos))
-        obs["agent"] = self.agent_pos
-        obs["goal"] = self.goal
+                obstacles.add(p)
+        self.grid.fill(obstacles, OBSTACLE)
+        self._obstacles = obstacles
+
+        #Restantes agentes (depois do mapa, para o 1o agente e o mapa serem os mesmos com qualquer n_agentes)
+        outros = self._celulas_livres(self.n_agentes - 1, forbidden | obstacles) if self.n_agentes > 1 else []
+        self._coloca_agentes([agent_pos] + outros)
+
+    def observacaoPara(self, agente: Agente) -> Observation:
+        #Constroi a observacao do agente a partir dos sensores (na Observation reutilizada do agente)
+        pos = self.posicoes[agente.id]
+        obs = self._sense(agente, pos)
+        obs.agent = pos
+        obs.goal = self.goal
         return obs
 
+    def campo_goal(self) -> DistanceField:
+        #Distancias BFS ao objetivo, calculadas uma vez por reset
+        if self._campo_goal is None:
+            self._campo_goal = DistanceField(self.width, self.height, self.grid.cells == OBSTACLE, [self.goal])
+        return self._campo_goal
+
+    def terminado(self) -> bool:
+        return len(self.chegaram) == self.n_agentes
+
     def atualizacao(self) -> None:
         return
 
     def agir(self, accao: Action, agente: Agente):
         #Aplica a acao do Agente. Inclui success de forma explicita.
-        ax, ay = self.agent_pos
+        i = agente.id
+        ax, ay = self.posicoes[i]
         nx, ny = ax, ay
 
         #Propor nova posicao
@@ -69,23 +134,30 @@ class AmbienteFarol(Ambiente):
         elif accao == Action.RIGHT:
             nx += 1
 
-        #Validar o movimento
+        #Validar o movimento (a borda da grelha conta como obstaculo: fora do mapa tambem bloqueia)
         blocked = False
-        if not (0 <= nx < self.width and 0 <= ny < self.height):
-            blocked = True
-        elif (nx, ny) in self.obstacles:
+        if self.grid.buf[(ny + 1) * self.grid.stride + nx + 1] == OBSTACLE:
             blocked = True
+        elif self.n_agentes > 1 and self.ocupacao[ny * self.width + nx] not in (-1, i):
+            blocked = True  # outro agente
         #Reward base por passo e colisao
         if blocked:
             recompensa = -5.0
             nx, ny = ax, ay
         else:
             recompensa = -1.0
+        #Atualiza a posicao e a grelha de ocupacao
+        if nx != ax or ny != ay:
+            w = self.width
+            self.ocupacao[ay * w + ax] = -1
+            self.ocupacao[ny * w + nx] = i
+            self.posicoes[i] = (nx, ny)
         #Condicao de termino
-        self.agent_pos = (nx, ny)
-        terminou = (self.agent_pos == self.goal)
+        terminou = ((nx, ny) == self.goal)
         if terminou:
             recompensa = 100.0
+            self.chegaram.add(i)
+            self._retira_agente(i)
 
         #Debug
         info = {"blocked": blocked, "success": terminou}
@@ -95,21 +167,7 @@ class AmbienteFarol(Ambiente):
 
     def render_text(self) -> str:
         #Representacao textual do mapa
-        rows = []
-        for y in range(self.height):
-            row = []
-            for x in range(self.width):
-                p = (x, y)
-                if p == self.agent_pos:
-                    row.append("A")
-                elif p == self.goal:
-                    row.append("G")
-                elif p in self.obstacles:
-                    row.append("#")
-                else:
-                    row.append(".")
-            rows.append(" ".join(row))
-        return "\n".join(rows)
+        return self.grid.render(self.posicoes)
 
     def _random_cell(self, exclude: Optional[set[tuple[int, int]]] = None):
         #Escolhe uma celula que nao esteja no set de celulas de exclusao.
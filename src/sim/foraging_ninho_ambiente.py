@@ -1,9 +1,15 @@
 import random
 from typing import Optional
 
+import numpy as np
+
 from sim.ambiente import Ambiente
 from sim.agente import Agente
 from sim.actions import Action
+from sim.grid import EMPTY, NEST, OBSTACLE, RESOURCE
+from sim.observation import Observation
+from sim.resource_index import ResourceIndex
+from sim.distance_field import DistanceField
 
 
 class AmbienteForagingNinho(Ambiente):
@@ -21,6 +27,14 @@ class AmbienteForagingNinho(Ambiente):
     -passo: -1
     -colisao: -5
     -entregar todos os recursos: +50
+
+    Com varios agentes (n_agentes > 1), cada um transporta o seu recurso, os contadores sao
+    partilhados (com copia por agente em coletados_agente/depositados_agente) e mover para uma
+    celula ocupada por outro agente conta como colisao.
+
+    Obstaculos, recursos e ninho vivem na grelha uint8 self.grid (com borda de obstaculos);
+    self.recursos continua a ser o set dos recursos por apanhar. map_sampling escolhe como o
+    reset sorteia o mapa (ver sim/ambiente.py).
     """
     def __init__(
         self,
@@ -28,70 +42,95 @@ class AmbienteForagingNinho(Ambiente):
         height=8,
         obstacle_ratio=0.12,
         n_recursos=6,
-        seed: Optional[int] = None
+        seed: Optional[int] = None,
+        n_agentes: int = 1,
+        map_sampling: str = "vectorized",
+        solvable: str = "off"
     ):
+        super().__init__()
         self.width = width
         self.height = height
         self.obstacle_ratio = obstacle_ratio
         self.n_recursos = n_recursos
         self.rng = random.Random(seed)
+        self._cria_grelha(map_sampling, solvable)
 
         #Elementos do mapa
-        self.obstacles: set[tuple[int, int]] = set()
         self.recursos: set[tuple[int, int]] = set()
+        #Recursos pela ordem em que foram postos no reset (para o layout do banco de cenarios)
+        self._ordem_recursos: list[tuple[int, int]] = []
+        #Indice espacial dos recursos para o NearestFoodSensor (None = poucos recursos, procura linear)
+        self.indice_recursos: Optional[ResourceIndex] = None
+        #Campos de distancias BFS ao ninho e aos recursos (so sao calculados se algum sensor os pedir)
+        self._campo_ninho: Optional[DistanceField] = None
+        self._campo_recursos: Optional[DistanceField] = None
         self.ninho: tuple[int, int] = (0, 0)
-        self.agent_pos: tuple[int, int] = (0, 0)
+        self.n_agentes = n_agentes
+        self.posicoes = [(0, 0)] * n_agentes
 
         #Contadores agregados (usados para metricas e condicao de sucesso)
         self.coletados = 0
         self.depositados = 0
+        self.coletados_agente = [0] * n_agentes
+        self.depositados_agente = [0] * n_agentes
 
     def reset(self):
+        self.marcaAlterado()
         self.coletados = 0
         self.depositados = 0
+        self.coletados_agente = [0] * self.n_agentes
+        self.depositados_agente = [0] * self.n_agentes
 
-        #Posicao inicial do agente e do ninho
-        self.agent_pos = self._random_cell()
-        self.ninho = self._random_cell(exclude={self.agent_pos})
-
-        # obstáculos
-        self.obstacles = set()
-        n_obs = int(self.width * self.height * self.obstacle_ratio)
-        forbidden = {self.agent_pos, self.ninho}
+        self._sorteia_mapa(int(self.width * self.height * self.obstacle_ratio))
+        self.grid.set(*self.ninho, NEST)
 
-        while len(self.obstacles) < n_obs:
-            p = self._random_cell()
-            if p not in forbidden:
-                self.obstacles.add(p)
+        self.indice_recursos = None
+        if len(self.recursos) >= ResourceIndex.MIN_SIZE:
+            self.indice_recursos = ResourceIndex(self.recursos, self.width, self.height)
+        self._campo_ninho = None
+        self._campo_recursos = None
 
-        # recursos(F)
-        self.recursos = set()
-        forbidden2 = forbidden | self.obstacles
-        while len(self.recursos) < self.n_recursos:
-            p = self._random_cell()
-            if p not in forbidden2:
-                self.recursos.add(p)
-
-    def observacaoPara(self, agente: Agente) -> dict:
+    def observacaoPara(self, agente: Agente) -> Observation:
         #Constroi a observacao do agente. A observacao contem sensores,estado interno e contadores(collected/deposited)
-        obs = {}
-        for s in agente._sensores:
-            obs.update(s.sense(self, self.agent_pos))
+        pos = self.posicoes[agente.id]
+        obs = self._sense(agente, pos)
         #Posicao do agente
-        obs["agent"] = self.agent_pos
+        obs.agent = pos
         #Estado interno do agente
-        obs["carrying"] = bool(getattr(agente, "carrying", False))
+        obs.carrying = bool(getattr(agente, "carrying", False))
         #Contaadores
-        obs["collected"] = self.coletados
-        obs["deposited"] = self.depositados
+        obs.collected = self.coletados
+        obs.deposited = self.depositados
         return obs
 
+    def chave_estado(self, agente: Agente) -> int:
+        #Posicao, recurso transportado e recursos por apanhar (apanhar ou depositar muda a chave)
+        carrying = bool(getattr(agente, "carrying", False))
+        return super().chave_estado(agente) + self.width * self.height * (carrying + 2 * len(self.recursos))
+
+    def campo_ninho(self) -> DistanceField:
+        #Distancias BFS ao ninho, calculadas uma vez por reset
+        if self._campo_ninho is None:
+            self._campo_ninho = DistanceField(self.width, self.height, self.grid.cells == OBSTACLE, [self.ninho])
+        return self._campo_ninho
+
+    def campo_recursos(self) -> DistanceField:
+        #Distancias BFS ao recurso mais proximo (multi-fonte); agir remove a fonte quando o recurso e apanhado
+        if self._campo_recursos is None:
+            self._campo_recursos = DistanceField(self.width, self.height, self.grid.cells == OBSTACLE,
+                                                 self.recursos)
+        return self._campo_recursos
+
+    def terminado(self) -> bool:
+        return self.depositados == self.n_recursos
+
     def atualizacao(self) -> None:
         return
 
     def agir(self, accao: Action, agente: Agente):
         #Aplica a acao do agente
-        ax, ay = self.agent_pos
+        i = agente.id
+        ax, ay = self.posicoes[i]
         nx, ny = ax, ay
 
         #Propor nova posicao
@@ -99,32 +138,48 @@ class AmbienteForagingNinho(Ambiente):
         elif accao == Action.DOWN: ny += 1
         elif accao == Action.LEFT: nx -= 1
         elif accao == Action.RIGHT: nx += 1
-        #Verificar colisoes
+        #Verificar colisoes (a borda da grelha conta como obstaculo: fora do mapa tambem bloqueia)
+        buf = self.grid.buf
+        k = (ny + 1) * self.grid.stride + nx + 1
         blocked = False
-        if not (0 <= nx < self.width and 0 <= ny < self.height):
-            blocked = True
-        elif (nx, ny) in self.obstacles:
+        if buf[k] == OBSTACLE:
             blocked = True
+        elif self.n_agentes > 1 and self.ocupacao[ny * self.width + nx] not in (-1, i):
+            blocked = True  # outro agente
         #Reward base do passo
         recompensa = -1.0
         #Penalizacao por tentativa invalida, mantem posicao
         if blocked:
             recompensa = -5.0
             nx, ny = ax, ay
+            k = (ny + 1) * self.grid.stride + nx + 1
         #Atualiza posicao
-        self.agent_pos = (nx, ny)
+        pos = (nx, ny)
+        #Atualiza a posicao e a grelha de ocupacao
+        if nx != ax or ny != ay:
+            w = self.width
+            self.ocupacao[ay * w + ax] = -1
+            self.ocupacao[ny * w + nx] = i
+            self.posicoes[i] = pos
 
         # recolher recurso
-        if not agente.carrying and self.agent_pos in self.recursos:
-            self.recursos.remove(self.agent_pos)
+        if not agente.carrying and buf[k] == RESOURCE:
+            buf[k] = EMPTY
+            self.recursos.remove(pos)
+            if self.indice_recursos is not None:
+                self.indice_recursos.remove(pos)
+            if self._campo_recursos is not None:
+                self._campo_recursos.remove_source(pos)
             agente.carrying = True
             self.coletados += 1
+            self.coletados_agente[i] += 1
             recompensa += 20.0
 
         # depositar no ninho
-        if agente.carrying and self.agent_pos == self.ninho:
+        if agente.carrying and pos == self.ninho:
             agente.carrying = False
             self.depositados += 1
+            self.depositados_agente[i] += 1
             recompensa += 30.0
         #Criterio de termino/sucesso
         terminou = (self.depositados == self.n_recursos)
@@ -140,25 +195,92 @@ class AmbienteForagingNinho(Ambiente):
         obs = self.observacaoPara(agente)
         return obs, recompensa, terminou, info
 
+    def _n_sorteio(self, n_obs: int) -> int:
+        #Agente, ninho, obstaculos, recursos e restantes agentes num so sorteio sem reposicao
+        return 2 + n_obs + self.n_recursos + self.n_agentes - 1
+
+    def _monta_mapa(self, xs, ys, n_obs: int) -> None:
+        #Mapa a partir das celulas sorteadas (ou do banco): agente, ninho, obstaculos, recursos, restantes agentes
+        grid = self.grid
+        fim = 2 + n_obs + self.n_recursos
+        grid.cells[ys[2:2 + n_obs], xs[2:2 + n_obs]] = OBSTACLE
+        self._obstacles = None
+        rx, ry = xs[2 + n_obs:fim], ys[2 + n_obs:fim]
+        grid.cells[ry, rx] = RESOURCE
+        self._ordem_recursos = list(zip(rx.tolist(), ry.tolist()))
+        self.recursos = set(self._ordem_recursos)
+        agent_pos, self.ninho = zip(xs[:2].tolist(), ys[:2].tolist())
+        outros = list(zip(xs[fim:].tolist(), ys[fim:].tolist()))
+        self._coloca_agentes([agent_pos] + outros)
+
+    def _celulas_layout(self) -> np.ndarray:
+        #Recursos pela ordem de insercao no set: o banco reproduz tambem a ordem de iteracao (desempates)
+        w = self.width
+        cells = [self.posicoes[0][1] * w + self.posicoes[0][0], self.ninho[1] * w + self.ninho[0]]
+        recursos = [y * w + x for x, y in self._ordem_recursos]
+        outros = [y * w + x for x, y in self.posicoes[1:]]
+        return np.concatenate([cells, np.flatnonzero(self.grid.cells == OBSTACLE), recursos, outros]).astype(np.int64)
+
+    def _alvos(self) -> tuple[int, np.ndarray]:
+        #Todos os agentes e todos os recursos tem de estar ligados ao ninho
+        g = self.grid
+        agentes = [g.index(x, y) for x, y in self.posicoes]
+        recursos = np.flatnonzero(np.frombuffer(g.buf, dtype=np.uint8) == RESOURCE)
+        return g.index(*self.ninho), np.concatenate([agentes, recursos]).astype(np.int64)
+
+    def _move_alvos(self, de: list[tuple[int, int]], para: list[tuple[int, int]]) -> None:
+        #Recursos isolados mudam de celula na grelha e na ordem de insercao (o set e refeito); o resto sao agentes
+        g = self.grid
+        movidos = {}
+        agentes_de, agentes_para = [], []
+        for pos, nova in zip(de, para):
+            if g.get(*pos) == RESOURCE:
+                g.set(*pos, EMPTY)
+                g.set(*nova, RESOURCE)
+                movidos[pos] = nova
+            else:
+                agentes_de.append(pos)
+                agentes_para.append(nova)
+        if movidos:
+            self._ordem_recursos = [movidos.get(p, p) for p in self._ordem_recursos]
+            self.recursos = set(self._ordem_recursos)
+        super()._move_alvos(agentes_de, agentes_para)
+
     def render_text(self) -> str:
         #Representacao textual do mapa (grelha)
-        rows = []
-        for y in range(self.height):
-            row = []
-            for x in range(self.width):
-                p = (x, y)
-                if p == self.agent_pos:
-                    row.append("A")
-                elif p == self.ninho:
-                    row.append("N")
-                elif p in self.obstacles:
-                    row.append("#")
-                elif p in self.recursos:
-                    row.append("F")
-                else:
-                    row.append(".")
-            rows.append(" ".join(row))
-        return "\n".join(rows)
+        return self.grid.render(self.posicoes)
+
+    def _reset_rejeicao(self, n_obs: int) -> None:
+        #Geracao celula a celula com self.rng (mapas iguais aos das versoes anteriores para a mesma seed)
+        #Posicao inicial do agente e do ninho
+        agent_pos = self._random_cell()
+        self.ninho = self._random_cell(exclude={agent_pos})
+
+        # obstáculos
+        obstacles = set()
+        forbidden = {agent_pos, self.ninho}
+
+        while len(obstacles) < n_obs:
+            p = self._random_cell()
+            if p not in forbidden:
+                obstacles.add(p)
+        self.grid.fill(obstacles, OBSTACLE)
+        self._obstacles = obstacles
+
+        # recursos(F)
+        self.recursos = set()
+        self._ordem_recursos = []
+        forbidden2 = forbidden | obstacles
+        while len(self.recursos) < self.n_recursos:
+            p = self._random_cell()
+            if p not in forbidden2 and p not in self.recursos:
+                self.recursos.add(p)
+                self._ordem_recursos.append(p)
+        self.grid.fill(self.recursos, RESOURCE)
+
+        #Restantes agentes (depois do mapa, para o 1o agente e o mapa serem os mesmos com qualquer n_agentes)
+        outros = self._celulas_livres(self.n_agentes - 1, forbidden2 | self.recursos) if self.n_agentes > 1 else []
+        self._coloca_agentes([agent_pos] + outros)
 
     def _random_cell(self, exclude: Optional[set[tuple[int, int]]] = None):
         exclude = exclude or set()
@@ -0,0 +1,176 @@
+"""
+Grelha do mapa guardada num array (uint8 por celula), partilhada por ambientes, sensores e render.
+
+A grelha tem uma borda de 1 celula marcada como OBSTACLE, por isso "fora do mapa" e "obstaculo"
+sao o mesmo teste e os passos nao precisam de verificar limites. Os dados vivem num bytearray
+(indexacao escalar rapida no ciclo do passo) e `array`/`cells` sao vistas NumPy sobre a mesma
+memoria (geracao vetorizada do mapa, copias para os ambientes vetorizados, mascaras).
+"""
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+#Tipos de celula
+EMPTY = 0
+OBSTACLE = 1
+RESOURCE = 2
+NEST = 3
+GOAL = 4
+
+SYMBOLS = np.array([".", "#", "F", "N", "G"])
+
+#Ate este tamanho do buffer, ligadas usa um flood fill em Python (mais rapido do que componentes)
+BFS_MAX = 400
+
+
+class Grid:
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        #Indice de (x, y) no buffer: (y + 1) * stride + x + 1
+        self.stride = width + 2
+        self.buf = bytearray((width + 2) * (height + 2))
+        self._views()
+        self.clear()
+
+    def _views(self) -> None:
+        self.array = np.frombuffer(self.buf, dtype=np.uint8).reshape(self.height + 2, self.width + 2)
+        self.cells = self.array[1:-1, 1:-1]
+
+    def clear(self) -> None:
+        #Tudo vazio, com a borda como obstaculo
+        self.array[:] = OBSTACLE
+        self.cells[:] = EMPTY
+
+    def index(self, x: int, y: int) -> int:
+        return (y + 1) * self.stride + x + 1
+
+    def xy(self, k: int) -> tuple[int, int]:
+        #Inverso de index
+        y, x = divmod(k, self.stride)
+        return x - 1, y - 1
+
+    def get(self, x: int, y: int) -> int:
+        return self.buf[(y + 1) * self.stride + x + 1]
+
+    def set(self, x: int, y: int, value: int) -> None:
+        self.buf[(y + 1) * self.stride + x + 1] = value
+
+    def positions(self, value: int) -> list[tuple[int, int]]:
+        #Celulas com este tipo, como (x, y)
+        ys, xs = np.nonzero(self.cells == value)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def sample(self, rng: np.random.Generator, n: int,
+               exclude: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        n celulas distintas, sorteadas de uma vez (sem reposicao) entre as celulas vazias
+        e fora de exclude (mascara (height, width)). Devolve (xs, ys).
+        """
+        livres = self.cells == EMPTY
+        if exclude is not None:
+            livres &= ~exclude
+        flat = np.flatnonzero(livres)
+        if n > len(flat):
+            raise ValueError(f"Mapa {self.width}x{self.height} sem celulas livres para {n} elementos "
+                             f"(livres: {len(flat)})")
+        ys, xs = np.divmod(rng.choice(flat, size=n, replace=False), self.width)
+        return xs, ys
+
+    def componentes(self) -> np.ndarray:
+        """
+        Componentes ligadas (vizinhanca 4) das celulas que nao sao obstaculo, vetorizado.
+
+        Cada linha e partida em trocos de celulas livres seguidas; trocos de linhas vizinhas que
+        se sobrepoem sao unidos (union-find com hooking para a raiz menor + pointer jumping, que
+        acaba em poucas rondas). Devolve o rotulo de cada posicao do buffer (indice do buffer,
+        como em index); so e valido nas celulas livres.
+        """
+        free = np.frombuffer(self.buf, dtype=np.uint8) != OBSTACLE
+        w = self.stride
+        inicio = free.copy()
+        inicio[1:] &= ~free[:-1]
+        troco = np.cumsum(inicio, dtype=np.int64) - 1
+        # Uma aresta por sobreposicao entre um troco e o de baixo (no inicio da sobreposicao)
+        ambos = free[:-w] & free[w:]
+        seg = ambos.copy()
+        seg[1:] &= ~ambos[:-1]
+        cells = np.flatnonzero(seg)
+        u, v = troco[cells], troco[cells + w]
+        parent = np.arange(int(troco[-1]) + 1)
+        while True:
+            pu, pv = parent[u], parent[v]
+            diff = pu != pv
+            if not diff.any():
+                break
+            u, v, pu, pv = u[diff], v[diff], pu[diff], pv[diff]
+            parent[np.maximum(pu, pv)] = np.minimum(pu, pv)
+            while True:
+                pp = parent[parent]
+                if np.array_equal(pp, parent):
+                    break
+                parent = pp
+        return parent[troco]
+
+    def componente(self, origem: int) -> np.ndarray:
+        #Mascara (sobre o buffer) das celulas alcancaveis a partir da origem
+        if len(self.buf) > BFS_MAX:
+            labels = self.componentes()
+            return (labels == labels[origem]) & (np.frombuffer(self.buf, dtype=np.uint8) != OBSTACLE)
+        visto = bytearray(len(self.buf))
+        visto[origem] = 1
+        fila = deque([origem])
+        buf = self.buf
+        w = self.stride
+        while fila:
+            c = fila.popleft()
+            for nb in (c - w, c + w, c - 1, c + 1):
+                if not visto[nb] and buf[nb] != OBSTACLE:
+                    visto[nb] = 1
+                    fila.append(nb)
+        return np.frombuffer(visto, dtype=np.uint8).astype(bool)
+
+    def ligadas(self, origem: int, alvos: np.ndarray) -> bool:
+        #True se todos os alvos (indices do buffer) estao na componente da origem
+        if len(self.buf) > BFS_MAX:
+            labels = self.componentes()
+            return bool((labels[alvos] == labels[origem]).all())
+        #Mapas pequenos: flood fill a partir da origem (a borda de obstaculos dispensa limites)
+        falta = set(alvos.tolist())
+        falta.discard(origem)
+        visto = bytearray(len(self.buf))
+        visto[origem] = 1
+        fila = deque([origem])
+        buf = self.buf
+        w = self.stride
+        while fila and falta:
+            c = fila.popleft()
+            for nb in (c - w, c + w, c - 1, c + 1):
+                if not visto[nb] and buf[nb] != OBSTACLE:
+                    visto[nb] = 1
+                    falta.discard(nb)
+                    fila.append(nb)
+        return not falta
+
+    def fill(self, cells, value: int) -> None:
+        #Marca um conjunto de celulas (x, y) de uma vez
+        if cells:
+            xs, ys = zip(*cells)
+            self.cells[list(ys), list(xs)] = value
+
+    def render(self, agentes=()) -> str:
+        #Mapa em texto (um simbolo por celula, "A" por cima nas celulas com agentes)
+        chars = SYMBOLS[self.cells]
+        for x, y in agentes:
+            chars[y, x] = "A"
+        return "\n".join(" ".join(row) for row in chars.tolist())
+
+    def __getstate__(self) -> dict:
+        #As vistas NumPy partilham o bytearray; no pickle so vai o buffer e voltam a ser criadas
+        return {"width": self.width, "height": self.height, "stride": self.stride, "buf": self.buf}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._views()
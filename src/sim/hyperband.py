@@ -0,0 +1,214 @@
+"""
+Early-stopping de treinos: Successive Halving e Hyperband.
+
+Em vez de correr todos os n_episodios de cada config, comecamos muitas configs com um
+orcamento pequeno de episodios, ordenamo-las pela success rate (ou reward) recente do
+MetricsRecorder e so continuamos a melhor fracao (1/eta) com um orcamento eta vezes maior,
+ate uma config chegar ao orcamento completo (n_episodios).
+
+Os treinos continuam exatamente onde ficaram: o motor (ambiente + agente + metricas) e
+retomado com executa_episodios, e entre fatias viaja inteiro (pickle) de/para os workers.
+
+Uso (dentro de src/):
+    python -m sim.hyperband params/farol_learning_hyperband.json
+"""
+import csv
+import json
+import math
+import os
+import sys
+from typing import Callable, Optional
+
+from sim.motor_de_simulacao import Config, MotorDeSimulacao
+from sim.pool import iter_jobs
+from sim.sweep import grid, make_trial, random_search, set_path
+
+
+def _advance(job: tuple[MotorDeSimulacao, int]) -> MotorDeSimulacao:
+    #Corre o motor ate ter `target` episodios feitos (no worker) e devolve-o
+    motor, target = job
+    motor.executa_episodios(target - motor.episodios_feitos)
+    return motor
+
+
+def _score(motor: MotorDeSimulacao, metric: str, window: int) -> float:
+    return float(motor._metrics.summary_recent(window).get(metric, float("-inf")))
+
+
+def _prepare_dirs(cfg: Config) -> None:
+    for path in (cfg.csv_path, cfg.qtable_path, cfg.policy_path):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+def successive_halving(configs: list[Config], min_episodes: int, eta: int = 3,
+                       metric: str = "success_rate", window: int = 100,
+                       workers: Optional[int] = None, verbose: bool = True) -> dict:
+    """
+    Successive Halving sobre configs de treino (todas com o mesmo n_episodios = orcamento maximo).
+
+    - min_episodes: orcamento do primeiro rung
+    - eta: fator de corte (fica 1/eta das configs) e de aumento do orcamento
+    - metric: chave do summary usada para ordenar ("success_rate", "avg_reward", ...)
+    - window: nº de episodios recentes usados na metrica
+
+    So a config vencedora chega ao orcamento completo; o motor dela e finalizado
+    (CSV + Q-table/policy guardados). As outras sao fechadas quando saem (CSV/.bin parcial). Devolve {"winner", "summary", "history", "trials"}.
+    """
+    if not configs:
+        raise ValueError("successive_halving precisa de pelo menos uma config")
+    budget_max = max(c.n_episodios for c in configs)
+
+    motors = []
+    for c in configs:
+        # A janela das metricas em streaming tem de cobrir a usada no score
+        c.metrics_window = max(c.metrics_window, window)
+        _prepare_dirs(c)
+        m = MotorDeSimulacao.cria_de_config(c, verbose=False)
+        m.inicia()
+        motors.append(m)
+
+    active = list(range(len(configs)))
+    budget = max(1, min(min_episodes, budget_max))
+    history = []
+    rung = 0
+    while True:
+        jobs = [(motors[i], budget) for i in active]
+        for j, m in iter_jobs(_advance, jobs, workers=workers):
+            motors[active[j]] = m
+
+        scores = {i: _score(motors[i], metric, window) for i in active}
+        active.sort(key=lambda i: (-scores[i], i))
+        for i in active:
+            history.append({"trial": i, "rung": rung, "episodes": motors[i].episodios_feitos,
+                            "score": scores[i]})
+        if verbose:
+            best = active[0]
+            print(f"[SH] rung={rung} episodes={budget} configs={len(active)} "
+                  f"best=trial {best} ({metric}={scores[best]:.4f})")
+
+        if budget >= budget_max:
+            break
+        # As configs cortadas param aqui: ficam com o CSV/.bin parcial e o writer fechado
+        for i in active[max(1, len(active) // eta):]:
+            motors[i].fecha()
+        active = active[:max(1, len(active) // eta)]
+        budget = min(budget_max, budget * eta)
+        rung += 1
+
+    winner = active[0]
+    summary = motors[winner].finaliza()
+    for i in active[1:]:
+        motors[i].fecha()
+
+    #Estado final de cada trial: ultimo rung atingido e metrica nesse rung
+    trials = {}
+    for row in history:
+        trials[row["trial"]] = row
+    return {"winner": winner, "summary": summary, "history": history, "trials": trials}
+
+
+def hyperband(make_configs: Callable[[int, int], list[Config]], budget_max: int, min_episodes: int,
+              eta: int = 3, metric: str = "success_rate", window: int = 100,
+              workers: Optional[int] = None, verbose: bool = True) -> dict:
+    """
+    Hyperband: varios brackets de Successive Halving com compromissos diferentes entre
+    nº de configs e orcamento inicial.
+
+    make_configs(bracket, n) tem de devolver n configs novas (com artefactos proprios).
+    Devolve o melhor resultado entre brackets (pela metrica com o orcamento completo).
+    """
+    s_max = int(math.floor(math.log(max(1, budget_max / min_episodes), eta) + 1e-9))
+    best = None
+    brackets = []
+    for s in range(s_max, -1, -1):
+        n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        r = max(1, int(budget_max * eta ** (-s)))
+        if verbose:
+            print(f"\n[HB] bracket={s} configs={n} min_episodes={r}")
+        res = successive_halving(make_configs(s, n), r, eta=eta, metric=metric, window=window,
+                                 workers=workers, verbose=verbose)
+        score = res["trials"][res["winner"]]["score"]
+        brackets.append({"bracket": s, "configs": n, "min_episodes": r, **res})
+        if best is None or score > best[0]:
+            best = (score, s, res)
+
+    score, s, res = best
+    return {"bracket": s, "score": score, "winner": res["winner"], "summary": res["summary"],
+            "brackets": brackets}
+
+
+def main(spec_path: str) -> dict:
+    """
+    Corre Successive Halving (ou Hyperband) descrito num JSON no mesmo formato do sweep:
+    {
+      "train": "params/farol_learning_train.json",
+      "random": {...}, "n_trials": 27,                  (ou "grid": {...})
+      "seed": 42, "min_episodes": 100, "eta": 3,
+      "metric": "success_rate", "window": 100,
+      "hyperband": false, "workers": null, "out_dir": "outputs/sh_farol"
+    }
+    """
+    with open(spec_path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    with open(spec["train"], "r", encoding="utf-8") as f:
+        train_base = Config.from_dict(json.load(f))
+    for k, v in spec.get("overrides", {}).items():
+        set_path(train_base, k, v)
+
+    seed = int(spec.get("seed", train_base.seed))
+    out_dir = spec.get("out_dir", "outputs/hyperband")
+    kwargs = dict(
+        eta=int(spec.get("eta", 3)),
+        metric=spec.get("metric", "success_rate"),
+        window=int(spec.get("window", 100)),
+        workers=spec.get("workers", None),
+    )
+
+    points_all = []
+
+    def make_configs(tag: str, points: list[dict]) -> list[Config]:
+        cfgs = []
+        for t, point in enumerate(points):
+            trial_dir = os.path.join(out_dir, tag, f"trial_{t:03d}")
+            train, _ = make_trial(train_base, train_base, point, seed, trial_dir)
+            cfgs.append(train)
+            points_all.append({"tag": tag, "trial": t, **point})
+        return cfgs
+
+    if spec.get("hyperband", False):
+        search_seed = int(spec.get("search_seed", 0))
+        res = hyperband(
+            lambda s, n: make_configs(f"bracket_{s}", random_search(spec["random"], n, search_seed + s)),
+            train_base.n_episodios,
+            int(spec.get("min_episodes", 100)),
+            **kwargs,
+        )
+        history = [dict(tag=f"bracket_{b['bracket']}", **h) for b in res["brackets"] for h in b["history"]]
+        winner_tag = f"bracket_{res['bracket']}"
+    else:
+        points = grid(spec["grid"]) if "grid" in spec else random_search(
+            spec["random"], int(spec.get("n_trials", 27)), int(spec.get("search_seed", 0)))
+        res = successive_halving(make_configs("sh", points), int(spec.get("min_episodes", 100)), **kwargs)
+        history = [dict(tag="sh", **h) for h in res["history"]]
+        winner_tag = "sh"
+
+    os.makedirs(out_dir, exist_ok=True)
+    out_csv = os.path.join(out_dir, "history.csv")
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=["tag", "trial", "rung", "episodes", "score"])
+        w.writeheader()
+        w.writerows(history)
+
+    winner = next(p for p in points_all if p["tag"] == winner_tag and p["trial"] == res["winner"])
+    print(f"\n[SH] Vencedor: {winner}")
+    print(f"[SH] Summary (orcamento completo): {res['summary']}")
+    print(f"[SH] Historico guardado em: {out_csv}")
+    return res
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python -m sim.hyperband <spec.json>")
+        sys.exit(1)
+    main(sys.argv[1])
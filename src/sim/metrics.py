@@ -1,6 +1,32 @@
+from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
 import csv
+import io
+import json
+import math
 import os
+import struct
+from typing import Iterator, Optional
+
+import numpy as np
+
+from sim.artifacts import ArtifactWriter, escreve_atomico, escreve_bloco, write_bytes, write_csv
+
+
+CSV_HEADER = ["episode", "steps", "total_reward", "success", "collected", "deposited", "epsilon"]
+
+#Registo binario de largura fixa (uma linha do CSV), usado no formato .bin e no EpisodeColumns
+EPISODE_DTYPE = np.dtype([
+    ("episode", "<i8"),
+    ("steps", "<i4"),
+    ("total_reward", "<f8"),
+    ("success", "u1"),
+    ("collected", "<i4"),
+    ("deposited", "<i4"),
+    ("epsilon", "<f8"),
+])
+BIN_MAGIC = b"SMAMETR1"
 
 
 @dataclass
@@ -12,29 +38,360 @@ class EpisodeStats:
     collected: int = 0
     deposited: int = 0
     epsilon: float = -1.0  # só faz sentido em learning/train
+    # Com varios agentes: (total_reward, collected, deposited) de cada agente (nao vai para o CSV)
+    agents: Optional[list] = None
+    # Acabou antes de max_passos por estar encravado (ver sim/stall.py; nao vai para o CSV)
+    stalled: bool = False
 
 
-class MetricsRecorder:
-    #Recolhe metricas por episodio e exporta CSV.
+def _csv_row(i: int, e: EpisodeStats) -> list:
+    return [i, e.steps, e.total_reward, int(e.success), e.collected, e.deposited, e.epsilon]
+
+
+class EpisodeColumns:
+    """
+    Episodios guardados por colunas (struct-of-arrays): um array NumPy tipado por campo,
+    com capacidade que duplica quando enche. Para compatibilidade itera/indexa como uma
+    lista de EpisodeStats.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._cols = {name: np.empty(capacity, EPISODE_DTYPE[name]) for name in EPISODE_DTYPE.names}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, row: list) -> None:
+        #row no formato do CSV: (episode, steps, total_reward, success, collected, deposited, epsilon)
+        if self.size == len(self._cols["episode"]):
+            for name, col in self._cols.items():
+                grown = np.empty(2 * len(col), col.dtype)
+                grown[:self.size] = col[:self.size]
+                self._cols[name] = grown
+        for name, v in zip(EPISODE_DTYPE.names, row):
+            self._cols[name][self.size] = v
+        self.size += 1
+
+    def column(self, name: str) -> np.ndarray:
+        return self._cols[name][:self.size]
+
+    def records(self) -> np.ndarray:
+        #Copia no formato de registos (EPISODE_DTYPE)
+        out = np.empty(self.size, EPISODE_DTYPE)
+        for name in EPISODE_DTYPE.names:
+            out[name] = self.column(name)
+        return out
+
+    def _stats(self, i: int) -> EpisodeStats:
+        c = self._cols
+        return EpisodeStats(
+            steps=int(c["steps"][i]),
+            total_reward=float(c["total_reward"][i]),
+            success=bool(c["success"][i]),
+            collected=int(c["collected"][i]),
+            deposited=int(c["deposited"][i]),
+            epsilon=float(c["epsilon"][i]),
+        )
+
+    def __iter__(self) -> Iterator[EpisodeStats]:
+        return (self._stats(i) for i in range(self.size))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._stats(i) for i in range(*key.indices(self.size))]
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError(key)
+        return self._stats(key)
+
+
+class RunningStat:
+    #Media e variancia online (Welford): memoria constante, uma so passagem
+    __slots__ = ("n", "total", "mean", "m2")
+
     def __init__(self):
-        self.episodes: list[EpisodeStats] = []
+        self.n = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        # a soma da a media exatamente como sum(...)/n; o Welford da a variancia sem cancelamento
+        self.total += x
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+    def __getstate__(self):
+        return (self.n, self.total, self.mean, self.m2)
+
+    def __setstate__(self, state):
+        self.n, self.total, self.mean, self.m2 = state
+
+
+def _encode_rows(rows: list[list]) -> bytes:
+    buf = io.StringIO(newline="")
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+class _FileSink(ABC):
+    """
+    Escreve linhas por episodio a medida que os episodios terminam, em blocos de
+    flush_every linhas (append), em vez de tudo no fim.
+
+    Com writer, os blocos ja codificados sao escritos pela thread do ArtifactWriter (o treino nao
+    bloqueia no disco; flush/close do writer esperam por eles). Sem writer sao escritos logo.
+    Nao guarda o ficheiro aberto (pode viajar com pickle entre processos).
+    offset = bytes ja escritos ou agendados; ao retomar de um checkpoint o ficheiro e cortado nesse ponto.
+    """
+
+    def __init__(self, path: str, flush_every: int = 1000, writer: Optional[ArtifactWriter] = None):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.writer = writer
+        self.offset = 0
+        self._buffer: list[list] = []
+        self._truncate = False
+
+    @abstractmethod
+    def _header(self) -> bytes:
+        #Bytes no inicio do ficheiro (escritos uma vez)
+        raise NotImplementedError
+
+    @abstractmethod
+    def _encode(self, rows: list[list]) -> bytes:
+        #Bytes de um bloco de linhas (acrescentados ao ficheiro)
+        raise NotImplementedError
+
+    def write(self, row: list) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.offset == 0:
+            # Primeira escrita: ficheiro novo so com o cabecalho
+            self._escreve(self._header())
+            self._truncate = False
+        if not self._buffer and not self._truncate:
+            return
+        # Retoma (_truncate): o bloco, mesmo vazio, descarta as linhas escritas depois do checkpoint
+        self._escreve(self._encode(self._buffer) if self._buffer else b"")
+        self._truncate = False
+        self._buffer = []
+
+    def _escreve(self, data: bytes) -> None:
+        if self.writer is None:
+            escreve_bloco(self.path, self.offset, data)
+        else:
+            self.writer.append(self.path, self.offset, data)
+        self.offset += len(data)
+
+    def checkpoint_state(self) -> dict:
+        #Chamar depois de flush(): o checkpoint so conhece as linhas ja no disco
+        return {"offset": self.offset}
+
+    def load_checkpoint_state(self, state: dict) -> None:
+        self.offset = int(state["offset"])
+        self._buffer = []
+        self._truncate = True
+        # Ficheiro apagado (ou mais curto que o checkpoint): recomeca um ficheiro novo com o cabecalho
+        # em vez de o abrir com r+b (as linhas anteriores ao checkpoint ja nao existem)
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < self.offset:
+            self.offset = 0
+
+
+class CsvSink(_FileSink):
+    #CSV por episodio (texto), o formato de sempre
+    def __init__(self, path: str, flush_every: int = 1000, header: Optional[list] = None,
+                 writer: Optional[ArtifactWriter] = None):
+        super().__init__(path, flush_every, writer)
+        self.header = header or CSV_HEADER
+
+    def _header(self) -> bytes:
+        return _encode_rows([self.header])
+
+    def _encode(self, rows: list[list]) -> bytes:
+        return _encode_rows(rows)
+
+
+class BinSink(_FileSink):
+    """
+    Formato binario colunar-compativel, pensado para ser lido sem parsing (np.memmap):
+
+        BIN_MAGIC (8 bytes) | tamanho do cabecalho (uint32) | JSON com metadados | registos EPISODE_DTYPE
+
+    O cabecalho e alinhado a 64 bytes. Os metadados levam a config da corrida (env, agente, seed, ...).
+    """
+
+    def __init__(self, path: str, flush_every: int = 1000, meta: Optional[dict] = None,
+                 writer: Optional[ArtifactWriter] = None):
+        super().__init__(path, flush_every, writer)
+        self.meta = meta or {}
+
+    def _header(self) -> bytes:
+        meta = dict(self.meta, fields=list(EPISODE_DTYPE.names), dtype=EPISODE_DTYPE.descr)
+        body = json.dumps(meta).encode("utf-8")
+        size = len(BIN_MAGIC) + 4 + len(body)
+        size += -size % 64
+        return BIN_MAGIC + struct.pack("<I", size) + body.ljust(size - len(BIN_MAGIC) - 4)
+
+    def _encode(self, rows: list[list]) -> bytes:
+        return np.array([tuple(r) for r in rows], dtype=EPISODE_DTYPE).tobytes()
+
+
+def load_bin(path: str) -> tuple[dict, np.ndarray]:
+    """
+    Le um ficheiro .bin de metricas: devolve (metadados, registos).
+    Os registos sao um np.memmap (so leitura) com dtype EPISODE_DTYPE: recs["total_reward"] etc.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(BIN_MAGIC)) != BIN_MAGIC:
+            raise ValueError(f"Nao e um ficheiro de metricas binario: {path}")
+        (size,) = struct.unpack("<I", f.read(4))
+        meta = json.loads(f.read(size - len(BIN_MAGIC) - 4))
+    n = (os.path.getsize(path) - size) // EPISODE_DTYPE.itemsize
+    if n == 0:
+        return meta, np.empty(0, EPISODE_DTYPE)
+    return meta, np.memmap(path, dtype=EPISODE_DTYPE, mode="r", offset=size, shape=(n,))
+
+
+def bin_to_csv(bin_path: str, csv_path: str) -> None:
+    #Exporta um .bin de metricas para o CSV de sempre
+    _, recs = load_bin(bin_path)
+    rows = [list(r) for r in recs.tolist()]
+    escreve_atomico(csv_path, write_csv, (CSV_HEADER, rows))
+
+
+class MetricsRecorder:
+    """
+    Recolhe metricas por episodio em modo streaming.
+
+    - summary(): agregados online (contagens, medias e desvio padrao por Welford), memoria constante
+    - summary_recent(window): ultimos `window` episodios, guardados numa janela circular
+    - sinks: as linhas por episodio sao escritas em blocos enquanto a corrida decorre (CsvSink, BinSink)
+    - keep_episodes: guarda tambem todos os episodios, por colunas (EpisodeColumns, memoria O(episodios))
+    """
+
+    def __init__(self, keep_episodes: bool = False, window: int = 100, sinks: Optional[list] = None):
+        self.episodes: Optional[EpisodeColumns] = EpisodeColumns() if keep_episodes else None
+        self.window = window
+        self.sinks = list(sinks or [])
+        self._recent: deque = deque(maxlen=window)
+        self._n = 0
+        self._succ = 0
+        self._stalled = 0
+        self._steps = RunningStat()
+        self._reward = RunningStat()
+        self._collected = RunningStat()
+        self._deposited = RunningStat()
+        # Por agente: (reward, collected, deposited) de cada agente (so com varios agentes)
+        self._agents: list[tuple[RunningStat, RunningStat, RunningStat]] = []
+
+    def __len__(self) -> int:
+        return self._n
 
     def start_episode(self) -> EpisodeStats:
-        ep = EpisodeStats()
-        self.episodes.append(ep)
-        return ep
+        #Novo episodio; so conta nas metricas quando for registado com add() no fim
+        return EpisodeStats()
+
+    def add(self, ep: EpisodeStats) -> None:
+        #Regista um episodio ja terminado (ex: avaliado noutro processo)
+        self._n += 1
+        self._succ += bool(ep.success)
+        self._stalled += bool(ep.stalled)
+        self._steps.add(ep.steps)
+        self._reward.add(ep.total_reward)
+        self._collected.add(ep.collected)
+        self._deposited.add(ep.deposited)
+        if ep.agents is not None:
+            self._add_agents(ep.agents)
+        self._recent.append(ep)
+        row = _csv_row(self._n, ep)
+        if self.episodes is not None:
+            self.episodes.append(row)
+        for sink in self.sinks:
+            sink.write(row)
+
+    def _add_agents(self, agents: list) -> None:
+        while len(self._agents) < len(agents):
+            self._agents.append((RunningStat(), RunningStat(), RunningStat()))
+        for stats, values in zip(self._agents, agents):
+            for stat, x in zip(stats, values):
+                stat.add(x)
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            sink.flush()
 
     def summary(self) -> dict:
         #Resumo agregado , usado no terminal para comparar as abordagens.
-        if not self.episodes:
+        if not self._n:
             return {}
+        n = self._n
+        out = {
+            "episodes": n,
+            "success_rate": self._succ / n,
+            "avg_steps": self._steps.avg,
+            "avg_reward": self._reward.avg,
+            "avg_collected": self._collected.avg,
+            "avg_deposited": self._deposited.avg,
+            "std_steps": self._steps.std,
+            "std_reward": self._reward.std,
+        }
+        if self._agents:
+            out.update(self.summary_agents())
+        return out
 
-        n = len(self.episodes)
-        succ = sum(1 for e in self.episodes if e.success)
-        avg_steps = sum(e.steps for e in self.episodes) / n
-        avg_reward = sum(e.total_reward for e in self.episodes) / n
-        avg_collected = sum(e.collected for e in self.episodes) / n
-        avg_deposited = sum(e.deposited for e in self.episodes) / n
+    @property
+    def stalled(self) -> int:
+        #Nº de episodios terminados por estarem encravados
+        return self._stalled
+
+    def summary_agents(self) -> dict:
+        #Medias por episodio de cada agente e a dispersao entre agentes (so com varios agentes)
+        rewards = [r.avg for r, _, _ in self._agents]
+        mean = sum(rewards) / len(rewards) if rewards else 0.0
+        return {
+            "agents": len(self._agents),
+            "avg_reward_per_agent": mean,
+            "std_reward_between_agents": math.sqrt(sum((r - mean) ** 2 for r in rewards) / len(rewards)) if rewards else 0.0,
+            "agent_avg_reward": rewards,
+            "agent_avg_collected": [c.avg for _, c, _ in self._agents],
+            "agent_avg_deposited": [d.avg for _, _, d in self._agents],
+        }
+
+    def summary_recent(self, window: int) -> dict:
+        #Resumo dos ultimos `window` episodios (media movel), usado para comparar treinos a meio.
+        if self.episodes is not None:
+            return self._summarize(self.episodes[-window:])
+        if window > self.window:
+            raise ValueError(f"summary_recent({window}) precisa de window >= {window} (atual: {self.window})")
+        return self._summarize(list(self._recent)[-window:])
+
+    @staticmethod
+    def _summarize(episodes: list[EpisodeStats]) -> dict:
+        if not episodes:
+            return {}
+
+        n = len(episodes)
+        succ = sum(1 for e in episodes if e.success)
+        avg_steps = sum(e.steps for e in episodes) / n
+        avg_reward = sum(e.total_reward for e in episodes) / n
+        avg_collected = sum(e.collected for e in episodes) / n
+        avg_deposited = sum(e.deposited for e in episodes) / n
 
         return {
             "episodes": n,
@@ -45,11 +402,45 @@ class MetricsRecorder:
             "avg_deposited": avg_deposited,
         }
 
+    def checkpoint_state(self) -> dict:
+        #Agregados + janela recente (+ episodios, se guardados) + posicao em cada ficheiro
+        self.flush()
+        return {
+            "n": self._n,
+            "succ": self._succ,
+            "stalled": self._stalled,
+            "running": (self._steps, self._reward, self._collected, self._deposited),
+            "agents": self._agents,
+            "recent": list(self._recent),
+            "episodes": self.episodes,
+            "sinks": [sink.checkpoint_state() for sink in self.sinks],
+        }
+
+    def load_checkpoint_state(self, state: dict) -> None:
+        self._n = state["n"]
+        self._succ = state["succ"]
+        self._stalled = state.get("stalled", 0)
+        self._steps, self._reward, self._collected, self._deposited = state["running"]
+        self._agents = state["agents"]
+        self._recent = deque(state["recent"], maxlen=self.window)
+        if self.episodes is not None and state["episodes"] is not None:
+            self.episodes = state["episodes"]
+        for sink, sink_state in zip(self.sinks, state["sinks"]):
+            sink.load_checkpoint_state(sink_state)
+
+    def csv_payload(self) -> tuple[list, list]:
+        #(cabecalho, linhas) do CSV por episodio, ja copiado (pode ser escrito noutra thread)
+        if self.episodes is None:
+            raise ValueError("csv_payload precisa de keep_episodes=True (em streaming o CSV e escrito pelo sink)")
+        return CSV_HEADER, [list(r) for r in self.episodes.records().tolist()]
+
     def to_csv(self, filepath: str) -> None:
         #Exporta as metricas por episodio para o CSV
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["episode", "steps", "total_reward", "success", "collected", "deposited", "epsilon"])
-            for i, e in enumerate(self.episodes, start=1):
-                w.writerow([i, e.steps, e.total_reward, int(e.success), e.collected, e.deposited, e.epsilon])
+        escreve_atomico(filepath, write_csv, self.csv_payload())
+
+    def to_bin(self, filepath: str, meta: Optional[dict] = None) -> None:
+        #Exporta os episodios guardados no formato binario (ver BinSink)
+        if self.episodes is None:
+            raise ValueError("to_bin precisa de keep_episodes=True (em streaming o .bin e escrito pelo BinSink)")
+        sink = BinSink(filepath, meta=meta)
+        escreve_atomico(filepath, write_bytes, sink._header() + self.episodes.records().tobytes())
@@ -1,7 +1,16 @@
 import json
-from dataclasses import dataclass
-
-from sim.metrics import MetricsRecorder
+import os
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+
+from sim.metrics import BinSink, CsvSink, MetricsRecorder
+from sim.artifacts import ArtifactWriter, write_bytes
+from sim.observers import ArtifactObserver, MetricsObserver, VerbosePrinter, hooks_de
+from sim.profiling import PhaseProfiler
 from sim.actions import Action
 
 from sim.farol_ambiente import AmbienteFarol
@@ -10,12 +19,19 @@ from sim.foraging_ninho_ambiente import AmbienteForagingNinho
 from sim.agente_politica_fixa import AgentePoliticaFixa
 from sim.agente_Qlearning import AgenteLearning
 from sim.agente_novelty import AgenteNovelty
+from sim.novelty_population import executa_geracao
+from sim.scenario_bank import ScenarioBank
+from sim.stall import StallDetector
 
 from sim.sensors.lighthouse_direction import LighthouseDirectionSensor
 from sim.sensors.distance import DistanceSensor
 from sim.sensors.local_grid import LocalGridSensor
 from sim.sensors.nearest_food import NearestFoodSensor
 from sim.sensors.nest_direction import NestDirectionSensor
+from sim.sensors.neighbours import NeighboursSensor
+from sim.sensors.geodesic_goal import GeodesicGoalSensor
+from sim.sensors.geodesic_nest import GeodesicNestSensor
+from sim.sensors.geodesic_food import GeodesicFoodSensor
 
 
 @dataclass
@@ -33,12 +49,85 @@ class Config:
     n_episodios: int = 100
     max_passos: int = 150
 
+    # Varios agentes no mesmo mapa. Em cada passo os agentes atuam por ordem ("sequencial": cada um
+    # observa depois de os anteriores se moverem) ou todos decidem sobre o mesmo estado ("simultaneo":
+    # movimentos para a mesma celula sao resolvidos por sorteio, quem sai de uma celula move-se antes
+    # de quem entra; trocas diretas e ciclos ficam bloqueados)
+    n_agentes: int = 1
+    ordem_agentes: str = "sequencial"
+
+    # Sensores de direcao/distancia: "manhattan" (linha reta, ignora obstaculos) ou "bfs"
+    # (proximo passo e distancia geodesica, a partir de campos BFS calculados uma vez por reset)
+    distance_sensors: str = "manhattan"
+
+    # Geracao do mapa no reset: "vectorized" (sorteio NumPy sem reposicao na grelha, para mapas grandes)
+    # ou "rejection" (celula a celula, reproduz os mapas das versoes anteriores para a mesma seed)
+    map_sampling: str = "vectorized"
+    # Mapas resolviveis (componentes ligadas no reset): "off", "redraw" (volta a sortear enquanto o
+    # objetivo/ninho ou algum recurso estiver isolado de um agente) ou "repair" (muda os alvos isolados
+    # para a componente do objetivo/ninho); mapas rejeitados e alvos movidos vao para o summary
+    solvable_maps: str = "off"
+    # Banco de cenarios (pasta de cache): os mapas dos n_episodios sao gerados uma vez, guardados
+    # num .npy por configuracao de mapas + seed e reutilizados por treino, teste e avaliacoes em batch
+    scenario_bank: str | None = None
+
+    # Episodios encravados acabam antes de max_passos (0 = desligado): ciclo se o mesmo estado
+    # (posicao, recurso transportado, recursos por apanhar) voltar stall_repeats vezes nas ultimas
+    # stall_window mudancas de estado sem nenhum estado novo pelo meio (passos parados, ex: contra uma
+    # parede, nao contam); sem progresso ao fim de stall_patience passos sem nenhum estado novo
+    stall_window: int = 0
+    stall_repeats: int = 20
+    stall_patience: int = 0
+
     learning: dict | None = None
     qtable_path: str | None = None
 
     novelty: dict | None = None
     policy_path: str | None = None
 
+    # CSV de metricas por episodio (None = outputs/<env>_<agent_type>_<mode>.csv)
+    csv_path: str | None = None
+    # Metricas em streaming: linhas do CSV escritas em blocos de N episodios, janela para
+    # summary_recent e lista completa de episodios em memoria (opcional)
+    metrics_flush_every: int = 1000
+    metrics_window: int = 100
+    metrics_keep_episodes: bool = False
+    # Ficheiros de metricas por episodio: "csv" (texto) e/ou "bin" (binario com metadados, mesmo nome com .bin)
+    metrics_formats: tuple = ("csv", "bin")
+
+    # Checkpoints periodicos (a cada N episodios e/ou T segundos; 0 = desligado)
+    checkpoint_path: str | None = None
+    checkpoint_every: int = 0
+    checkpoint_seconds: float = 0.0
+    # Retomar a partir do checkpoint (se existir) em vez de comecar do zero
+    resume: bool = False
+
+    # Profiling por fase (reset/sense/decide/act/learn) no summary; opcionalmente CSV com o tempo
+    # de cada fase por episodio e captura cProfile de [primeiro, ultimo] episodio (stats em profile_stats_path)
+    profile: bool = False
+    profile_csv: str | None = None
+    profile_cprofile: list | None = None
+    profile_stats_path: str | None = None
+
+    # Artefactos (policy best-only, checkpoints) sao escritos em background, no maximo a cada N segundos
+    artifact_seconds: float = 1.0
+
+    @staticmethod
+    def from_dict(data: dict) -> "Config":
+        #Constroi a Config em memoria a partir de um dict (mesmo formato do JSON de parametros)
+        cfg = Config()
+        # copiar campos conhecidos, evita rebentar se o JSON tiver campos extra.
+        for k, v in data.items():
+            if hasattr(cfg, k):
+                setattr(cfg, k, v)
+        #Sub-configs
+        cfg.learning = data.get("learning", None)
+        cfg.mode = data.get("mode", cfg.mode)
+        cfg.qtable_path = data.get("qtable_path", None)
+        cfg.novelty = data.get("novelty", None)
+        cfg.policy_path = data.get("policy_path", None)
+        return cfg
+
 
 class MotorDeSimulacao:
     """
@@ -56,11 +145,41 @@ class MotorDeSimulacao:
     def __init__(self, ambiente, config: Config, verbose: bool = True):
         self._ambiente = ambiente
         self._config = config
-        self._metrics = MetricsRecorder()
         self._verbose = verbose
+        # Escritas de artefactos fora do ciclo de treino (atomicas, coalescidas, em background);
+        # os blocos do CSV/.bin por episodio tambem vao por aqui
+        self._artefactos = ArtifactWriter(min_interval=config.artifact_seconds)
+        self._metrics = self._criar_metricas()
 
         # Para cumprir o interface pedido no enunciado (listaAgentes)
         self._agentes = []
+        # Nº de episodios ja corridos (o treino pode ser feito as fatias, ver executa_episodios)
+        self._ep_i = 0
+
+        # Observadores extra (ver sim/observers.py); os de base sao instalados em inicia()
+        self._observadores = []
+        self._hooks = hooks_de([])
+        self._profiler = None
+        if config.profile or config.profile_csv or config.profile_cprofile:
+            self._profiler = PhaseProfiler(config.profile_csv, config.profile_cprofile, config.profile_stats_path)
+
+    def _csv_path(self) -> str:
+        cfg = self._config
+        return cfg.csv_path or f"outputs/{cfg.env}_{cfg.agent_type}_{cfg.mode}.csv"
+
+    def _criar_metricas(self) -> MetricsRecorder:
+        #Em "eval" (candidatos do treino por geracoes) nao ha ficheiros: os episodios voltam ao motor principal
+        cfg = self._config
+        sinks = []
+        if cfg.mode != "eval":
+            if "csv" in cfg.metrics_formats:
+                sinks.append(CsvSink(self._csv_path(), cfg.metrics_flush_every, writer=self._artefactos))
+            if "bin" in cfg.metrics_formats:
+                meta = {"env": cfg.env, "agent_type": cfg.agent_type, "mode": cfg.mode, "seed": cfg.seed,
+                        "config": asdict(cfg)}
+                sinks.append(BinSink(os.path.splitext(self._csv_path())[0] + ".bin", cfg.metrics_flush_every, meta,
+                                     writer=self._artefactos))
+        return MetricsRecorder(keep_episodes=cfg.metrics_keep_episodes, window=cfg.metrics_window, sinks=sinks)
 
     #Detalhe para não poluir o batch_eval com muitos outputs de grelhas.
     def _p(self, *args, **kwargs):
@@ -70,23 +189,34 @@ class MotorDeSimulacao:
     def listaAgentes(self):
         return list(self._agentes)
 
+    def adiciona_observador(self, observador) -> None:
+        #Regista um observador extra (chamado depois das metricas, artefactos e output no terminal)
+        self._observadores.append(observador)
+        if self._agentes:
+            self._instala_observadores()
+
+    def _instala_observadores(self) -> None:
+        #Metricas e artefactos sempre; o output no terminal (e a grelha em texto) so com verbose
+        base = [MetricsObserver(self._metrics), ArtifactObserver()]
+        if self._profiler is not None:
+            base.append(self._profiler)
+        if self._verbose:
+            base.append(VerbosePrinter())
+        self._hooks = hooks_de(base + self._observadores)
+
+    def _emite(self, hook: str, *args) -> None:
+        for h in self._hooks[hook]:
+            h(self, *args)
+
     @staticmethod
     def cria(nome_do_ficheiro_parametros: str):
-        cfg = Config()
         with open(nome_do_ficheiro_parametros, "r", encoding="utf-8") as f:
             data = json.load(f)
+        return MotorDeSimulacao.cria_de_config(Config.from_dict(data))
 
-        # copiar campos conhecidos, evita rebentar se o JSON tiver campos extra.
-        for k, v in data.items():
-            if hasattr(cfg, k):
-                setattr(cfg, k, v)
-        #Sub-configs
-        cfg.learning = data.get("learning", None)
-        cfg.mode = data.get("mode", cfg.mode)
-        cfg.qtable_path = data.get("qtable_path", None)
-        cfg.novelty = data.get("novelty", None)
-        cfg.policy_path = data.get("policy_path", None)
-
+    @staticmethod
+    def cria_de_config(cfg: Config, verbose: bool = True):
+        #Cria o motor diretamente a partir de uma Config (sem ficheiros temporarios)
         #Q-learning restrito ao Farol.
         if cfg.env == "foraging_ninho" and cfg.agent_type == "learning":
             raise ValueError(
@@ -94,25 +224,57 @@ class MotorDeSimulacao:
                 "Usa agent_type='fixed' ou agent_type='novelty'."
             )
 
+        if cfg.distance_sensors not in ("manhattan", "bfs"):
+            raise ValueError(f"distance_sensors desconhecido: {cfg.distance_sensors} (usa 'manhattan' ou 'bfs')")
+        if cfg.ordem_agentes not in ("sequencial", "simultaneo"):
+            raise ValueError(f"ordem_agentes desconhecida: {cfg.ordem_agentes} (usa 'sequencial' ou 'simultaneo')")
+        if cfg.n_agentes > 1 and cfg.agent_type == "novelty" and cfg.mode == "train" \
+                and int((cfg.novelty or {}).get("population", 0)) > 0:
+            raise ValueError("O treino por geracoes (novelty.population) so suporta n_agentes=1.")
+        if (cfg.profile or cfg.profile_csv or cfg.profile_cprofile) and cfg.agent_type == "novelty" \
+                and cfg.mode == "train" and int((cfg.novelty or {}).get("population", 0)) > 0:
+            # Os episodios de cada geracao correm noutros processos, sem os metodos embrulhados
+            raise ValueError("O profiling nao suporta o treino por geracoes (novelty.population).")
+        if cfg.stall_window < 0 or cfg.stall_patience < 0:
+            raise ValueError("stall_window e stall_patience tem de ser >= 0 (0 = desligado)")
+        if cfg.stall_window and not 2 <= cfg.stall_repeats <= cfg.stall_window:
+            raise ValueError(f"stall_repeats tem de estar entre 2 e stall_window ({cfg.stall_window}): "
+                             f"{cfg.stall_repeats}")
+
         # Ambiente
         if cfg.env == "farol":
-            ambiente = AmbienteFarol(cfg.width, cfg.height, cfg.obstacle_ratio, cfg.seed)
+            ambiente = AmbienteFarol(cfg.width, cfg.height, cfg.obstacle_ratio, cfg.seed, cfg.n_agentes,
+                                     map_sampling=cfg.map_sampling, solvable=cfg.solvable_maps)
         elif cfg.env == "foraging_ninho":
-            ambiente = AmbienteForagingNinho(cfg.width, cfg.height, cfg.obstacle_ratio, cfg.n_recursos, cfg.seed)
+            ambiente = AmbienteForagingNinho(cfg.width, cfg.height, cfg.obstacle_ratio, cfg.n_recursos, cfg.seed,
+                                             cfg.n_agentes, map_sampling=cfg.map_sampling,
+                                             solvable=cfg.solvable_maps)
         else:
             raise ValueError(f"Ambiente desconhecido: {cfg.env}")
 
-        return MotorDeSimulacao(ambiente, cfg)
-
-    def _criar_agente(self):
-        #Cria o agente indicado pela configuração e instala os sensores adequados ao ambiente
+        if cfg.scenario_bank:
+            params = {"env": cfg.env, "width": cfg.width, "height": cfg.height,
+                      "obstacle_ratio": cfg.obstacle_ratio,
+                      "n_recursos": cfg.n_recursos if cfg.env == "foraging_ninho" else None,
+                      "n_agentes": cfg.n_agentes, "map_sampling": cfg.map_sampling,
+                      "solvable": cfg.solvable_maps, "seed": cfg.seed}
+            ambiente.cenarios = ScenarioBank.abre(cfg.scenario_bank, params, cfg.n_episodios, ambiente)
+
+        return MotorDeSimulacao(ambiente, cfg, verbose=verbose)
+
+    def _criar_agente(self, i: int = 0):
+        """
+        Cria o agente i indicado pela configuração e instala os sensores adequados ao ambiente.
+        Com varios agentes cada um tem seed + i; no treino so o primeiro guarda a Q-table/policy.
+        """
+        seed = self._config.seed + i
         if self._config.agent_type == "fixed":
-            agente = AgentePoliticaFixa(seed=self._config.seed)
+            agente = AgentePoliticaFixa(seed=seed)
 
         elif self._config.agent_type == "learning":
             # learning (Q-learning) é restrito ao farol
             agente = AgenteLearning(
-                seed=self._config.seed,
+                seed=seed,
                 learning=self._config.learning,
                 mode=self._config.mode,
                 qtable_path=self._config.qtable_path
@@ -120,10 +282,10 @@ class MotorDeSimulacao:
 
         elif self._config.agent_type == "novelty":
             agente = AgenteNovelty(
-                seed=self._config.seed,
+                seed=seed,
                 mode=self._config.mode,
                 novelty=self._config.novelty,
-                policy_path=self._config.policy_path
+                policy_path=self._config.policy_path if i == 0 or self._config.mode != "train" else None
             )
 
         else:
@@ -131,95 +293,372 @@ class MotorDeSimulacao:
 
         # Sensores por ambiente
         sensores = [LocalGridSensor()]
+        bfs = self._config.distance_sensors == "bfs"
         if self._config.env == "farol":
-            sensores += [LighthouseDirectionSensor(), DistanceSensor()]
+            sensores += [GeodesicGoalSensor()] if bfs else [LighthouseDirectionSensor(), DistanceSensor()]
         else:  # foraging_ninho
-            sensores += [NearestFoodSensor(), NestDirectionSensor()]
+            sensores += [GeodesicFoodSensor(), GeodesicNestSensor()] if bfs else [NearestFoodSensor(), NestDirectionSensor()]
+        # Outros agentes a volta (e celulas ocupadas marcadas como bloqueadas na grelha local)
+        if self._config.n_agentes > 1:
+            sensores.append(NeighboursSensor())
 
         #agente guarda a lista de sensores
         agente._sensores = sensores
+        agente.artefactos = self._artefactos
+        agente.id = i
         return agente
 
-    def executa(self):
-        #Corre a simulacao recolhendo métricas por episodio
-        agente = self._criar_agente()
-
-        # Cumprir interface: manter lista de agentes no motor
-        self._agentes = [agente]
-
-        for ep_i in range(1, self._config.n_episodios + 1):
-            self._ambiente.reset()
+    def inicia(self):
+        #Prepara uma corrida: cria os agentes e poe o contador de episodios a zero (ou retoma do checkpoint)
+        if self._profiler is not None:
+            # Captura cProfile a partir do episodio 1: inclui a criacao dos agentes e o primeiro reset
+            self._profiler.comeca_captura(1)
+        # Cumprir interface: manter lista de agentes no motor (devolve o primeiro)
+        self._agentes = [self._criar_agente(i) for i in range(self._config.n_agentes)]
+        agente = self._agentes[0]
+        # Sorteio da ordem de execucao no modo simultaneo
+        self._rng = random.Random(self._config.seed)
+        self._instala_observadores()
+        stall = StallDetector(self._config.stall_window, self._config.stall_repeats, self._config.stall_patience)
+        self._stall = stall if stall.ativo else None
+        self._ep_i = 0
+        self._ultimo_checkpoint = time.monotonic()
+        self._ep_ultimo_checkpoint = 0
+
+        cp = self._config.checkpoint_path
+        if self._config.resume and cp and os.path.exists(cp):
+            self.carrega_checkpoint(cp)
+            self._ep_ultimo_checkpoint = self._ep_i
+            self._p(f"[CHECKPOINT] Retomado de {cp} (episodio {self._ep_i})")
+        self._emite("on_run_start")
+        return agente
 
-            #Agentes que precisam de reset por episodio
+    def guarda_checkpoint(self, path: str) -> None:
+        """
+        Guarda tudo o que e preciso para continuar a corrida bit-a-bit:
+        episodio atual, estado aprendido do agente (+ RNG e epsilon), RNG do ambiente e metricas.
+        O estado e serializado ja (snapshot) e a escrita atomica (ficheiro temporario + rename)
+        e feita pelo writer de artefactos em background, sem bloquear o treino.
+        """
+        payload = {
+            "episode": self._ep_i,
+            "config": asdict(self._config),
+            "agents": [a.checkpoint_state() for a in self._agentes],
+            "motor_rng": self._rng.getstate(),
+            "env_rng": self._ambiente.rng.getstate(),
+            "env_cenario": self._ambiente.cenario_i,
+            "env_rejeitados": self._ambiente.mapas_rejeitados,
+            "env_movidos": self._ambiente.alvos_movidos,
+            "sensor_calls": self._ambiente.sensor_calls,
+            "metrics": self._metrics.checkpoint_state(),
+        }
+        self._artefactos.submit(path, pickle.dumps(payload), write_bytes)
+        self._ultimo_checkpoint = time.monotonic()
+        self._ep_ultimo_checkpoint = self._ep_i
+
+    def carrega_checkpoint(self, path: str) -> None:
+        # Garante que um checkpoint ainda pendente ja esta no disco
+        self._artefactos.flush()
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+        self._ep_i = int(payload["episode"])
+        for agente, state in zip(self._agentes, payload["agents"]):
+            agente.load_checkpoint_state(state)
+        self._rng.setstate(payload["motor_rng"])
+        self._ambiente.rng.setstate(payload["env_rng"])
+        self._ambiente.cenario_i = payload.get("env_cenario", 0)
+        self._ambiente.mapas_rejeitados = payload.get("env_rejeitados", 0)
+        self._ambiente.alvos_movidos = payload.get("env_movidos", 0)
+        self._ambiente.sensor_calls = payload["sensor_calls"]
+        self._metrics.load_checkpoint_state(payload["metrics"])
+
+    def _talvez_checkpoint(self) -> None:
+        cfg = self._config
+        if not cfg.checkpoint_path:
+            return
+        por_episodios = cfg.checkpoint_every > 0 and self._ep_i - self._ep_ultimo_checkpoint >= cfg.checkpoint_every
+        por_tempo = cfg.checkpoint_seconds > 0 and time.monotonic() - self._ultimo_checkpoint >= cfg.checkpoint_seconds
+        if por_episodios or por_tempo:
+            self.guarda_checkpoint(cfg.checkpoint_path)
+
+    @property
+    def episodios_feitos(self) -> int:
+        return self._ep_i
+
+    def executa_episodios(self, n: int) -> int:
+        """
+        Corre ate n episodios a seguir aos ja feitos (nunca passa de n_episodios).
+        Permite correr o treino as fatias mantendo o estado do agente entre chamadas.
+        Devolve o nº de episodios efetivamente corridos.
+        """
+        if not self._agentes:
+            self.inicia()
+        agente = self._agentes[0]
+
+        fim = min(self._config.n_episodios, self._ep_i + n)
+        corridos = fim - self._ep_i
+        if self._populacao() > 0:
+            self._executa_geracoes(agente, fim)
+            return corridos
+        varios = len(self._agentes) > 1
+        while self._ep_i < fim:
+            self._ep_i += 1
+            if varios:
+                self._executa_episodio_varios(self._ep_i)
+            else:
+                self._executa_episodio(agente, self._ep_i)
+        return corridos
+
+    def _populacao(self) -> int:
+        #Tamanho da populacao no treino por geracoes do novelty (0 = uma politica por episodio)
+        if self._config.agent_type != "novelty" or self._config.mode != "train":
+            return 0
+        return int((self._config.novelty or {}).get("population", 0))
+
+    def _executa_geracoes(self, agente, fim: int) -> None:
+        """
+        Treino por geracoes: cada candidato conta como um episodio de n_episodios e e avaliado
+        em maps_per_candidate mapas (todas as avaliacoes ficam nas metricas).
+        Os episodios correm noutros processos, por isso os hooks por episodio/passo nao sao chamados.
+        """
+        pop = self._populacao()
+        workers = agente.cfg.workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()
+        chunksize = max(1, pop // (4 * workers))
+        with pool as executor:
+            while self._ep_i < fim:
+                n = min(pop, fim - self._ep_i)
+                eps = executa_geracao(self, agente, n, executor=executor, workers=1, chunksize=chunksize)
+                for ep in eps:
+                    self._metrics.add(ep)
+                self._ep_i += n
+                melhor = max(ep.deposited for ep in eps)
+                self._p(f"[GEN] episodios={self._ep_i}/{self._config.n_episodios} | candidatos={n} | "
+                        f"best_obj={agente.best_obj_score:.2f} | max_deposited={melhor}")
+                self._talvez_checkpoint()
+
+    def _executa_episodio(self, agente, ep_i: int) -> None:
+        self._ambiente.reset()
+
+        #Agentes que precisam de reset por episodio
+        if hasattr(agente, "reset_episode"):
+            agente.reset_episode()
+
+        ep = self._metrics.start_episode()
+        hooks = self._hooks
+        if hooks["on_episode_start"]:
+            self._emite("on_episode_start", ep_i)
+        # Sem observadores de passo o ciclo nao faz chamadas extra
+        on_step = hooks["on_step"]
+
+        # Observa (so no inicio; depois reutiliza-se a observacao pos-acao devolvida por agir)
+        obs = self._ambiente.observacaoPara(agente)
+        stall = self._stall
+        if stall is not None:
+            stall.reset(self._ambiente.chave_estado(agente))
+        for _ in range(self._config.max_passos):
+            agente.observacao(obs)
+            # Decide e atua
+            accao: Action = agente.age()
+            obs, recompensa, terminou, info = self._ambiente.agir(accao, agente)
+            # Atualiza a percecao do agente e passa a recompensa ( se o agente usar)
+            agente.observacao(obs)
+            agente.avaliacaoEstadoAtual(recompensa)
+            if on_step:
+                for h in on_step:
+                    h(self, agente, accao, obs, recompensa, terminou)
+            # Metricas do episodio
+            ep.steps += 1
+            ep.total_reward += float(recompensa)
+
+            #Campos para o caso do foraging
+            if obs.collected is not None:
+                ep.collected = obs.collected
+            if obs.deposited is not None:
+                ep.deposited = obs.deposited
+
+            if terminou:
+                # A condicao de sucesso e decidida pelo ambiente
+                ep.success = bool(info.get("success", terminou))
+                break
+
+            self._ambiente.atualizacao()
+            # So volta a correr os sensores se a atualizacao mudou o estado
+            if self._ambiente.alterado():
+                obs = self._ambiente.observacaoPara(agente)
+            if stall is not None and stall.update(self._ambiente.chave_estado(agente)):
+                ep.stalled = True
+                break
+        # Fecho do episodio, usado no caso do novelty para atualizar as "elites"
+        if hasattr(agente, "end_episode"):
+            agente.end_episode()
+        # So o Q-learning usa o epsilon
+        if hasattr(agente, "epsilon"):
+            ep.epsilon = float(agente.epsilon)
+        # Metricas, checkpoints e output no terminal sao observadores
+        self._emite("on_episode_end", ep_i, ep)
+
+    def _executa_episodio_varios(self, ep_i: int) -> None:
+        """
+        Episodio com varios agentes. Um passo = todos os agentes ativos atuam uma vez
+        (ep.steps conta passos, ep.total_reward soma as recompensas de todos).
+        Um agente sai quando agir devolve terminou; o episodio acaba quando ambiente.terminado().
+        """
+        ambiente = self._ambiente
+        agentes = self._agentes
+        ambiente.reset()
+        for agente in agentes:
             if hasattr(agente, "reset_episode"):
                 agente.reset_episode()
 
-            ep = self._metrics.start_episode()
-
-            self._p(f"\n=== EPISÓDIO {ep_i}/{self._config.n_episodios} ===")
-            self._p(self._ambiente.render_text())
-
-            for _ in range(self._config.max_passos):
-                # Observa
-                obs = self._ambiente.observacaoPara(agente)
+        ep = self._metrics.start_episode()
+        recompensas = [0.0] * len(agentes)
+        if self._hooks["on_episode_start"]:
+            self._emite("on_episode_start", ep_i)
+        on_step = self._hooks["on_step"]
+        simultaneo = self._config.ordem_agentes == "simultaneo"
+
+        ativos = list(range(len(agentes)))
+        obs = None
+        stall = self._stall
+        if stall is not None:
+            # Estado conjunto dos agentes ativos
+            stall.reset(hash(tuple(ambiente.chave_estado(agentes[i]) for i in ativos)))
+        for _ in range(self._config.max_passos):
+            accoes = self._decide_simultaneo(ativos) if simultaneo else None
+            saidas = []
+            fim = False
+            for i in (accoes if simultaneo else ativos):
+                if simultaneo:
+                    i, accao = i
+                    agente = agentes[i]
+                else:
+                    # Cada agente observa o estado deixado pelos anteriores
+                    agente = agentes[i]
+                    agente.observacao(ambiente.observacaoPara(agente))
+                    accao = agente.age()
+                obs, recompensa, terminou, info = ambiente.agir(accao, agente)
                 agente.observacao(obs)
-                # Decide e atua
-                accao: Action = agente.age()
-                obs2, recompensa, terminou, info = self._ambiente.agir(accao, agente)
-                # Atualiza a percecao do agente e passa a recompensa ( se o agente usar)
-                agente.observacao(obs2)
                 agente.avaliacaoEstadoAtual(recompensa)
-                # Metricas do episodio
-                ep.steps += 1
+                if on_step:
+                    for h in on_step:
+                        h(self, agente, accao, obs, recompensa, terminou)
+                recompensas[i] += float(recompensa)
                 ep.total_reward += float(recompensa)
-
-                #Campos para o caso do foraging
-                if "collected" in obs2:
-                    ep.collected = int(obs2["collected"])
-                if "deposited" in obs2:
-                    ep.deposited = int(obs2["deposited"])
-
                 if terminou:
-                    # A condicao de sucesso e decidida pelo ambiente
-                    ep.success = bool(info.get("success", terminou))
-                    break
-
-                self._ambiente.atualizacao()
-            # Fecho do episodio, usado no caso do novelty para atualizar as "elites"
+                    saidas.append(i)
+                    if ambiente.terminado():
+                        ep.success = bool(info.get("success", terminou))
+                        fim = True
+                        break
+            ep.steps += 1
+            self._entrega_mensagens()
+            if fim:
+                break
+            if saidas:
+                ativos = [i for i in ativos if i not in saidas]
+            ambiente.atualizacao()
+            if stall is not None and stall.update(hash(tuple(ambiente.chave_estado(agentes[i]) for i in ativos))):
+                ep.stalled = True
+                break
+
+        if obs is not None and obs.collected is not None:
+            ep.collected = obs.collected
+            ep.deposited = obs.deposited
+        for agente in agentes:
             if hasattr(agente, "end_episode"):
                 agente.end_episode()
-            # So o Q-learning usa o epsilon
-            if hasattr(agente, "epsilon"):
-                ep.epsilon = float(agente.epsilon)
-
-            self._p(f"[EP {ep_i}] steps={ep.steps} | reward={ep.total_reward:.2f} | success={ep.success}")
-
-        # Guardar CSV
-        out_csv = f"outputs/{self._config.env}_{self._config.agent_type}_{self._config.mode}.csv"
-        self._metrics.to_csv(out_csv)
-        self._p(f"\n[CSV] Guardado em: {out_csv}")
-
-        # Guardar Q-table no fim do treino
-        if (
-            self._config.agent_type == "learning"
-            and self._config.mode == "train"
-            and hasattr(agente, "save_q")
-            and self._config.qtable_path
-        ):
-            agente.save_q(self._config.qtable_path)
-            self._p(f"[QTABLE] Guardada em: {self._config.qtable_path}")
-
-        # Guardar policy no fim do treino
-        if (
-            self._config.agent_type == "novelty"
-            and self._config.mode == "train"
-            and hasattr(agente, "save_policy")
-            and self._config.policy_path
-        ):
-            agente.save_policy(self._config.policy_path)
-            self._p(f"[POLICY] Guardada em: {self._config.policy_path}")
-
+        if hasattr(agentes[0], "epsilon"):
+            ep.epsilon = float(agentes[0].epsilon)
+        coletados = getattr(ambiente, "coletados_agente", None) or [0] * len(agentes)
+        depositados = getattr(ambiente, "depositados_agente", None) or [0] * len(agentes)
+        ep.agents = list(zip(recompensas, coletados, depositados))
+        self._emite("on_episode_end", ep_i, ep)
+
+    def _decide_simultaneo(self, ativos: list) -> list:
+        """
+        Todos os agentes ativos observam o mesmo estado e decidem; devolve [(id, accao)] pela ordem
+        de execucao. A ordem e sorteada (conflitos pela mesma celula: ganha o primeiro) e depois
+        ajustada para quem sai de uma celula se mover antes de quem entra nela. Em trocas diretas
+        e ciclos, o primeiro a mover encontra a celula ocupada, e o resto do ciclo fica bloqueado.
+        """
+        ambiente = self._ambiente
+        accoes = {}
+        alvo = {}
+        for i in ativos:
+            agente = self._agentes[i]
+            agente.observacao(ambiente.observacaoPara(agente))
+            accoes[i] = agente.age()
+            alvo[i] = ambiente.destino(ambiente.posicoes[i], accoes[i])
+
+        sorteio = list(ativos)
+        self._rng.shuffle(sorteio)
+        ordem = []
+        estado = {}  # 1 = a visitar, 2 = ja na ordem
+        for i in sorteio:
+            pilha = []
+            while i is not None and i not in estado:
+                estado[i] = 1
+                pilha.append(i)
+                j = ambiente.ocupante(alvo[i])
+                # Primeiro quem esta na celula de destino (se for ativo e ainda nao estiver na ordem)
+                i = j if j != i and j in accoes else None
+            for k in reversed(pilha):
+                estado[k] = 2
+                ordem.append((k, accoes[k]))
+        return ordem
+
+    def _entrega_mensagens(self) -> None:
+        #Entrega em lote as mensagens do passo: uma chamada comunica_lote por destinatario
+        agentes = self._agentes
+        if not any(a._caixa_saida for a in agentes):
+            return
+        caixas = [[] for _ in agentes]
+        for remetente in agentes:
+            for mensagem, para in remetente._caixa_saida:
+                if para is None:
+                    for caixa, destino in zip(caixas, agentes):
+                        if destino is not remetente:
+                            caixa.append((mensagem, remetente))
+                else:
+                    caixas[para].append((mensagem, remetente))
+            remetente._caixa_saida.clear()
+        for agente, caixa in zip(agentes, caixas):
+            if caixa:
+                agente.comunica_lote(caixa)
+
+    def finaliza(self):
+        #Fecha a corrida: os observadores escrevem metricas e artefactos da aprendizagem; devolve o summary
         summary = self._metrics.summary()
-        self._p("\n=== SUMMARY ===")
-        self._p(summary)
+        # Nº de chamadas a sensores (permite confirmar que cada passo observa uma so vez)
+        summary["sensor_calls"] = self._ambiente.sensor_calls
+        if self._config.solvable_maps != "off":
+            # Mapas sorteados e descartados por terem alvos inalcancaveis / alvos mudados de celula
+            summary["rejected_maps"] = self._ambiente.mapas_rejeitados
+            summary["repaired_targets"] = self._ambiente.alvos_movidos
+        if self._config.stall_window or self._config.stall_patience:
+            # Episodios terminados antes de max_passos por estarem encravados
+            summary["stalled_episodes"] = self._metrics.stalled
+            summary["stalled_rate"] = self._metrics.stalled / len(self._metrics) if len(self._metrics) else 0.0
+        try:
+            self._emite("on_run_end", summary)
+        finally:
+            # Depois de todos os observadores (incluindo os extra): tudo no disco quando finaliza devolve
+            self._artefactos.close()
         return summary
+
+    def fecha(self) -> None:
+        #Fecha a corrida sem a finalizar (ex: trial eliminado no hyperband): o ultimo bloco do CSV/.bin
+        #fica no disco e a thread do writer de artefactos termina
+        self._metrics.flush()
+        self._artefactos.close()
+
+    def executa(self):
+        #Corre a simulacao completa recolhendo métricas por episodio
+        try:
+            self.inicia()
+            self.executa_episodios(self._config.n_episodios)
+            return self.finaliza()
+        finally:
+            # Se a corrida falhar, os blocos do CSV e os checkpoints ja agendados ficam no disco
+            self._artefactos.close()
@@ -0,0 +1,78 @@
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+class NoveltyArchive:
+    """
+    Arquivo do Novelty Search guardado em matrizes NumPy preallocadas.
+
+    - bds: descritores comportamentais (BD), uma linha por entrada
+    - weights: pesos da politica que produziu cada BD (matriz paralela)
+
+    Inserir e O(1) amortizado (a capacidade duplica quando enche) e remover e O(1)
+    (a ultima linha passa para o lugar da removida). As distancias a um BD sao
+    calculadas de uma vez para todo o arquivo, o que mantem arquivos de 10^5 entradas baratos.
+    """
+
+    def __init__(self, bd_dim: int = 4, w_dim: int = 4, capacity: int = 64):
+        self.bds = np.empty((capacity, bd_dim))
+        self.weights = np.empty((capacity, w_dim))
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self) -> None:
+        cap = max(1, 2 * len(self.bds))
+        bds = np.empty((cap, self.bds.shape[1]))
+        weights = np.empty((cap, self.weights.shape[1]))
+        bds[:self.size] = self.bds[:self.size]
+        weights[:self.size] = self.weights[:self.size]
+        self.bds = bds
+        self.weights = weights
+
+    def add(self, bd: Sequence[float], w: Sequence[float]) -> None:
+        if self.size == len(self.bds):
+            self._grow()
+        self.bds[self.size] = bd
+        self.weights[self.size] = w
+        self.size += 1
+
+    def remove(self, i: int) -> None:
+        #Swap-remove: a ultima entrada ocupa o lugar da removida (a ordem nao interessa para o kNN)
+        last = self.size - 1
+        if i != last:
+            self.bds[i] = self.bds[last]
+            self.weights[i] = self.weights[last]
+        self.size = last
+
+    def distances(self, bd: Sequence[float]) -> np.ndarray:
+        #Distancia euclidiana de bd a todas as entradas do arquivo
+        diff = self.bds[:self.size] - np.asarray(bd, dtype=float)
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def to_list(self) -> List[Tuple[Tuple[float, ...], List[float]]]:
+        #Formato antigo (lista de (bd, pesos)), usado nos ficheiros de policy e checkpoints
+        return [
+            (tuple(self.bds[i].tolist()), self.weights[i].tolist())
+            for i in range(self.size)
+        ]
+
+    @staticmethod
+    def from_list(items: Iterable[Tuple[Sequence[float], Sequence[float]]],
+                  bd_dim: int = 4, w_dim: int = 4) -> "NoveltyArchive":
+        items = list(items)
+        archive = NoveltyArchive(bd_dim, w_dim, capacity=max(64, len(items)))
+        for bd, w in items:
+            archive.add(bd, w)
+        return archive
+
+
+def knn_mean(dists: np.ndarray, k: int) -> float:
+    #Media das k menores distancias (argpartition em vez de ordenar tudo)
+    k = min(k, len(dists))
+    if k < len(dists):
+        dists = dists[np.argpartition(dists, k - 1)[:k]]
+    # somar por ordem crescente, como na versao com sort completo
+    return float(np.sort(dists).sum() / k)
@@ -0,0 +1,58 @@
+"""
+Treino do AgenteNovelty por geracoes, com avaliacao dos candidatos em paralelo.
+
+Em cada geracao o agente amostra uma populacao (elites mutadas + politicas aleatorias),
+cada candidato e avaliado num ou mais mapas num pool de processos, e os resultados
+(BD + objective) sao integrados no arquivo/elites pela ordem dos candidatos.
+Como a populacao, as seeds dos mapas e a ordem de integracao so dependem do estado do
+agente, policy_path e best_weights saem iguais com qualquer nº de workers.
+"""
+from dataclasses import replace
+from typing import Optional
+
+from sim.pool import iter_jobs
+
+
+def avalia_candidato(job) -> tuple[list, int, tuple[int, int]]:
+    #Corre um candidato (pesos fixos) em cfg.n_episodios mapas; devolve ([(bd, objective, EpisodeStats)], sensor_calls, (mapas rejeitados, alvos movidos))
+    from sim.motor_de_simulacao import MotorDeSimulacao
+
+    cfg, weights, explore = job
+    motor = MotorDeSimulacao.cria_de_config(cfg, verbose=False)
+    agente = motor.inicia()
+    agente.weights = list(weights)
+    agente.eval_explore = explore
+    motor.executa_episodios(cfg.n_episodios)
+    # Os episodios vem da janela recente (do tamanho do nº de mapas): mantem o flag stalled
+    per_map = [(bd, obj, ep) for (bd, obj), ep in zip(agente.eval_results, motor._metrics._recent)]
+    ambiente = motor._ambiente
+    return per_map, ambiente.sensor_calls, (ambiente.mapas_rejeitados, ambiente.alvos_movidos)
+
+
+def executa_geracao(motor, agente, n: int, executor=None, workers: Optional[int] = 1,
+                    chunksize: int = 1) -> list:
+    """
+    Amostra, avalia e integra uma geracao de n candidatos.
+    Devolve os EpisodeStats de todas as avaliacoes (candidato a candidato, mapa a mapa).
+    """
+    cfg = motor._config
+    maps = max(1, agente.cfg.maps_per_candidate)
+    population = agente.sample_population(n)
+
+    # Cada candidato usa mapas de uma seed nova, por isso nao vale a pena passar pelo banco de cenarios
+    jobs = [
+        (replace(cfg, mode="eval", seed=seed, n_episodios=maps, policy_path=None,
+                 checkpoint_path=None, resume=False, metrics_window=maps,
+                 scenario_bank=None), w, explore)
+        for (w, explore, seed) in population
+    ]
+    results: list = [None] * n
+    for i, (res, sensor_calls, (rejeitados, movidos)) in iter_jobs(avalia_candidato, jobs, workers=workers,
+                                            chunksize=chunksize, executor=executor):
+        results[i] = res
+        motor._ambiente.sensor_calls += sensor_calls
+        motor._ambiente.mapas_rejeitados += rejeitados
+        motor._ambiente.alvos_movidos += movidos
+
+    agente.merge_population(population, [[(bd, obj) for bd, obj, _ in r] for r in results])
+    return [ep for r in results for _, _, ep in r]
@@ -0,0 +1,109 @@
+"""
+Observacao de tamanho fixo, partilhada por sensores, ambientes e agentes.
+
+Em vez de um dict novo por passo (com chaves "cell_{dx}_{dy}" formatadas a cada chamada),
+cada agente tem uma Observation reutilizada onde os sensores escrevem diretamente.
+Os agentes leem atributos (obs.goal_dx, obs.cells[CELL_UP]) sem lookups nem casts.
+
+Campos que nenhum sensor escreveu ficam a None. Para compatibilidade, a Observation
+continua a responder como o dict antigo: obs.get("cell_0_-1", 0), obs["collected"],
+"food_dx" in obs, e obs.as_dict() devolve uma copia no formato antigo.
+"""
+
+#Indices da grelha local 3x3: cells[(dy + 1) * 3 + (dx + 1)]
+CELL_UP = 1
+CELL_LEFT = 3
+CELL_CENTER = 4
+CELL_RIGHT = 5
+CELL_DOWN = 7
+
+CELL_KEYS = [f"cell_{dx}_{dy}" for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+#Grelha usada pelos agentes quando nenhum sensor escreveu cells (como obs.get("cell_0_-1", 0): livre)
+CELLS_LIVRES = (0,) * len(CELL_KEYS)
+_CELL_INDEX = {k: i for i, k in enumerate(CELL_KEYS)}
+
+FIELDS = (
+    "goal_dx", "goal_dy", "manhattan",
+    "food_dx", "food_dy", "food_dist",
+    "nest_dx", "nest_dy",
+    "agent", "goal",
+    "carrying", "collected", "deposited",
+    "neighbours",
+)
+
+
+class Observation:
+    __slots__ = ("cells",) + FIELDS
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.cells = None
+        for f in FIELDS:
+            setattr(self, f, None)
+
+    # ----------------- vista dict (compatibilidade) -----------------
+
+    def get(self, key: str, default=None):
+        i = _CELL_INDEX.get(key)
+        if i is not None:
+            return default if self.cells is None else self.cells[i]
+        if key in FIELDS:
+            v = getattr(self, key)
+            return default if v is None else v
+        return default
+
+    def __getitem__(self, key: str):
+        v = self.get(key)
+        if v is None:
+            raise KeyError(key)
+        return v
+
+    def __setitem__(self, key: str, value) -> None:
+        i = _CELL_INDEX.get(key)
+        if i is not None:
+            if self.cells is None:
+                self.cells = [0] * 9
+            self.cells[i] = value
+        elif key in FIELDS:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def update(self, values: dict) -> None:
+        for k, v in values.items():
+            self[k] = v
+
+    def as_dict(self) -> dict:
+        #Copia no formato antigo (so com os campos preenchidos)
+        d = {}
+        if self.cells is not None:
+            d.update(zip(CELL_KEYS, self.cells))
+        for f in FIELDS:
+            v = getattr(self, f)
+            if v is not None:
+                d[f] = v
+        return d
+
+    def copy(self) -> "Observation":
+        o = Observation()
+        o.cells = None if self.cells is None else list(self.cells)
+        for f in FIELDS:
+            setattr(o, f, getattr(self, f))
+        return o
+
+    @staticmethod
+    def from_dict(values: dict) -> "Observation":
+        #Chaves desconhecidas sao ignoradas (o dict antigo podia ter extras)
+        o = Observation()
+        for k, v in values.items():
+            if k in _CELL_INDEX or k in FIELDS:
+                o[k] = v
+        return o
+
+    def __repr__(self) -> str:
+        return f"Observation({self.as_dict()})"
@@ -0,0 +1,95 @@
+"""
+Observadores do ciclo de simulacao.
+
+Um observador implementa so os hooks que lhe interessam:
+
+- on_run_start(motor)
+- on_episode_start(motor, ep_i)
+- on_step(motor, agente, accao, obs, recompensa, terminou)
+- on_episode_end(motor, ep_i, ep)          (ep = EpisodeStats do episodio)
+- on_run_end(motor, summary)
+
+O motor so chama os hooks que algum observador redefiniu: sem observadores de passo,
+o ciclo interno nao faz nenhuma chamada extra. Os hooks sao chamados pela ordem em que
+os observadores foram registados (metricas, artefactos, output no terminal, extras).
+"""
+
+HOOKS = ("on_run_start", "on_episode_start", "on_step", "on_episode_end", "on_run_end")
+
+
+class Observer:
+    #Base: hooks vazios (so os redefinidos sao registados no motor)
+    def on_run_start(self, motor) -> None:
+        pass
+
+    def on_episode_start(self, motor, ep_i: int) -> None:
+        pass
+
+    def on_step(self, motor, agente, accao, obs, recompensa: float, terminou: bool) -> None:
+        pass
+
+    def on_episode_end(self, motor, ep_i: int, ep) -> None:
+        pass
+
+    def on_run_end(self, motor, summary: dict) -> None:
+        pass
+
+
+def hooks_de(observers: list) -> dict:
+    #{hook: [metodos]} so com os hooks que cada observador redefine
+    hooks = {name: [] for name in HOOKS}
+    for o in observers:
+        for name in HOOKS:
+            if getattr(type(o), name, None) is not getattr(Observer, name):
+                hooks[name].append(getattr(o, name))
+    return hooks
+
+
+class MetricsObserver(Observer):
+    #Regista cada episodio no MetricsRecorder e escreve o ultimo bloco de CSV/.bin no fim
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def on_episode_end(self, motor, ep_i: int, ep) -> None:
+        self.metrics.add(ep)
+
+    def on_run_end(self, motor, summary: dict) -> None:
+        self.metrics.flush()
+
+
+class ArtifactObserver(Observer):
+    #Checkpoints periodicos e, no fim do treino, Q-table/policy (o motor fecha o writer depois de todos os on_run_end)
+    def on_episode_end(self, motor, ep_i: int, ep) -> None:
+        motor._talvez_checkpoint()
+
+    def on_run_end(self, motor, summary: dict) -> None:
+        cfg = motor._config
+        agente = motor._agentes[0]
+        if cfg.mode == "train":
+            # Guardar Q-table no fim do treino
+            if cfg.agent_type == "learning" and hasattr(agente, "save_q") and cfg.qtable_path:
+                agente.save_q(cfg.qtable_path)
+            # Guardar policy no fim do treino
+            if cfg.agent_type == "novelty" and hasattr(agente, "save_policy") and cfg.policy_path:
+                agente.save_policy(cfg.policy_path)
+
+
+class VerbosePrinter(Observer):
+    #Output no terminal (so registado com verbose=True: a grelha so e desenhada se for para mostrar)
+    def on_episode_start(self, motor, ep_i: int) -> None:
+        print(f"\n=== EPISÓDIO {ep_i}/{motor._config.n_episodios} ===")
+        print(motor._ambiente.render_text())
+
+    def on_episode_end(self, motor, ep_i: int, ep) -> None:
+        print(f"[EP {ep_i}] steps={ep.steps} | reward={ep.total_reward:.2f} | success={ep.success}"
+              + (" | stalled" if ep.stalled else ""))
+
+    def on_run_end(self, motor, summary: dict) -> None:
+        cfg = motor._config
+        print(f"\n[METRICS] Guardado em: {', '.join(sink.path for sink in motor._metrics.sinks)}")
+        if cfg.mode == "train" and cfg.agent_type == "learning" and cfg.qtable_path:
+            print(f"[QTABLE] Guardada em: {cfg.qtable_path}")
+        if cfg.mode == "train" and cfg.agent_type == "novelty" and cfg.policy_path:
+            print(f"[POLICY] Guardada em: {cfg.policy_path}")
+        print("\n=== SUMMARY ===")
+        print(summary)
@@ -0,0 +1,50 @@
+"""
+Avaliacao multi-seed em paralelo e em memoria.
+
+Cada job e uma Config completa (ja com a seed certa). Os jobs sao distribuidos por um
+pool de processos em blocos (chunksize) e os resumos voltam a medida que terminam.
+Como cada job e deterministico dado a sua Config, o resultado nao depende do nº de workers.
+"""
+import os
+from dataclasses import replace
+from typing import Callable, Iterable, Iterator, Optional
+
+from sim.motor_de_simulacao import Config, MotorDeSimulacao
+from sim.pool import iter_jobs
+
+
+def configs_por_seed(base: Config, seeds: Iterable[int], out_dir: Optional[str] = None,
+                     label: str = "run", **overrides) -> list[Config]:
+    #Uma Config por seed. Com out_dir, cada seed escreve o seu proprio CSV (nao ha colisoes entre processos).
+    cfgs = []
+    for s in seeds:
+        cfg = replace(base, seed=int(s), **overrides)
+        if out_dir is not None:
+            cfg.csv_path = os.path.join(out_dir, f"{label}_seed{int(s)}.csv")
+        cfgs.append(cfg)
+    return cfgs
+
+
+def run_config(cfg: Config) -> dict:
+    #Corre uma simulacao completa sem output no terminal e devolve o summary
+    motor = MotorDeSimulacao.cria_de_config(cfg, verbose=False)
+    summary = motor.executa()
+    summary["seed"] = cfg.seed
+    return summary
+
+
+def iter_eval(configs: list[Config], workers: Optional[int] = None,
+              chunksize: int = 1) -> Iterator[tuple[int, dict]]:
+    #Corre todas as configs e devolve (indice, summary) a medida que cada job termina
+    return iter_jobs(run_config, configs, workers=workers, chunksize=chunksize)
+
+
+def run_eval(configs: list[Config], workers: Optional[int] = None, chunksize: int = 1,
+             on_result: Optional[Callable[[int, dict], None]] = None) -> list[dict]:
+    #Igual a iter_eval mas devolve os summaries pela ordem das configs (on_result e chamado por ordem de chegada)
+    results: list[Optional[dict]] = [None] * len(configs)
+    for i, summary in iter_eval(configs, workers=workers, chunksize=chunksize):
+        results[i] = summary
+        if on_result is not None:
+            on_result(i, summary)
+    return results
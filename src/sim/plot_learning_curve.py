@@ -1,7 +1,39 @@
+"""
+Curvas de aprendizagem para uma ou varias corridas (CSV ou .bin).
+
+- Aceita ficheiros, globs ou pastas (ex: outputs/batch_eval): cada ficheiro e uma corrida/seed.
+  So entram CSVs com as colunas por episodio (o CSV agregado do batch_eval fica de fora), e as
+  corridas sao agrupadas pelo nome sem o sufixo _seedN: cada agente/config tem a sua curva e banda.
+- Media movel por somas cumulativas, calculada por blocos (a janela passa de bloco para bloco),
+  por isso nunca se carrega a corrida inteira: a memoria depende do bloco e do nº de pontos.
+- Downsampling para um nº fixo de pontos que preserva minimos/maximos de cada intervalo.
+- Com varias corridas desenha a curva media e uma banda entre seeds (percentis ou IC 95%).
+
+Uso (dentro de src/):
+    python -m sim.plot_learning_curve outputs/farol_learning_train.bin
+    python -m sim.plot_learning_curve "outputs/batch_eval/*.bin" --band ci --out outputs/plots
+"""
+import argparse
 import csv
-import sys
+import glob
+import itertools
+import os
+import re
+import warnings
+from typing import Iterator, Optional
+
+import numpy as np
 import matplotlib.pyplot as plt
 
+from sim.metrics import load_bin
+
+
+#Colunas desenhadas (a coluna "episode" e o eixo x)
+FIELDS = ["total_reward", "success", "collected", "deposited", "epsilon"]
+#Colunas que um CSV tem de ter para ser uma corrida (as restantes podem faltar, ver read_csv)
+EPISODE_COLUMNS = ["episode", "total_reward", "success"]
+CHUNK = 1 << 18
+
 
 def read_csv(path: str):
     episodes = []
@@ -46,17 +78,211 @@ def read_csv(path: str):
     return episodes, rewards, success, epsilon, collected, deposited
 
 
-def moving_avg(xs, w=20):
-    out = []
-    s = 0.0
-    for i, x in enumerate(xs):
-        s += x
-        if i >= w:
-            s -= xs[i - w]
-        out.append(s / min(i + 1, w))
+def read_bin(path: str):
+    #Formato binario (.bin): as colunas sao vistas sobre o ficheiro (memmap), sem parsing
+    _, recs = load_bin(path)
+    return (
+        recs["episode"],
+        recs["total_reward"],
+        recs["success"],
+        recs["epsilon"],
+        recs["collected"],
+        recs["deposited"],
+    )
+
+
+def read_metrics(path: str):
+    #Escolhe o leitor pelo sufixo do ficheiro (.bin ou CSV)
+    if path.endswith(".bin"):
+        return read_bin(path)
+    return read_csv(path)
+
+
+def moving_avg(xs, w=20) -> np.ndarray:
+    #Media movel (janela a crescer nos primeiros w episodios), por somas cumulativas
+    return RollingMean(w).update(np.asarray(xs, dtype=float))
+
+
+# ----------------- leitura por blocos -----------------
+
+def count_rows(path: str) -> int:
+    if path.endswith(".bin"):
+        return len(load_bin(path)[1])
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+
+def iter_columns(path: str, chunk: int = CHUNK) -> Iterator[dict]:
+    #Devolve blocos {coluna: array}; colunas que o ficheiro nao tem ficam de fora
+    if path.endswith(".bin"):
+        _, recs = load_bin(path)
+        for start in range(0, len(recs), chunk):
+            block = recs[start:start + chunk]
+            yield {k: np.asarray(block[k], dtype=float) for k in FIELDS}
+        return
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        cols = {k: header.index(k) for k in FIELDS if k in header}
+        while True:
+            rows = list(itertools.islice(reader, chunk))
+            if not rows:
+                return
+            arr = np.array(rows, dtype=float)
+            yield {k: arr[:, i] for k, i in cols.items()}
+
+
+class RollingMean:
+    """
+    Media movel de janela w calculada por blocos: guarda so os ultimos w-1 valores do
+    bloco anterior, por isso o resultado e o mesmo que com a serie inteira em memoria.
+    """
+
+    def __init__(self, w: int):
+        self.w = max(1, int(w))
+        self.seen = 0
+        self._tail = np.empty(0)
+
+    def update(self, x: np.ndarray) -> np.ndarray:
+        ext = np.concatenate([self._tail, x])
+        c = np.concatenate([[0.0], np.cumsum(ext)])
+        j = np.arange(len(self._tail), len(ext))
+        start = np.maximum(0, j + 1 - self.w)
+        count = np.minimum(self.seen + np.arange(1, len(x) + 1), self.w)
+        out = (c[j + 1] - c[start]) / count
+
+        self.seen += len(x)
+        self._tail = ext[-(self.w - 1):] if self.w > 1 else np.empty(0)
+        return out
+
+
+class Downsampler:
+    """
+    Reduz uma serie de n pontos a `points` intervalos, guardando media, minimo e maximo
+    de cada intervalo (os picos nao desaparecem como num simples subsample).
+    """
+
+    def __init__(self, n: int, points: int):
+        self.n = max(1, n)
+        self.points = max(1, min(points, self.n))
+        self.sums = np.zeros(self.points)
+        self.counts = np.zeros(self.points)
+        self.mins = np.full(self.points, np.inf)
+        self.maxs = np.full(self.points, -np.inf)
+
+    def add(self, start: int, values: np.ndarray) -> None:
+        #values sao os pontos start, start+1, ... da serie
+        if len(values) == 0:
+            return
+        b = (np.arange(start, start + len(values)) * self.points) // self.n
+        heads = np.concatenate([[0], np.flatnonzero(np.diff(b)) + 1])
+        bins = b[heads]
+        self.sums[bins] += np.add.reduceat(values, heads)
+        self.counts[bins] += np.diff(np.append(heads, len(values)))
+        self.mins[bins] = np.minimum(self.mins[bins], np.minimum.reduceat(values, heads))
+        self.maxs[bins] = np.maximum(self.maxs[bins], np.maximum.reduceat(values, heads))
+
+    def x(self) -> np.ndarray:
+        #Episodio (1-based) no inicio de cada intervalo
+        return np.ceil(np.arange(self.points) * self.n / self.points) + 1
+
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.counts > 0, self.sums / np.maximum(self.counts, 1), np.nan)
+
+    def lo(self) -> np.ndarray:
+        return np.where(self.counts > 0, self.mins, np.nan)
+
+    def hi(self) -> np.ndarray:
+        return np.where(self.counts > 0, self.maxs, np.nan)
+
+
+def summarize_run(path: str, window: int, points: int, n: Optional[int] = None,
+                  chunk: int = CHUNK) -> dict:
+    """
+    Percorre uma corrida por blocos e devolve, por coluna, {"raw": Downsampler, "ma": Downsampler}
+    (serie original e media movel), ambas com `points` intervalos sobre n episodios.
+    n permite alinhar varias corridas na mesma grelha (por omissao: o tamanho desta corrida).
+    """
+    n = n or count_rows(path)
+    out: dict = {}
+    rolling: dict = {}
+    start = 0
+    for block in iter_columns(path, chunk):
+        size = 0
+        for k, v in block.items():
+            if k not in out:
+                out[k] = {"raw": Downsampler(n, points), "ma": Downsampler(n, points)}
+                rolling[k] = RollingMean(window)
+            out[k]["raw"].add(start, v)
+            out[k]["ma"].add(start, rolling[k].update(v))
+            size = len(v)
+        start += size
     return out
 
 
+def band(curves: np.ndarray, kind: str = "percentile") -> tuple:
+    """
+    Curva media e banda entre corridas (curves: uma linha por corrida, NaN onde nao ha dados).
+    kind = "percentile" (p10-p90) | "ci" (intervalo de confianca de 95% da media)
+    """
+    # Intervalos sem dados em nenhuma corrida dao NaN (e um aviso do NumPy que nao interessa)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(curves, axis=0)
+        if kind == "ci":
+            k = np.sum(~np.isnan(curves), axis=0)
+            sd = np.nanstd(curves, axis=0, ddof=1) if len(curves) > 1 else np.zeros_like(mean)
+            half = 1.96 * np.nan_to_num(sd) / np.sqrt(np.maximum(k, 1))
+            return mean, mean - half, mean + half
+        lo, hi = np.nanpercentile(curves, [10, 90], axis=0)
+    return mean, lo, hi
+
+
+def is_episode_file(path: str) -> bool:
+    #.bin de metricas ou CSV com as colunas por episodio (ex: exclui foraging_batch_eval.csv)
+    if path.endswith(".bin"):
+        return True
+    try:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            header = next(csv.reader(f), [])
+    except (OSError, UnicodeDecodeError):
+        return False
+    return all(k in header for k in EPISODE_COLUMNS)
+
+
+def find_runs(specs: list[str]) -> list[str]:
+    """
+    Ficheiros, globs ou pastas. Numa pasta usa os .bin e os CSV que nao tem .bin ao lado.
+    CSVs encontrados por pasta/glob sem as colunas por episodio (resumos, tabelas) sao ignorados.
+    """
+    runs = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            bins = sorted(glob.glob(os.path.join(spec, "*.bin")))
+            csvs = [p for p in sorted(glob.glob(os.path.join(spec, "*.csv")))
+                    if os.path.splitext(p)[0] + ".bin" not in bins]
+            runs += [p for p in bins + csvs if is_episode_file(p)]
+        else:
+            found = sorted(glob.glob(spec))
+            runs += [p for p in found if is_episode_file(p)] if found else [spec]
+    return list(dict.fromkeys(runs))
+
+
+def run_label(path: str) -> str:
+    #Nome da corrida sem extensao nem sufixo _seedN (ex: foraging_fixed_seed3.bin -> foraging_fixed)
+    return re.sub(r"_seed\d+$", "", os.path.splitext(os.path.basename(path))[0])
+
+
+def group_runs(paths: list[str]) -> dict[str, list[str]]:
+    #{label: corridas}, pela ordem em que cada label aparece
+    groups: dict[str, list[str]] = {}
+    for p in paths:
+        groups.setdefault(run_label(p), []).append(p)
+    return groups
+
+
 def infer_title_from_filename(path: str) -> str:
     p = path.lower()
     if "farol" in p:
@@ -66,65 +292,103 @@ def infer_title_from_filename(path: str) -> str:
     return "Curva de Aprendizagem"
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Uso: python plot_learning_curve.py <csv>")
-        sys.exit(1)
+def _show(fig_name: str, out_dir: Optional[str]) -> None:
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        plt.savefig(os.path.join(out_dir, f"{fig_name}.png"), dpi=120)
+        plt.close()
+    else:
+        plt.show()
 
-    path = sys.argv[1]
-    title_prefix = infer_title_from_filename(path)
 
-    ep, reward, success, epsilon, collected, deposited = read_csv(path)
+def plot_runs(paths: list[str], window: int = 20, points: int = 2000, kind: str = "percentile",
+              out_dir: Optional[str] = None) -> None:
+    """
+    Desenha as curvas das corridas; corridas com o mesmo label (run_label: as seeds de um agente/config)
+    dao uma curva media com banda, e cada label tem a sua.
+    """
+    if not paths:
+        raise ValueError("Nenhuma corrida encontrada")
+    n = max(count_rows(p) for p in paths)
+    groups = {label: [summarize_run(p, window, points, n) for p in ps] for label, ps in group_runs(paths).items()}
+    runs = [r for rs in groups.values() for r in rs]
+    title_prefix = infer_title_from_filename(paths[0])
+    label_band = "p10-p90" if kind == "percentile" else "IC 95%"
 
-    w = 20
-    reward_ma = moving_avg(reward, w)
-    success_ma = moving_avg(success, w)
+    def draw(field: str, label: str, raw: bool = False):
+        drawn = False
+        for group, members in groups.items():
+            rows = [r[field]["ma"] for r in members if field in r]
+            if not rows:
+                continue
+            drawn = True
+            x = rows[0].x()
+            name = f"{group} — {label}" if len(groups) > 1 else label
+            if len(rows) == 1:
+                # Uma corrida: envelope min/max da serie (e da media movel) em cada intervalo
+                line, = plt.plot(x, rows[0].mean(), linewidth=2, label=f"{name} (média móvel, w={window})")
+                if raw:
+                    r = members[0][field]["raw"]
+                    plt.fill_between(x, r.lo(), r.hi(), alpha=0.15, color=line.get_color(), label=f"{name} (min/max)")
+            else:
+                mean, lo, hi = band(np.vstack([r.mean() for r in rows]), kind)
+                line, = plt.plot(x, mean, linewidth=2, label=f"{name} (média, w={window})")
+                plt.fill_between(x, lo, hi, alpha=0.25, color=line.get_color(),
+                                 label=f"{name} ({label_band}, {len(rows)} corridas)")
+        return drawn
 
     #REWARD
     plt.figure()
-    plt.plot(ep, reward, alpha=0.3, label="Reward")
-    plt.plot(ep, reward_ma, linewidth=2, label=f"Reward (média móvel, w={w})")
+    draw("total_reward", "Reward", raw=True)
     plt.xlabel("Episódio")
     plt.ylabel("Total reward")
     plt.title(f"{title_prefix} — Curva de Aprendizagem (Reward)")
     plt.legend()
     plt.grid(True)
-    plt.show()
+    _show("reward", out_dir)
 
     #SUCCESS
     plt.figure()
-    plt.plot(ep, success_ma)
+    draw("success", "Success rate")
     plt.xlabel("Episódio")
     plt.ylabel("Success rate (média móvel)")
-    plt.title(f"{title_prefix} — Success rate (média móvel, w={w})")
+    plt.title(f"{title_prefix} — Success rate (média móvel, w={window})")
+    plt.legend()
     plt.grid(True)
-    plt.show()
+    _show("success", out_dir)
 
-    #COLLECTED / DEPOSITED
-    if collected is not None or deposited is not None:
+    #COLLECTED / DEPOSITED (so se alguma corrida tiver recursos)
+    if any(r[k]["raw"].maxs.max() > 0 for r in runs for k in ("collected", "deposited") if k in r):
         plt.figure()
-
-        if collected is not None:
-            collected_ma = moving_avg(collected, w)
-            plt.plot(ep, collected_ma, label="Collected (média móvel)")
-
-        if deposited is not None:
-            deposited_ma = moving_avg(deposited, w)
-            plt.plot(ep, deposited_ma, label="Deposited (média móvel)")
-
+        draw("collected", "Collected")
+        draw("deposited", "Deposited")
         plt.xlabel("Episódio")
         plt.ylabel("Recursos (média móvel)")
-        plt.title(f"{title_prefix} — Collected/Deposited (média móvel, w={w})")
+        plt.title(f"{title_prefix} — Collected/Deposited (média móvel, w={window})")
         plt.legend()
         plt.grid(True)
-        plt.show()
+        _show("collected_deposited", out_dir)
 
-    #EPSILON
-    if epsilon is not None:
+    #EPSILON (so no Q-learning; nos outros agentes a coluna fica a -1)
+    if any(r["epsilon"]["raw"].maxs.max() >= 0 for r in runs if "epsilon" in r):
         plt.figure()
-        plt.plot(ep, epsilon)
+        draw("epsilon", "Epsilon")
         plt.xlabel("Episódio")
         plt.ylabel("Epsilon")
         plt.title(f"{title_prefix} — Evolução do epsilon")
+        plt.legend()
         plt.grid(True)
-        plt.show()
+        _show("epsilon", out_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Curvas de aprendizagem (CSV ou .bin, uma ou varias corridas)")
+    parser.add_argument("paths", nargs="+", help="ficheiros, globs ou pastas (ex: outputs/batch_eval)")
+    parser.add_argument("--window", type=int, default=20, help="janela da media movel")
+    parser.add_argument("--points", type=int, default=2000, help="nº maximo de pontos por curva")
+    parser.add_argument("--band", choices=["percentile", "ci"], default="percentile",
+                        help="banda entre corridas: p10-p90 ou IC 95%% da media")
+    parser.add_argument("--out", default=None, help="pasta para guardar PNGs (por omissao abre as janelas)")
+    args = parser.parse_args()
+
+    plot_runs(find_runs(args.paths), window=args.window, points=args.points, kind=args.band, out_dir=args.out)
@@ -0,0 +1,45 @@
+"""
+Execucao de jobs independentes num pool de processos (partilhado pela avaliacao
+multi-seed, sweeps, early-stopping e treino por geracoes do novelty).
+"""
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, Optional
+
+
+def _run_chunk(fn: Callable, jobs: list[tuple[int, object]]) -> list[tuple[int, object]]:
+    return [(i, fn(job)) for i, job in jobs]
+
+
+def iter_jobs(fn: Callable, jobs: list, workers: Optional[int] = None,
+              chunksize: int = 1, executor: Optional[Executor] = None) -> Iterator[tuple[int, object]]:
+    """
+    Aplica fn a cada job e devolve (indice, resultado) a medida que cada job termina.
+
+    - fn: funcao de topo de modulo (tem de ser picklable para ir para outro processo)
+    - workers: nº de processos (None = nº de CPUs; 1 = corre no processo atual, em serie)
+    - chunksize: nº de jobs enviados de cada vez a um worker
+    - executor: pool ja criado (reutilizado entre chamadas, ex: uma geracao de cada vez)
+    """
+    indexed = list(enumerate(jobs))
+    chunksize = max(1, chunksize)
+    chunks = [indexed[k:k + chunksize] for k in range(0, len(indexed), chunksize)]
+    if executor is not None:
+        futures = [executor.submit(_run_chunk, fn, c) for c in chunks]
+        for fut in as_completed(futures):
+            yield from fut.result()
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(indexed)))
+
+    if workers == 1:
+        for i, job in indexed:
+            yield i, fn(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_chunk, fn, c) for c in chunks]
+        for fut in as_completed(futures):
+            yield from fut.result()
@@ -0,0 +1,160 @@
+"""
+Profiling por fase do passo de simulacao (opt-in: Config.profile).
+
+Fases:
+- reset: ambiente.reset (geracao do mapa)
+- sense: ambiente.observacaoPara (sensores), incluindo a observacao pos-acao feita dentro de agir
+- decide: agente.age
+- act: ambiente.agir e ambiente.atualizacao (sem o tempo dos sensores chamados la dentro)
+- learn: agente.avaliacaoEstadoAtual e agente.end_episode
+- other: resto do episodio (ciclo do motor, metricas, observadores)
+
+Os metodos sao embrulhados na instancia (so com profiling ligado: sem profiling nao ha custo nenhum)
+e cada chamada mede perf_counter_ns. O tempo e exclusivo: chamadas aninhadas (agir -> observacaoPara)
+contam so para a fase mais interior. Com varios agentes (n_agentes > 1) todos sao embrulhados.
+O treino por geracoes do novelty (population) corre os episodios noutros processos e nao e suportado.
+"""
+import cProfile
+import os
+from time import perf_counter_ns
+from typing import Optional
+
+from sim.metrics import CsvSink
+from sim.observers import Observer
+
+
+PHASES = ("reset", "sense", "decide", "act", "learn", "other")
+
+#(objeto, metodo, fase): objeto = "ambiente" | "agente"
+TIMED_METHODS = (
+    ("ambiente", "reset", "reset"),
+    ("ambiente", "observacaoPara", "sense"),
+    ("ambiente", "agir", "act"),
+    ("ambiente", "atualizacao", "act"),
+    ("agente", "age", "decide"),
+    ("agente", "avaliacaoEstadoAtual", "learn"),
+    ("agente", "end_episode", "learn"),
+)
+
+
+class _Timed:
+    #Embrulha um metodo e soma o seu tempo exclusivo a uma fase do profiler
+    __slots__ = ("fn", "phase", "profiler")
+
+    def __init__(self, fn, phase: str, profiler: "PhaseProfiler"):
+        self.fn = fn
+        self.phase = phase
+        self.profiler = profiler
+
+    def __call__(self, *args, **kwargs):
+        p = self.profiler
+        saved = p._nested
+        p._nested = 0
+        t0 = perf_counter_ns()
+        out = self.fn(*args, **kwargs)
+        dt = perf_counter_ns() - t0
+        p.episode[self.phase] += dt - p._nested
+        p._nested = saved + dt
+        return out
+
+
+class PhaseProfiler(Observer):
+    """
+    Observador que mede o tempo por fase e junta ao summary:
+    profile_<fase>_s, profile_<fase>_pct, steps_per_sec, episodes_per_sec.
+
+    - csv_path: CSV com o tempo (ns) de cada fase por episodio
+    - cprofile: (primeiro, ultimo) episodio a capturar com cProfile; as stats vao para stats_path (pstats).
+      A captura comeca antes do reset do primeiro episodio (no episodio 1, antes de MotorDeSimulacao.inicia)
+    """
+
+    def __init__(self, csv_path: Optional[str] = None, cprofile: Optional[tuple] = None,
+                 stats_path: Optional[str] = None, flush_every: int = 1000):
+        self.totals = dict.fromkeys(PHASES, 0)
+        self.episode = dict.fromkeys(PHASES, 0)
+        self.steps = 0
+        self.episodes = 0
+        self._nested = 0
+        self._t0 = 0
+        self.sink = None
+        if csv_path:
+            header = ["episode", "steps", *(f"{p}_ns" for p in PHASES)]
+            self.sink = CsvSink(csv_path, flush_every, header=header)
+        self.cprofile = tuple(cprofile) if cprofile else None
+        self.stats_path = stats_path or "outputs/profile.prof"
+        self._profile: Optional[cProfile.Profile] = None
+
+    def instala(self, motor) -> None:
+        #Embrulha os metodos das fases no ambiente e em todos os agentes do motor
+        alvos = {"ambiente": [motor._ambiente], "agente": motor._agentes}
+        for nome, metodo, fase in TIMED_METHODS:
+            for obj in alvos[nome]:
+                fn = getattr(obj, metodo, None)
+                if fn is not None and not isinstance(fn, _Timed):
+                    setattr(obj, metodo, _Timed(fn, fase, self))
+
+    def comeca_captura(self, ep_i: int) -> None:
+        #Liga o cProfile se o episodio ep_i (o proximo a correr) estiver na janela
+        if self.cprofile and self._profile is None and self.cprofile[0] <= ep_i <= self.cprofile[1]:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def on_run_start(self, motor) -> None:
+        self.instala(motor)
+        # Ao retomar de um checkpoint a janela conta a partir do episodio seguinte ao checkpoint
+        proximo = motor.episodios_feitos + 1
+        if self._profile is not None and not self.cprofile[0] <= proximo <= self.cprofile[1]:
+            self._profile.disable()
+            self._profile = None
+        self.comeca_captura(proximo)
+
+    def on_episode_start(self, motor, ep_i: int) -> None:
+        self._t0 = perf_counter_ns()
+
+    def on_episode_end(self, motor, ep_i: int, ep) -> None:
+        wall = perf_counter_ns() - self._t0
+        ep_ns = self.episode
+        # O reset acontece antes de on_episode_start: entra no total, mas "other" so conta o resto
+        ep_ns["other"] = max(0, wall - sum(v for k, v in ep_ns.items() if k not in ("other", "reset")))
+        if self.sink is not None:
+            self.sink.write([ep_i, ep.steps, *(ep_ns[p] for p in PHASES)])
+        for k, v in ep_ns.items():
+            self.totals[k] += v
+            ep_ns[k] = 0
+        self.steps += ep.steps
+        self.episodes += 1
+        if self._profile is not None and ep_i >= self.cprofile[1]:
+            self._dump_cprofile()
+        # O proximo episodio comeca pelo reset (antes de on_episode_start): a captura tem de comecar ja
+        self.comeca_captura(ep_i + 1)
+
+    def _dump_cprofile(self) -> None:
+        self._profile.disable()
+        if os.path.dirname(self.stats_path):
+            os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+        self._profile.dump_stats(self.stats_path)
+        self._profile = None
+
+    def on_run_end(self, motor, summary: dict) -> None:
+        if self._profile is not None:
+            self._dump_cprofile()
+        if self.sink is not None:
+            self.sink.flush()
+        summary.update(self.summary())
+
+    def summary(self) -> dict:
+        total = sum(self.totals.values())
+        out = {}
+        for p in PHASES:
+            out[f"profile_{p}_s"] = self.totals[p] / 1e9
+            out[f"profile_{p}_pct"] = 100.0 * self.totals[p] / total if total else 0.0
+        secs = total / 1e9
+        out["steps_per_sec"] = self.steps / secs if secs else 0.0
+        out["episodes_per_sec"] = self.episodes / secs if secs else 0.0
+        return out
+
+    def __getstate__(self) -> dict:
+        #O cProfile ativo nao viaja com pickle (hyperband): a captura so e feita num processo
+        state = dict(self.__dict__)
+        state["_profile"] = None
+        return state
@@ -0,0 +1,78 @@
+import math
+from typing import Iterable, Optional, Tuple
+
+
+class ResourceIndex:
+    """
+    Indice espacial dos recursos do Foraging: grelha de baldes (buckets) de B x B celulas.
+
+    - nearest(x, y) procura por aneis de baldes a volta do agente e para quando o anel seguinte
+      ja nao pode ter nada mais perto (distancia minima ao anel > melhor distancia encontrada),
+      por isso so visita os baldes perto do recurso mais proximo em vez de todos os recursos
+    - remove(p) e O(tamanho do balde): o indice acompanha os recursos apanhados em agir
+
+    Empates na distancia Manhattan resolvem-se como na procura linear sobre env.recursos
+    (fica o primeiro pela ordem de iteracao do set). Depois do reset o set so perde elementos,
+    e a remocao nao muda a ordem dos restantes, por isso basta guardar a ordem inicial (rank).
+    """
+
+    #Abaixo disto a procura linear e mais rapida do que manter o indice
+    MIN_SIZE = 64
+
+    def __init__(self, recursos: Iterable[Tuple[int, int]], width: int, height: int,
+                 bucket: Optional[int] = None):
+        recursos = list(recursos)
+        self.size = len(recursos)
+        # ~2 recursos por balde: B = sqrt(2 * area / n)
+        self.bucket = bucket or max(2, int(math.sqrt(2.0 * width * height / max(1, self.size))))
+        self.nbx = (width + self.bucket - 1) // self.bucket
+        self.nby = (height + self.bucket - 1) // self.bucket
+        self.buckets: list[list[Tuple[int, int]]] = [[] for _ in range(self.nbx * self.nby)]
+        self.rank: dict[Tuple[int, int], int] = {}
+        b = self.bucket
+        for i, (x, y) in enumerate(recursos):
+            self.rank[(x, y)] = i
+            self.buckets[(y // b) * self.nbx + x // b].append((x, y))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def remove(self, p: Tuple[int, int]) -> None:
+        b = self.bucket
+        self.buckets[(p[1] // b) * self.nbx + p[0] // b].remove(p)
+        self.size -= 1
+
+    def nearest(self, ax: int, ay: int) -> Tuple[Optional[Tuple[int, int]], int]:
+        #(recurso mais proximo em Manhattan, distancia); (None, 0) se nao houver recursos
+        if not self.size:
+            return None, 0
+        b = self.bucket
+        nbx, nby = self.nbx, self.nby
+        buckets = self.buckets
+        rank = self.rank
+        cbx, cby = ax // b, ay // b
+        max_r = max(cbx, nbx - 1 - cbx, cby, nby - 1 - cby)
+
+        best = None
+        best_d = 10**9
+        best_rank = 0
+        for r in range(max_r + 1):
+            # Celulas de um balde no anel r estao a pelo menos (r - 1) * B + 1 do agente
+            if r and (r - 1) * b + 1 > best_d:
+                break
+            y0, y1 = cby - r, cby + r
+            x0, x1 = max(0, cbx - r), min(nbx - 1, cbx + r)
+            for by in range(max(0, y0), min(nby - 1, y1) + 1):
+                if by == y0 or by == y1:
+                    xs = range(x0, x1 + 1)
+                else:
+                    xs = [bx for bx in (cbx - r, cbx + r) if 0 <= bx < nbx]
+                row = by * nbx
+                for bx in xs:
+                    for p in buckets[row + bx]:
+                        d = abs(p[0] - ax) + abs(p[1] - ay)
+                        if d < best_d or (d == best_d and rank[p] < best_rank):
+                            best_d = d
+                            best = p
+                            best_rank = rank[p]
+        return best, best_d
@@ -0,0 +1,87 @@
+"""
+Banco de cenarios: os mapas de todos os episodios gerados uma vez e guardados em disco.
+
+Cada linha do banco e o layout de um episodio (ver Ambiente.layout): indices y * width + x
+das celulas, pela ordem em que o reset as sorteia, e no fim o nº de mapas rejeitados e de alvos
+movidos nesse reset (solvable). O numero de obstaculos, recursos e agentes e fixo para a mesma
+configuracao, por isso o banco e uma matriz (episodios, celulas) guardada num .npy (uint16/uint32)
+e aberta com mmap: so as linhas usadas sao lidas do disco.
+
+O ficheiro e identificado por um hash dos parametros que definem os mapas (ambiente, tamanho,
+obstaculos, recursos, agentes, map_sampling, solvable e seed); o tipo de agente e o modo nao
+entram, por isso treino, teste e as avaliacoes em batch de agentes diferentes usam os mesmos mapas.
+As linhas sao geradas com os resets normais do ambiente, por isso um episodio do banco e
+exatamente o mapa que o ambiente geraria sem banco, e um banco com mais episodios serve
+qualquer corrida com menos (os primeiros episodios sao os mesmos).
+"""
+import copy
+import hashlib
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+
+#Parametros que definem a sequencia de mapas (entram no hash do ficheiro)
+CAMPOS = ("env", "width", "height", "obstacle_ratio", "n_recursos", "n_agentes", "map_sampling", "solvable", "seed")
+
+
+def chave(params: dict) -> str:
+    #Hash estavel dos parametros dos mapas
+    dados = json.dumps({k: params.get(k) for k in CAMPOS}, sort_keys=True)
+    return hashlib.sha1(dados.encode("utf-8")).hexdigest()[:16]
+
+
+def caminho(directory: str, params: dict) -> str:
+    return os.path.join(directory, f"{params['env']}_{params['width']}x{params['height']}_{chave(params)}.npy")
+
+
+class ScenarioBank:
+    def __init__(self, path: str):
+        self.path = path
+        self.layouts = np.load(path, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.layouts)
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self.layouts[i]
+
+    @staticmethod
+    def gera(ambiente, n: int) -> np.ndarray:
+        #Layouts dos primeiros n episodios de uma copia do ambiente (o original nao e alterado)
+        env = copy.deepcopy(ambiente)
+        env.cenarios = None
+        dtype = np.uint16 if env.width * env.height <= 1 << 16 else np.uint32
+        rows = []
+        for _ in range(n):
+            env.reset()
+            rows.append(env.layout())
+        return np.asarray(rows, dtype=dtype)
+
+    @classmethod
+    def abre(cls, directory: str, params: dict, n: int, ambiente) -> "ScenarioBank":
+        """
+        Banco com pelo menos n episodios para estes parametros: reutiliza o ficheiro em cache
+        ou gera-o a partir do ambiente (ainda sem reset feito) e guarda-o.
+        """
+        path = caminho(directory, params)
+        banco: Optional[ScenarioBank] = cls(path) if os.path.exists(path) else None
+        if banco is None or len(banco) < n:
+            layouts = cls.gera(ambiente, n)
+            os.makedirs(directory, exist_ok=True)
+            #Ficheiro temporario por processo: varias corridas em paralelo podem gerar o mesmo banco
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, layouts)
+            os.replace(tmp, path)
+            banco = cls(path)
+        return banco
+
+    def __getstate__(self) -> dict:
+        #O mmap nao vai no pickle (o motor viaja entre processos no hyperband): volta a ser aberto
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"])
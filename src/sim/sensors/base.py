@@ -1,7 +1,17 @@
-from abc import ABC, abstractmethod
+from abc import ABC
+
+from sim.observation import Observation
 
 
 class Sensor(ABC):
-    @abstractmethod
-    def sense(self, env, agent_pos):
-        raise NotImplementedError
+    #Cada sensor implementa pelo menos um dos dois metodos (o outro tem implementacao por omissao).
+
+    def sense_into(self, env, agent_pos, obs: Observation) -> None:
+        #Escreve as leituras diretamente na Observation reutilizada do agente
+        obs.update(self.sense(env, agent_pos))
+
+    def sense(self, env, agent_pos) -> dict:
+        #Compatibilidade: devolve so as chaves escritas por este sensor, como dict
+        obs = Observation()
+        self.sense_into(env, agent_pos, obs)
+        return obs.as_dict()
@@ -2,7 +2,7 @@ from sim.sensors.base import Sensor
 
 
 class DistanceSensor(Sensor):
-    def sense(self, env, agent_pos):
+    def sense_into(self, env, agent_pos, obs):
         ax, ay = agent_pos
         gx, gy = env.goal
-        return {"manhattan": abs(gx - ax) + abs(gy - ay)}
+        obs.manhattan = abs(gx - ax) + abs(gy - ay)
@@ -0,0 +1,18 @@
+from sim.sensors.base import Sensor
+
+
+class GeodesicFoodSensor(Sensor):
+    def sense_into(self, env, agent_pos, obs):
+        #Proximo passo e distancia ao recurso alcancavel mais proximo (campo BFS multi-fonte,
+        #atualizado pelo ambiente quando um recurso e apanhado)
+        ax, ay = agent_pos
+        field = env.campo_recursos()
+        d = field.distance(ax, ay) if env.recursos else -1
+        if d < 0:
+            # Sem recursos alcancaveis
+            obs.food_dx = 0
+            obs.food_dy = 0
+            obs.food_dist = 0
+            return
+        obs.food_dx, obs.food_dy = field.step(ax, ay)
+        obs.food_dist = d
@@ -0,0 +1,19 @@
+from sim.sensors.base import Sensor
+
+
+class GeodesicGoalSensor(Sensor):
+    def sense_into(self, env, agent_pos, obs):
+        #Proximo passo e distancia ao objetivo contornando obstaculos (campo BFS do ambiente).
+        #Substitui LighthouseDirectionSensor + DistanceSensor: escreve goal_dx/goal_dy e manhattan (= geodesica)
+        ax, ay = agent_pos
+        field = env.campo_goal()
+        d = field.distance(ax, ay)
+        if d < 0:
+            # Inalcancavel: volta a direcao/distancia em linha reta
+            gx, gy = env.goal
+            obs.goal_dx = 0 if gx == ax else (1 if gx > ax else -1)
+            obs.goal_dy = 0 if gy == ay else (1 if gy > ay else -1)
+            obs.manhattan = abs(gx - ax) + abs(gy - ay)
+            return
+        obs.goal_dx, obs.goal_dy = field.step(ax, ay)
+        obs.manhattan = d
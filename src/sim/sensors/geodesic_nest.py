@@ -0,0 +1,14 @@
+from sim.sensors.base import Sensor
+
+
+class GeodesicNestSensor(Sensor):
+    def sense_into(self, env, agent_pos, obs):
+        #Proximo passo em direcao ao ninho contornando obstaculos (campo BFS do ambiente)
+        ax, ay = agent_pos
+        field = env.campo_ninho()
+        if field.distance(ax, ay) < 0:
+            nx, ny = env.ninho
+            obs.nest_dx = 0 if nx == ax else (1 if nx > ax else -1)
+            obs.nest_dy = 0 if ny == ay else (1 if ny > ay else -1)
+            return
+        obs.nest_dx, obs.nest_dy = field.step(ax, ay)
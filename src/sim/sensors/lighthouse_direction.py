@@ -2,7 +2,7 @@ from sim.sensors.base import Sensor
 
 
 class LighthouseDirectionSensor(Sensor):
-    def sense(self, env, agent_pos):
+    def sense_into(self, env, agent_pos, obs):
         ax, ay = agent_pos
         gx, gy = env.goal
 
@@ -18,4 +18,5 @@ class LighthouseDirectionSensor(Sensor):
         elif gy < ay:
             dy = -1
 
-        return {"goal_dx": dx, "goal_dy": dy}
+        obs.goal_dx = dx
+        obs.goal_dy = dy
@@ -1,19 +1,20 @@
 from sim.sensors.base import Sensor
+from sim.grid import OBSTACLE
 
 
 class LocalGridSensor(Sensor):
-    def sense(self, env, agent_pos):
+    def sense_into(self, env, agent_pos, obs):
+        #Grelha 3x3 em obs.cells, indexada por (dy + 1) * 3 + (dx + 1)
         ax, ay = agent_pos
-        feats = {}
-        for dy in (-1, 0, 1):
-            for dx in (-1, 0, 1):
-                x = ax + dx
-                y = ay + dy
-                key = f"cell_{dx}_{dy}"
-                if not (0 <= x < env.width and 0 <= y < env.height):
-                    feats[key] = 1  # fora do mapa = parede
-                elif (x, y) in env.obstacles:
-                    feats[key] = 1  # obstáculo
-                else:
-                    feats[key] = 0
-        return feats
+        cells = obs.cells
+        if cells is None:
+            cells = obs.cells = [0] * 9
+        #A borda da grelha e obstaculo, por isso fora do mapa = parede sem verificar limites
+        buf = env.grid.buf
+        stride = env.grid.stride
+        i = 0
+        for k in (ay * stride + ax, (ay + 1) * stride + ax, (ay + 2) * stride + ax):
+            cells[i] = 1 if buf[k] == OBSTACLE else 0
+            cells[i + 1] = 1 if buf[k + 1] == OBSTACLE else 0
+            cells[i + 2] = 1 if buf[k + 2] == OBSTACLE else 0
+            i += 3
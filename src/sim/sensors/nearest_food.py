@@ -2,21 +2,28 @@ from sim.sensors.base import Sensor
 
 
 class NearestFoodSensor(Sensor):
-    def sense(self, env, agent_pos):
+    def sense_into(self, env, agent_pos, obs):
         ax, ay = agent_pos
         if not env.recursos:
-            return {"food_dx": 0, "food_dy": 0, "food_dist": 0}
+            obs.food_dx = 0
+            obs.food_dy = 0
+            obs.food_dist = 0
+            return
 
-        # recurso mais próximo por distância Manhattan
-        best = None
-        best_d = 10**9
-        for (fx, fy) in env.recursos:
-            d = abs(fx - ax) + abs(fy - ay)
-            if d < best_d:
-                best_d = d
-                best = (fx, fy)
+        # recurso mais próximo por distância Manhattan (indice espacial em mapas com muitos recursos)
+        index = getattr(env, "indice_recursos", None)
+        if index is not None:
+            best, best_d = index.nearest(ax, ay)
+        else:
+            best = None
+            best_d = 10**9
+            for (fx, fy) in env.recursos:
+                d = abs(fx - ax) + abs(fy - ay)
+                if d < best_d:
+                    best_d = d
+                    best = (fx, fy)
 
         fx, fy = best
-        dx = 0 if fx == ax else (1 if fx > ax else -1)
-        dy = 0 if fy == ay else (1 if fy > ay else -1)
-        return {"food_dx": dx, "food_dy": dy, "food_dist": best_d}
+        obs.food_dx = 0 if fx == ax else (1 if fx > ax else -1)
+        obs.food_dy = 0 if fy == ay else (1 if fy > ay else -1)
+        obs.food_dist = best_d
@@ -0,0 +1,24 @@
+from sim.observation import CELL_CENTER
+from sim.sensors.base import Sensor
+
+
+class NeighboursSensor(Sensor):
+    def sense_into(self, env, agent_pos, obs):
+        #Outros agentes nas 8 celulas a volta (grelha de ocupacao do ambiente, O(1)).
+        #As celulas ocupadas ficam bloqueadas em obs.cells (correr depois do LocalGridSensor).
+        ax, ay = agent_pos
+        cells = obs.cells
+        if cells is None:
+            cells = obs.cells = [0] * 9
+        width = env.width
+        height = env.height
+        ocupacao = env.ocupacao
+        n = 0
+        i = 0
+        for y in (ay - 1, ay, ay + 1):
+            for x in (ax - 1, ax, ax + 1):
+                if i != CELL_CENTER and 0 <= x < width and 0 <= y < height and ocupacao[y * width + x] >= 0:
+                    cells[i] = 1
+                    n += 1
+                i += 1
+        obs.neighbours = n
@@ -0,0 +1,74 @@
+"""
+Detecao de episodios encravados (agente em ciclo ou sem progresso), ao nivel do motor.
+
+Em cada passo o ambiente resume o estado relevante numa chave inteira (Ambiente.chave_estado:
+posicao do agente e, no Foraging, se transporta um recurso e quantos recursos faltam). O detetor
+so guarda chaves, por isso custa O(1) por passo e nao depende do agente:
+
+- ciclo (window > 0): a chave atual voltou pelo menos `repeats` vezes nas ultimas `window`
+  mudancas de chave, sem nenhuma chave nova pelo meio (anel com contagens, limpo quando aparece
+  um estado novo). Passos em que a chave nao muda (ex: bater na mesma parede ate um movimento
+  aleatorio a contornar) nao contam: so um ciclo real (A -> B -> A -> ...) encrava o episodio
+- sem progresso (patience > 0): ha `patience` passos seguidos sem nenhuma chave nova neste
+  episodio (o agente so revisita estados; apanhar ou depositar um recurso conta como chave nova)
+
+Os dois criterios sao independentes; 0 desliga cada um.
+"""
+from collections import deque
+from typing import Optional
+
+
+class StallDetector:
+    def __init__(self, window: int = 0, repeats: int = 20, patience: int = 0):
+        self.window = window
+        self.repeats = repeats
+        self.patience = patience
+        self._anel: deque = deque()
+        self._contagens: dict[int, int] = {}
+        self._vistas: set[int] = set()
+        self._ultima: Optional[int] = None
+        self._sem_progresso = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.window > 0 or self.patience > 0
+
+    def reset(self, chave: int) -> None:
+        #Inicio do episodio: a chave do estado inicial conta como vista
+        self._anel.clear()
+        self._contagens.clear()
+        self._vistas.clear()
+        self._ultima = None
+        self._sem_progresso = 0
+        self.update(chave)
+
+    def update(self, chave: int) -> bool:
+        #Regista a chave do passo; True se o episodio esta encravado
+        nova = chave not in self._vistas
+        if nova:
+            self._vistas.add(chave)
+        encravado = False
+        if self.window and chave != self._ultima:
+            anel, contagens = self._anel, self._contagens
+            if nova:
+                # Estado novo: o agente ainda explora, as repeticoes anteriores nao sao um ciclo
+                anel.clear()
+                contagens.clear()
+            elif len(anel) == self.window:
+                velha = anel.popleft()
+                if contagens[velha] == 1:
+                    del contagens[velha]
+                else:
+                    contagens[velha] -= 1
+            anel.append(chave)
+            n = contagens.get(chave, 0) + 1
+            contagens[chave] = n
+            encravado = n >= self.repeats
+        self._ultima = chave
+        if self.patience:
+            if nova:
+                self._sem_progresso = 0
+            else:
+                self._sem_progresso += 1
+                encravado = encravado or self._sem_progresso >= self.patience
+        return encravado
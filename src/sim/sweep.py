@@ -0,0 +1,218 @@
+"""
+Sweep de hiperparametros (grid ou random search) para os agentes que aprendem.
+
+O espaco de procura e um dict de chaves -> valores, onde a chave pode ser um campo da Config
+("obstacle_ratio") ou uma chave de um sub-config ("learning.alpha", "novelty.sigma").
+
+Para cada ponto e seed corre-se o pipeline treino + teste num pool de processos.
+Cada trial tem a sua propria pasta de artefactos (Q-table/policy e CSVs), por isso trials
+em paralelo nunca escrevem por cima de outputs/farol_q.npy ou outputs/foraging_novelty_policy.pkl.
+
+Uso (dentro de src/):
+    python -m sim.sweep params/farol_learning_sweep.json
+"""
+import copy
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import statistics as stats
+import sys
+from dataclasses import replace
+from typing import Optional
+
+from sim.motor_de_simulacao import Config
+from sim.parallel_eval import run_config
+from sim.pool import iter_jobs
+
+
+def set_path(cfg: Config, key: str, value) -> None:
+    #Aplica um valor a um campo da Config ou a uma chave de sub-config ("learning.alpha")
+    field, _, sub = key.partition(".")
+    if not hasattr(cfg, field):
+        raise ValueError(f"Campo desconhecido na Config: {field}")
+    if not sub:
+        setattr(cfg, field, value)
+        return
+    d = copy.deepcopy(getattr(cfg, field) or {})
+    d[sub] = value
+    setattr(cfg, field, d)
+
+
+def grid(space: dict) -> list[dict]:
+    #Produto cartesiano de todas as listas de valores
+    keys = list(space)
+    return [dict(zip(keys, vals)) for vals in itertools.product(*(space[k] for k in keys))]
+
+
+def _sample(spec, rng: random.Random):
+    #Listas -> escolha uniforme; tuplos/listas com tipo -> distribuicao
+    if isinstance(spec, (list, tuple)) and spec and spec[0] in ("uniform", "loguniform", "randint", "choice"):
+        kind = spec[0]
+        if kind == "uniform":
+            return rng.uniform(spec[1], spec[2])
+        if kind == "loguniform":
+            return math.exp(rng.uniform(math.log(spec[1]), math.log(spec[2])))
+        if kind == "randint":
+            return rng.randint(spec[1], spec[2])
+        return rng.choice(spec[1])
+    if isinstance(spec, (list, tuple)):
+        return rng.choice(list(spec))
+    return spec
+
+
+def random_search(space: dict, n_trials: int, seed: int = 0) -> list[dict]:
+    """
+    Amostra n_trials pontos do espaco. Cada valor pode ser:
+    - uma lista de valores (escolha uniforme)
+    - ["uniform", lo, hi] | ["loguniform", lo, hi] | ["randint", lo, hi] | ["choice", [...]]
+    """
+    rng = random.Random(seed)
+    return [{k: _sample(spec, rng) for k, spec in space.items()} for _ in range(n_trials)]
+
+
+def _artifact_paths(cfg: Config, trial_dir: str) -> None:
+    #Redireciona os artefactos da aprendizagem para a pasta do trial
+    if cfg.agent_type == "learning":
+        cfg.qtable_path = os.path.join(trial_dir, os.path.basename(cfg.qtable_path or "qtable.npy"))
+    elif cfg.agent_type == "novelty":
+        cfg.policy_path = os.path.join(trial_dir, os.path.basename(cfg.policy_path or "policy.pkl"))
+
+
+def make_trial(train_base: Config, test_base: Config, point: dict, seed: int,
+               trial_dir: str) -> tuple[Config, Config]:
+    #Configs de treino e teste de um trial, com os mesmos hiperparametros e artefactos proprios
+    train = replace(train_base, seed=seed, mode="train")
+    test = replace(test_base, seed=seed, mode="test")
+    for k, v in point.items():
+        set_path(train, k, v)
+        set_path(test, k, v)
+
+    _artifact_paths(train, trial_dir)
+    test.qtable_path = train.qtable_path
+    test.policy_path = train.policy_path
+    train.csv_path = os.path.join(trial_dir, "train.csv")
+    test.csv_path = os.path.join(trial_dir, "test.csv")
+    return train, test
+
+
+def run_trial(job: tuple[Config, Config]) -> dict:
+    #Pipeline de um trial: treina e depois avalia com o artefacto acabado de treinar
+    train, test = job
+    os.makedirs(os.path.dirname(train.csv_path), exist_ok=True)
+    return {"train": run_config(train), "test": run_config(test)}
+
+
+def _aggregate(point: dict, rows: list[dict]) -> dict:
+    def ms(vals):
+        return (stats.mean(vals), stats.pstdev(vals) if len(vals) > 1 else 0.0)
+
+    test_succ = ms([r["test"]["success_rate"] for r in rows])
+    test_reward = ms([r["test"]["avg_reward"] for r in rows])
+    train_succ = ms([r["train"]["success_rate"] for r in rows])
+    return {
+        **point,
+        "n_seeds": len(rows),
+        "test_success_mean": test_succ[0],
+        "test_success_std": test_succ[1],
+        "test_reward_mean": test_reward[0],
+        "test_reward_std": test_reward[1],
+        "train_success_mean": train_succ[0],
+    }
+
+
+def run_sweep(train_base: Config, test_base: Config, points: list[dict], seeds,
+              out_dir: str = "outputs/sweep", workers: Optional[int] = None,
+              chunksize: int = 1, verbose: bool = True) -> list[dict]:
+    """
+    Corre treino + teste para cada (ponto, seed) num pool de processos e devolve uma tabela
+    (uma linha por ponto) ordenada por success rate de teste. A tabela e guardada em out_dir/results.csv.
+    """
+    seeds = [int(s) for s in seeds]
+    jobs, owners = [], []
+    for t, point in enumerate(points):
+        for s in seeds:
+            trial_dir = os.path.join(out_dir, f"trial_{t:03d}", f"seed_{s}")
+            jobs.append(make_trial(train_base, test_base, point, s, trial_dir))
+            owners.append(t)
+
+    per_point: list[list] = [[None] * len(seeds) for _ in points]
+    for done, (i, res) in enumerate(iter_jobs(run_trial, jobs, workers=workers, chunksize=chunksize), start=1):
+        t = owners[i]
+        per_point[t][i - t * len(seeds)] = res
+        if verbose:
+            print(f"[SWEEP] {done}/{len(jobs)} trial={t} seed={jobs[i][0].seed} "
+                  f"test_success={res['test']['success_rate']:.3f}")
+
+    table = [dict(trial=t, **_aggregate(points[t], rows)) for t, rows in enumerate(per_point)]
+    table.sort(key=lambda r: (-r["test_success_mean"], -r["test_reward_mean"], r["trial"]))
+    for rank, row in enumerate(table, start=1):
+        row["rank"] = rank
+
+    os.makedirs(out_dir, exist_ok=True)
+    out_csv = os.path.join(out_dir, "results.csv")
+    cols = ["rank", "trial", *points[0].keys(), "n_seeds", "test_success_mean", "test_success_std",
+            "test_reward_mean", "test_reward_std", "train_success_mean"] if points else []
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=cols)
+        w.writeheader()
+        w.writerows(table)
+    if verbose:
+        print(f"\n[SWEEP] Tabela guardada em: {out_csv}")
+    return table
+
+
+def _load_config(path: str) -> Config:
+    with open(path, "r", encoding="utf-8") as f:
+        return Config.from_dict(json.load(f))
+
+
+def main(spec_path: str) -> list[dict]:
+    """
+    Corre um sweep descrito num JSON:
+    {
+      "train": "params/farol_learning_train.json",
+      "test": "params/farol_learning_test.json",
+      "grid": {"learning.alpha": [0.05, 0.1]}          ou  "random": {...}, "n_trials": 20,
+      "overrides": {"n_episodios": 500},                (opcional, aplicado ao treino)
+      "seeds": [0, 1, 2], "workers": null, "out_dir": "outputs/sweep_farol"
+    }
+    """
+    with open(spec_path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+
+    train_base = _load_config(spec["train"])
+    test_base = _load_config(spec["test"])
+    for k, v in spec.get("overrides", {}).items():
+        set_path(train_base, k, v)
+
+    if "grid" in spec:
+        points = grid(spec["grid"])
+    else:
+        points = random_search(spec["random"], int(spec.get("n_trials", 10)), int(spec.get("search_seed", 0)))
+
+    table = run_sweep(
+        train_base,
+        test_base,
+        points,
+        spec.get("seeds", [0, 1, 2]),
+        out_dir=spec.get("out_dir", "outputs/sweep"),
+        workers=spec.get("workers", None),
+        chunksize=int(spec.get("chunksize", 1)),
+    )
+
+    print("\n=== TOP 5 ===")
+    for row in table[:5]:
+        params = ", ".join(f"{k}={row[k]}" for k in points[0])
+        print(f"#{row['rank']} trial={row['trial']} | {params} | "
+              f"test_success={row['test_success_mean']:.4f} ± {row['test_success_std']:.4f}")
+    return table
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python -m sim.sweep <sweep.json>")
+        sys.exit(1)
+    main(sys.argv[1])
@@ -0,0 +1,146 @@
+from typing import Optional
+
+import numpy as np
+
+from sim.actions import ACTION_DX, ACTION_DY
+from sim.farol_ambiente import AmbienteFarol
+from sim.grid import OBSTACLE
+
+
+class VecAmbienteFarol:
+    """
+        Versao vetorizada do Ambiente de Farol
+
+        Mantem N mapas independentes em arrays NumPy e avanca todos em lockstep:
+        -obstacles: bitmap (N, H, W)
+        -agent / goal: coordenadas (N, 2) no formato (x, y)
+
+        As regras por episodio sao as mesmas do AmbienteFarol:
+        -atingir objetivo: +100
+        -passo: -1
+        -colisao: -5 (o agente fica no mesmo sitio)
+
+        A geracao dos mapas e delegada a um AmbienteFarol por env (seed + i), por isso
+        o mapa i e exatamente o mesmo que AmbienteFarol(seed=seed + i, ...) geraria com os mesmos
+        map_sampling e solvable.
+        As acoes sao indices de sim.actions.ACTIONS.
+        """
+    def __init__(
+        self,
+        n_envs: int,
+        width=8,
+        height=8,
+        obstacle_ratio=0.18,
+        seed: Optional[int] = None,
+        max_passos: Optional[int] = None,
+        map_sampling: str = "vectorized",
+        solvable: str = "off",
+    ):
+        self.n_envs = n_envs
+        self.width = width
+        self.height = height
+        self.obstacle_ratio = obstacle_ratio
+        self.max_passos = max_passos
+
+        #Um gerador de mapas por env (reutiliza o reset do ambiente escalar)
+        self._geradores = [
+            AmbienteFarol(width, height, obstacle_ratio, None if seed is None else seed + i,
+                          map_sampling=map_sampling, solvable=solvable)
+            for i in range(n_envs)
+        ]
+
+        #Obstaculos com borda de 1 celula (fora do mapa = parede), usado pelo sensor local
+        self.padded = np.ones((n_envs, height + 2, width + 2), dtype=bool)
+        self.agent = np.zeros((n_envs, 2), dtype=np.int64)
+        self.goal = np.zeros((n_envs, 2), dtype=np.int64)
+
+        #Estado de cada episodio (envs por inicializar contam como terminados)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.done = np.ones(n_envs, dtype=bool)
+        self.success = np.zeros(n_envs, dtype=bool)
+
+        self._dx = np.asarray(ACTION_DX, dtype=np.int64)
+        self._dy = np.asarray(ACTION_DY, dtype=np.int64)
+        self._env_idx = np.arange(n_envs)
+        self._off = np.arange(3)
+
+    @property
+    def obstacles(self) -> np.ndarray:
+        #Bitmap (N, H, W) dos obstaculos, sem a borda
+        return self.padded[:, 1:-1, 1:-1]
+
+    def reset(self, mask: Optional[np.ndarray] = None):
+        #Gera um novo mapa para os envs selecionados (todos se mask for None)
+        if mask is None:
+            idx = self._env_idx
+        else:
+            idx = np.flatnonzero(mask)
+
+        for i in idx:
+            g = self._geradores[i]
+            g.reset()
+            #Copia direta da grelha do gerador (a borda ja e obstaculo)
+            np.equal(g.grid.array, OBSTACLE, out=self.padded[i])
+            self.agent[i] = g.agent_pos
+            self.goal[i] = g.goal
+
+        self.steps[idx] = 0
+        self.done[idx] = False
+        self.success[idx] = False
+        return self.observacoes()
+
+    def observacoes(self) -> dict:
+        #Observacoes em batch, com a mesma informacao dos sensores do Farol
+        ax = self.agent[:, 0]
+        ay = self.agent[:, 1]
+        gx = self.goal[:, 0]
+        gy = self.goal[:, 1]
+
+        #Grelha 3x3 centrada no agente, indexada por [dy + 1, dx + 1]
+        cells = self.padded[
+            self._env_idx[:, None, None],
+            ay[:, None, None] + self._off[None, :, None],
+            ax[:, None, None] + self._off[None, None, :],
+        ].astype(np.int8)
+
+        return {
+            "cells": cells,
+            "goal_dx": np.sign(gx - ax),
+            "goal_dy": np.sign(gy - ay),
+            "manhattan": np.abs(gx - ax) + np.abs(gy - ay),
+            "agent": self.agent.copy(),
+            "goal": self.goal.copy(),
+        }
+
+    def step(self, actions):
+        #Aplica uma acao por env. Envs ja terminados ficam parados com recompensa 0.
+        #Devolve (obs, recompensas, done, success); done/success sao acumulados no episodio.
+        act = np.asarray(actions, dtype=np.int64)
+        active = ~self.done
+
+        ax = self.agent[:, 0]
+        ay = self.agent[:, 1]
+        nx = ax + self._dx[act]
+        ny = ay + self._dy[act]
+
+        #Validar o movimento (a borda do padded trata de sair do mapa)
+        blocked = self.padded[self._env_idx, ny + 1, nx + 1]
+        nx = np.where(blocked, ax, nx)
+        ny = np.where(blocked, ay, ny)
+
+        recompensas = np.where(blocked, -5.0, -1.0)
+        chegou = (nx == self.goal[:, 0]) & (ny == self.goal[:, 1])
+        recompensas[chegou] = 100.0
+
+        self.agent[active, 0] = nx[active]
+        self.agent[active, 1] = ny[active]
+        recompensas[~active] = 0.0
+
+        self.steps[active] += 1
+        chegou &= active
+        self.success |= chegou
+        self.done |= chegou
+        if self.max_passos is not None:
+            self.done |= active & (self.steps >= self.max_passos)
+
+        return self.observacoes(), recompensas, self.done.copy(), self.success.copy()
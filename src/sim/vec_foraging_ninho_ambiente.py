@@ -0,0 +1,228 @@
+from typing import Optional
+
+import numpy as np
+
+from sim.actions import ACTION_DX, ACTION_DY
+from sim.foraging_ninho_ambiente import AmbienteForagingNinho
+from sim.grid import OBSTACLE, RESOURCE
+
+
+class VecAmbienteForagingNinho:
+    """
+    Versao vetorizada do Ambiente de Foraging Ninho
+
+    Mantem N mapas independentes em arrays NumPy e avanca todos em lockstep:
+    -obstacles: bitmap (N, H, W)
+    -recursos: bitmask (N, H, W) com os recursos(F) ainda no mapa
+    -food_x / food_y / food_vivo: coordenadas (N, F) dos recursos de cada env e se ainda estao no mapa
+     (o recurso mais proximo custa O(N*F) por passo, sem percorrer a grelha)
+    -agent / ninho: coordenadas (N, 2) no formato (x, y)
+    -carrying, coletados, depositados: vetores (N,)
+
+    Ao contrario do ambiente escalar, o estado "carrying" vive no ambiente e nao no agente.
+
+    Regras (iguais ao AmbienteForagingNinho):
+    -o agente transporta no máximo 1 recurso
+    -ao apanhar um recurso: +20
+    -ao depositar no ninho: +30
+    -passo: -1
+    -colisao: -5
+    -entregar todos os recursos: +50
+
+    A geracao dos mapas e delegada a um AmbienteForagingNinho por env (seed + i).
+    Em caso de empate no recurso mais proximo, ganha o primeiro em ordem (y, x).
+    As acoes sao indices de sim.actions.ACTIONS.
+    """
+    def __init__(
+        self,
+        n_envs: int,
+        width=8,
+        height=8,
+        obstacle_ratio=0.12,
+        n_recursos=6,
+        seed: Optional[int] = None,
+        max_passos: Optional[int] = None,
+        map_sampling: str = "vectorized",
+        solvable: str = "off",
+    ):
+        self.n_envs = n_envs
+        self.width = width
+        self.height = height
+        self.obstacle_ratio = obstacle_ratio
+        self.n_recursos = n_recursos
+        self.max_passos = max_passos
+
+        #Um gerador de mapas por env (reutiliza o reset do ambiente escalar)
+        self._geradores = [
+            AmbienteForagingNinho(
+                width, height, obstacle_ratio, n_recursos, None if seed is None else seed + i,
+                map_sampling=map_sampling, solvable=solvable
+            )
+            for i in range(n_envs)
+        ]
+
+        #Elementos do mapa (obstaculos com borda de 1 celula: fora do mapa = parede)
+        self.padded = np.ones((n_envs, height + 2, width + 2), dtype=bool)
+        self.recursos = np.zeros((n_envs, height, width), dtype=bool)
+        self.ninho = np.zeros((n_envs, 2), dtype=np.int64)
+        #Recursos de cada env por ordem (y, x); pelo menos 1 coluna para o argmin
+        n_food = max(1, n_recursos)
+        self.food_x = np.zeros((n_envs, n_food), dtype=np.int64)
+        self.food_y = np.zeros((n_envs, n_food), dtype=np.int64)
+        self.food_vivo = np.zeros((n_envs, n_food), dtype=bool)
+        self.agent = np.zeros((n_envs, 2), dtype=np.int64)
+
+        #Estado interno e contadores por env
+        self.carrying = np.zeros(n_envs, dtype=bool)
+        self.coletados = np.zeros(n_envs, dtype=np.int64)
+        self.depositados = np.zeros(n_envs, dtype=np.int64)
+
+        #Estado de cada episodio (envs por inicializar contam como terminados)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.done = np.ones(n_envs, dtype=bool)
+        self.success = np.zeros(n_envs, dtype=bool)
+
+        self._dx = np.asarray(ACTION_DX, dtype=np.int64)
+        self._dy = np.asarray(ACTION_DY, dtype=np.int64)
+        self._env_idx = np.arange(n_envs)
+        self._off = np.arange(3)
+
+    @property
+    def obstacles(self) -> np.ndarray:
+        #Bitmap (N, H, W) dos obstaculos, sem a borda
+        return self.padded[:, 1:-1, 1:-1]
+
+    def reset(self, mask: Optional[np.ndarray] = None):
+        #Gera um novo mapa para os envs selecionados (todos se mask for None)
+        if mask is None:
+            idx = self._env_idx
+        else:
+            idx = np.flatnonzero(mask)
+
+        for i in idx:
+            g = self._geradores[i]
+            g.reset()
+            #Copia direta da grelha do gerador (a borda ja e obstaculo)
+            np.equal(g.grid.array, OBSTACLE, out=self.padded[i])
+            np.equal(g.grid.cells, RESOURCE, out=self.recursos[i])
+            self._guarda_recursos(i)
+            self.agent[i] = g.agent_pos
+            self.ninho[i] = g.ninho
+
+        self.carrying[idx] = False
+        self.coletados[idx] = 0
+        self.depositados[idx] = 0
+        self.steps[idx] = 0
+        self.done[idx] = False
+        self.success[idx] = False
+        return self.observacoes()
+
+    def _guarda_recursos(self, i: int) -> None:
+        #Coordenadas dos recursos do env i (np.nonzero da a ordem (y, x) do desempate)
+        ys, xs = np.nonzero(self.recursos[i])
+        k = len(xs)
+        if k > self.food_x.shape[1]:
+            # O gerador pos mais recursos que as colunas reservadas: alarga os arrays
+            extra = k - self.food_x.shape[1]
+            self.food_x = np.pad(self.food_x, ((0, 0), (0, extra)))
+            self.food_y = np.pad(self.food_y, ((0, 0), (0, extra)))
+            self.food_vivo = np.pad(self.food_vivo, ((0, 0), (0, extra)))
+        self.food_x[i, :k] = xs
+        self.food_y[i, :k] = ys
+        self.food_vivo[i] = False
+        self.food_vivo[i, :k] = True
+
+    def _nearest_food(self, ax: np.ndarray, ay: np.ndarray):
+        #Recurso mais proximo por distancia Manhattan, para todos os envs de uma vez (so sobre os recursos)
+        d = np.abs(self.food_x - ax[:, None]) + np.abs(self.food_y - ay[:, None])
+        d = np.where(self.food_vivo, d, np.iinfo(np.int64).max)
+        best = np.argmin(d, axis=1)
+        has_food = self.food_vivo.any(axis=1)
+
+        fx = self.food_x[self._env_idx, best]
+        fy = self.food_y[self._env_idx, best]
+        food_dx = np.where(has_food, np.sign(fx - ax), 0)
+        food_dy = np.where(has_food, np.sign(fy - ay), 0)
+        food_dist = np.where(has_food, d[self._env_idx, best], 0)
+        return food_dx, food_dy, food_dist
+
+    def observacoes(self) -> dict:
+        #Observacoes em batch, com a mesma informacao dos sensores do Foraging
+        ax = self.agent[:, 0]
+        ay = self.agent[:, 1]
+
+        #Grelha 3x3 centrada no agente, indexada por [dy + 1, dx + 1]
+        cells = self.padded[
+            self._env_idx[:, None, None],
+            ay[:, None, None] + self._off[None, :, None],
+            ax[:, None, None] + self._off[None, None, :],
+        ].astype(np.int8)
+
+        food_dx, food_dy, food_dist = self._nearest_food(ax, ay)
+
+        return {
+            "cells": cells,
+            "food_dx": food_dx,
+            "food_dy": food_dy,
+            "food_dist": food_dist,
+            "nest_dx": np.sign(self.ninho[:, 0] - ax),
+            "nest_dy": np.sign(self.ninho[:, 1] - ay),
+            "agent": self.agent.copy(),
+            "carrying": self.carrying.copy(),
+            "collected": self.coletados.copy(),
+            "deposited": self.depositados.copy(),
+        }
+
+    def step(self, actions):
+        #Aplica uma acao por env. Envs ja terminados ficam parados com recompensa 0.
+        #Devolve (obs, recompensas, done, success); done/success sao acumulados no episodio.
+        act = np.asarray(actions, dtype=np.int64)
+        active = ~self.done
+        idx = self._env_idx
+
+        ax = self.agent[:, 0]
+        ay = self.agent[:, 1]
+        nx = ax + self._dx[act]
+        ny = ay + self._dy[act]
+
+        #Verificar colisoes (a borda do padded trata de sair do mapa)
+        blocked = self.padded[idx, ny + 1, nx + 1]
+        nx = np.where(blocked, ax, nx)
+        ny = np.where(blocked, ay, ny)
+        recompensas = np.where(blocked, -5.0, -1.0)
+
+        self.agent[active, 0] = nx[active]
+        self.agent[active, 1] = ny[active]
+        ax = self.agent[:, 0]
+        ay = self.agent[:, 1]
+
+        # recolher recurso
+        apanha = active & ~self.carrying & self.recursos[idx, ay, ax]
+        self.recursos[idx[apanha], ay[apanha], ax[apanha]] = False
+        if apanha.any():
+            e = idx[apanha]
+            apanhado = (self.food_x[e] == ax[apanha, None]) & (self.food_y[e] == ay[apanha, None])
+            self.food_vivo[e] &= ~apanhado
+        self.carrying |= apanha
+        self.coletados += apanha
+        recompensas += 20.0 * apanha
+
+        # depositar no ninho
+        no_ninho = (ax == self.ninho[:, 0]) & (ay == self.ninho[:, 1])
+        deposita = active & self.carrying & no_ninho
+        self.carrying &= ~deposita
+        self.depositados += deposita
+        recompensas += 30.0 * deposita
+
+        #Criterio de termino/sucesso
+        terminou = active & (self.depositados == self.n_recursos)
+        recompensas += 50.0 * terminou
+        recompensas[~active] = 0.0
+
+        self.steps[active] += 1
+        self.success |= terminou
+        self.done |= terminou
+        if self.max_passos is not None:
+            self.done |= active & (self.steps >= self.max_passos)
+
+        return self.observacoes(), recompensas, self.done.copy(), self.success.copy()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+#Os testes importam sim/ e benchmarks/ a partir de src/ (como os modulos correm com python -m dentro de src/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,37 @@
+"""
+Paridade dos ambientes vetorizados com os escalares (benchmarks/parity.py), nos dois modos de
+geracao do mapa. Corre a mesma verificacao que os micro-benchmarks fazem antes de medir.
+"""
+import pytest
+
+from benchmarks import parity
+from sim.ambiente import MAP_SAMPLING
+
+
+@pytest.mark.parametrize("map_sampling", MAP_SAMPLING)
+def test_farol(map_sampling):
+    assert parity.verifica_farol(map_sampling=map_sampling) == 16 * 400
+
+
+@pytest.mark.parametrize("map_sampling", MAP_SAMPLING)
+def test_foraging(map_sampling):
+    assert parity.verifica_foraging(map_sampling=map_sampling) == 16 * 400
+
+
+@pytest.mark.parametrize("map_sampling", MAP_SAMPLING)
+def test_foraging_entrega_todos(map_sampling):
+    # Mapa pequeno com poucos recursos: as acoes aleatorias chegam a entregar tudo (+50, success)
+    assert parity.verifica_foraging(size=5, obstacle_ratio=0.0, n_recursos=2, max_passos=200,
+                                    map_sampling=map_sampling) == 16 * 400
+
+
+def test_deteta_diferencas(monkeypatch):
+    # A verificacao tem de falhar se o ambiente vetorizado se afastar do escalar
+    step = parity.VecAmbienteFarol.step
+
+    def step_errado(self, actions):
+        obs, recompensas, done, success = step(self, actions)
+        return obs, recompensas - 1.0, done, success
+    monkeypatch.setattr(parity.VecAmbienteFarol, "step", step_errado)
+    with pytest.raises(AssertionError, match="recompensa"):
+        parity.verifica_farol(passos=10)